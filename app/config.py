@@ -16,8 +16,9 @@ app_data_base_dir = Path(os.getenv("APPDATA") or Path.home()) / "VideoDownloader
 log_dir = app_data_base_dir / "logs"
 log_dir.mkdir(parents=True, exist_ok=True)
 
+# Miniatury: magazyn SQLite (stary katalog z plikami .jpg jest usuwany przy starcie)
 THUMBS_CACHE_DIR = app_data_base_dir / "thumbs"
-THUMBS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+THUMBS_STORE_PATH = app_data_base_dir / "thumbs.sqlite3"
 
 # ---------------------------------------------------------------------------
 # Ścieżki narzędzi
@@ -34,6 +35,9 @@ FFMPEG_BIN_DIR     = FFMPEG_DIR / "bin"
 FFMPEG_PATH_WINDOWS = FFMPEG_BIN_DIR / "ffmpeg.exe"
 FFMPEG_PATH_LINUX   = TOOLS_DIR / "ffmpeg"
 
+ARIA2C_PATH_WINDOWS = LIBS_DIR / "aria2c.exe"
+ARIA2C_PATH_LINUX   = TOOLS_DIR / "aria2c"
+
 # ---------------------------------------------------------------------------
 # URL-e pobierania
 # ---------------------------------------------------------------------------
@@ -66,6 +70,71 @@ STRICT_URL_REGEX = re.compile(
 
 DEFAULT_SOCKET_TIMEOUT = 15   # sekundy dla --socket-timeout yt-dlp
 
+# Opóźnienie ponowienia nieudanego elementu: 30 s, 60 s, 120 s... (maks. 30 min), z losowym rozrzutem
+RETRY_BASE_DELAY_S = 30
+RETRY_MAX_DELAY_S = 30 * 60
+
+# Ile miejsca zostawiamy wolnego na dysku przy dopuszczaniu elementów do pobrania
+DISK_RESERVE_BYTES = 512 * 1024 * 1024
+
+# Zapis kolejki: zmiany łączone przez tyle sekund, dziennik scalany do migawki co tyle rekordów
+QUEUE_JOURNAL_DEBOUNCE_S = 0.5
+QUEUE_JOURNAL_COMPACT_EVERY = 5000
+
+# Stan wznawiania trwającego pobierania (plik .part, pobrane bajty) trafia do dziennika co tyle sekund
+RESUME_CHECKPOINT_S = 10
+
+# Co tyle czasu oczekiwania element awansuje o jeden priorytet (żeby duże/masowe nie czekały w nieskończoność)
+QUEUE_AGING_S = 2 * 60 * 60
+
+# Zdekodowane (przeskalowane) miniatury trzymane w pamięci — limit w bajtach
+THUMB_MEMORY_CACHE_BYTES = 32 * 1024 * 1024
+
+# Magazyn miniatur na dysku: domyślny limit rozmiaru w MB (LRU, zmieniany w ustawieniach)
+# oraz rozmiar / jakość przekodowanych obrazów
+THUMB_STORE_MAX_MB = 64
+THUMB_STORE_SIZE = (320, 180)
+THUMB_STORE_QUALITY = 80
+THUMB_DOWNLOAD_MAX_BYTES = 8 * 1024 * 1024   # oryginał miniatury przed przekodowaniem
+
+# Wspólny klient HTTP (miniatury, API GitHub, pobieranie narzędzi)
+HTTP_CONNECT_TIMEOUT_S = 10
+HTTP_POOL_SIZE = 8            # połączeń keep-alive na host
+HTTP_MAX_PER_HOST = 4         # równoczesnych żądań do jednego hosta
+HTTP_RETRIES = 3              # dla błędów połączenia i 429/5xx (z narastającą przerwą)
+
+# Ile ekstrakcji metadanych (podgląd, skan kolejki, tytuły) wykonujemy równolegle
+METADATA_WORKERS = 4
+
+# Najwięcej równocześnie działających procesów puli yt-dlp (pobierania + metadane); reszta czeka
+YTDLP_POOL_MAX_WORKERS = 6
+
+# Domyślna ważność zapisanych metadanych (godziny; 0 = bez pamięci podręcznej)
+METADATA_CACHE_TTL_H = 72
+
+# Zewnętrzne downloadery obsługiwane przez yt-dlp (--downloader)
+EXTERNAL_DOWNLOADER_NONE = ""
+EXTERNAL_DOWNLOADER_ARIA2C = "aria2c"
+EXTERNAL_DOWNLOADER_FFMPEG = "ffmpeg"
+
+# Protokoły, które można przekazać zewnętrznemu downloaderowi (klucz yt-dlp, etykieta)
+EXTERNAL_DOWNLOADER_PROTOCOLS = (("http", "HTTP(S)"), ("dash", "DASH"), ("m3u8", "HLS (m3u8)"))
+
+# Połączenia aria2c na serwis ("host=n", 0 = nie używaj aria2c dla serwisu)
+DEFAULT_DOWNLOADER_PROFILES = "cda.pl=4, youtube.com=8"
+
+# Pliki stanu wznawiania (format i nazwa pliku zapisywane przez yt-dlp przed pobraniem)
+PARTIAL_STATE_DIR = app_data_base_dir / "partial"
+
+# Jak często (ms) GUI odbiera zbuforowane wyjście i postęp pobierań (~15 Hz)
+PROGRESS_FLUSH_INTERVAL_MS = 66
+
+# Po ilu sekundach ciszy na wyjściu yt-dlp zgłaszamy możliwe zawieszenie pobierania
+OUTPUT_STALL_WARN_S = 120
+
+# Domyślne limity równoległych pobierań na serwis ("*" = pozostałe hosty)
+DEFAULT_HOST_LIMITS = "cda.pl=2, youtube.com=4"
+
 # ---------------------------------------------------------------------------
 # Logowanie
 # ---------------------------------------------------------------------------
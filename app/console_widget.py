@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Konsola wyjścia yt-dlp.
+
+Obsługuje:
+  - ograniczoną liczbę linii (bufor cykliczny – najstarsze linie są usuwane)
+  - dopisywanie linii partiami (jeden update widoku na kilkadziesiąt ms)
+  - pełną historię sesji zapisywaną do pliku w katalogu logów
+  - auto-przewijanie tylko gdy użytkownik jest na dole
+"""
+
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import QPlainTextEdit
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_LINES = 5000
+FLUSH_INTERVAL_MS = 50
+KEEP_SESSION_LOGS = 20
+
+
+class ConsoleWidget(QPlainTextEdit):
+    def __init__(self, parent=None, max_lines: int = DEFAULT_MAX_LINES,
+                 log_dir: Optional[Path] = None):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self.setUndoRedoEnabled(False)
+        self.setLineWrapMode(QPlainTextEdit.LineWrapMode.WidgetWidth)
+        self.setMaximumBlockCount(max(100, max_lines))
+
+        self._pending: List[str] = []
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(FLUSH_INTERVAL_MS)
+        self._flush_timer.timeout.connect(self._flush)
+
+        self._log_file = None
+        self.log_path: Optional[Path] = None
+        if log_dir is not None:
+            self._open_session_log(Path(log_dir))
+
+    # ------------------------------------------------------------------
+    # API zgodne z QTextEdit.append
+    # ------------------------------------------------------------------
+
+    def append(self, text: str):
+        self.append_lines(str(text).split("\n"))
+
+    def append_lines(self, lines: List[str]):
+        if not lines:
+            return
+        self._pending.extend(lines)
+        if self._log_file is not None:
+            try:
+                self._log_file.write("\n".join(lines) + "\n")
+            except OSError as e:
+                logger.warning(f"Nie udało się zapisać logu konsoli: {e}")
+                self._log_file = None
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def set_max_lines(self, max_lines: int):
+        self.setMaximumBlockCount(max(100, max_lines))
+
+    def clear(self):
+        self._pending.clear()
+        super().clear()
+
+    def close_log(self):
+        self._flush()
+        if self._log_file is not None:
+            try:
+                self._log_file.close()
+            except OSError:
+                pass
+            self._log_file = None
+
+    # ------------------------------------------------------------------
+    # Wewnętrzne
+    # ------------------------------------------------------------------
+
+    def _flush(self):
+        if not self._pending:
+            return
+        # Przy dużej paczce i tak zostanie tylko ostatnie maximumBlockCount linii
+        lines = self._pending[-self.maximumBlockCount():]
+        self._pending = []
+        sb = self.verticalScrollBar()
+        at_bottom = sb is None or sb.value() >= sb.maximum() - 4
+        self.appendPlainText("\n".join(lines))
+        if sb is not None and at_bottom:
+            sb.setValue(sb.maximum())
+        if self._log_file is not None:
+            try:
+                self._log_file.flush()
+            except OSError:
+                pass
+
+    def _open_session_log(self, log_dir: Path):
+        try:
+            log_dir.mkdir(parents=True, exist_ok=True)
+            old = sorted(log_dir.glob("console-*.log"))
+            for p in old[:max(0, len(old) - (KEEP_SESSION_LOGS - 1))]:
+                p.unlink(missing_ok=True)
+            self.log_path = log_dir / f"console-{datetime.now():%Y%m%d-%H%M%S}.log"
+            self._log_file = open(self.log_path, "a", encoding="utf-8")
+        except OSError as e:
+            logger.warning(f"Nie udało się otworzyć logu sesji: {e}")
+            self._log_file = None
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Historia pobrań w lokalnej bazie SQLite (bez zależności od Qt).
+
+Każde zakończone uruchomienie zapisuje wiersz na pobrany plik (dla playlist —
+na każdy element) albo jeden wiersz z błędem / zatrzymaniem. Tytuły są
+przeszukiwane indeksem pełnotekstowym FTS5 (gdy SQLite go nie ma —
+zwykłym LIKE), a listy są stronicowane kluczem (finished_at, id), więc
+kolejne strony nie skanują całej tabeli.
+"""
+
+import logging
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+STATUS_STOPPED = "stopped"
+
+SCHEMA_VERSION = 1
+
+_COLUMNS = (
+    "url", "source_url", "extractor", "video_id", "title", "filepath", "bytes",
+    "duration", "avg_speed", "queued_s", "download_s", "postprocess_s",
+    "started_at", "finished_at", "status", "attempt",
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS downloads (
+    id            INTEGER PRIMARY KEY,
+    url           TEXT NOT NULL,
+    source_url    TEXT,              -- URL z kolejki (np. playlista), gdy inny niż url
+    extractor     TEXT,
+    video_id      TEXT,
+    title         TEXT,
+    filepath      TEXT,
+    bytes         INTEGER,
+    duration      REAL,              -- długość materiału (s)
+    avg_speed     REAL,              -- bajty/s w fazie pobierania
+    queued_s      REAL,              -- czas w kolejce przed startem
+    download_s    REAL,
+    postprocess_s REAL,
+    started_at    REAL,
+    finished_at   REAL NOT NULL,
+    status        TEXT NOT NULL,
+    attempt       INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_downloads_url ON downloads(url);
+CREATE INDEX IF NOT EXISTS idx_downloads_source_url ON downloads(source_url);
+CREATE INDEX IF NOT EXISTS idx_downloads_video ON downloads(extractor, video_id);
+CREATE INDEX IF NOT EXISTS idx_downloads_finished ON downloads(finished_at, id);
+CREATE INDEX IF NOT EXISTS idx_downloads_status ON downloads(status, finished_at);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS downloads_fts
+    USING fts5(title, content='downloads', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS downloads_fts_ai AFTER INSERT ON downloads BEGIN
+    INSERT INTO downloads_fts(rowid, title) VALUES (new.id, new.title);
+END;
+CREATE TRIGGER IF NOT EXISTS downloads_fts_ad AFTER DELETE ON downloads BEGIN
+    INSERT INTO downloads_fts(downloads_fts, rowid, title) VALUES ('delete', old.id, old.title);
+END;
+"""
+
+
+def _fts_query(text: str) -> str:
+    """Zamienia wpis użytkownika na zapytanie FTS5: każde słowo jako prefiks, wszystkie wymagane."""
+    words = [w.replace('"', '""') for w in text.split()]
+    return " ".join(f'"{w}"*' for w in words if w)
+
+
+class HistoryDB:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        try:
+            self.conn.executescript(_FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError as e:
+            logger.info(f"SQLite bez FTS5 ({e}) — wyszukiwanie przez LIKE.")
+            self.has_fts = False
+        self.conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        self.conn.commit()
+
+    def close(self):
+        try:
+            self.conn.close()
+        except sqlite3.Error:
+            pass
+
+    # ------------------------------------------------------------------
+    # Zapis
+    # ------------------------------------------------------------------
+
+    def add(self, **entry) -> int:
+        entry.setdefault("finished_at", time.time())
+        cols = [c for c in _COLUMNS if entry.get(c) is not None]
+        cur = self.conn.execute(
+            f"INSERT INTO downloads ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+            [entry[c] for c in cols],
+        )
+        self.conn.commit()
+        return cur.lastrowid
+
+    # ------------------------------------------------------------------
+    # Odczyt
+    # ------------------------------------------------------------------
+
+    def already_downloaded(self, url: str) -> Optional[sqlite3.Row]:
+        """Ostatnie udane pobranie tego URL-a (jako elementu lub URL-a z kolejki)."""
+        return self.conn.execute(
+            "SELECT * FROM downloads WHERE status = ? AND (url = ? OR source_url = ?) "
+            "ORDER BY finished_at DESC LIMIT 1",
+            (STATUS_OK, url, url),
+        ).fetchone()
+
+    def _where(self, text: str = "", status: Optional[str] = None,
+               since: Optional[float] = None) -> Tuple[str, list]:
+        clauses, params = [], []
+        text = (text or "").strip()
+        if text:
+            like = f"%{text}%"
+            if self.has_fts and _fts_query(text):
+                clauses.append(
+                    "(id IN (SELECT rowid FROM downloads_fts WHERE downloads_fts MATCH ?)"
+                    " OR url LIKE ? OR filepath LIKE ?)"
+                )
+                params += [_fts_query(text), like, like]
+            else:
+                clauses.append("(title LIKE ? OR url LIKE ? OR filepath LIKE ?)")
+                params += [like, like, like]
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if since:
+            clauses.append("finished_at >= ?")
+            params.append(since)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def page(self, text: str = "", status: Optional[str] = None, since: Optional[float] = None,
+             after: Optional[Tuple[float, int]] = None, limit: int = 200) -> List[sqlite3.Row]:
+        """
+        Strona wyników od najnowszych. `after` = (finished_at, id) ostatniego
+        wiersza poprzedniej strony.
+        """
+        where, params = self._where(text, status, since)
+        if after is not None:
+            where += (" AND " if where else " WHERE ") + "(finished_at < ? OR (finished_at = ? AND id < ?))"
+            params += [after[0], after[0], after[1]]
+        return self.conn.execute(
+            f"SELECT * FROM downloads{where} ORDER BY finished_at DESC, id DESC LIMIT ?",
+            params + [limit],
+        ).fetchall()
+
+    def stats(self, text: str = "", status: Optional[str] = None,
+              since: Optional[float] = None) -> Dict[str, float]:
+        """Liczba wpisów, suma bajtów i średnia przepustowość (bajty / czas pobierania)."""
+        where, params = self._where(text, status, since)
+        row = self.conn.execute(
+            f"SELECT COUNT(*) AS n, "
+            f"SUM(CASE WHEN status = '{STATUS_OK}' THEN 1 ELSE 0 END) AS ok, "
+            f"COALESCE(SUM(bytes), 0) AS bytes, "
+            f"COALESCE(SUM(CASE WHEN bytes > 0 THEN download_s END), 0) AS download_s "
+            f"FROM downloads{where}",
+            params,
+        ).fetchone()
+        throughput = row["bytes"] / row["download_s"] if row["download_s"] else 0.0
+        return {"count": row["n"], "ok": row["ok"] or 0, "bytes": row["bytes"],
+                "download_s": row["download_s"], "throughput": throughput}
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+Okno historii pobrań.
+
+Obsługuje:
+  - wyszukiwanie po tytule (FTS), URL-u i ścieżce pliku
+  - filtr statusu i okresu wraz z podsumowaniem (liczba, rozmiar, przepustowość)
+  - leniwe stronicowanie — kolejne strony dociągane przy przewijaniu
+"""
+
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, Qt, QTimer, QUrl
+from PyQt6.QtGui import QColor, QDesktopServices
+from PyQt6.QtWidgets import (
+    QAbstractItemView,
+    QComboBox,
+    QDialog,
+    QHBoxLayout,
+    QHeaderView,
+    QLabel,
+    QLineEdit,
+    QPushButton,
+    QTableView,
+    QVBoxLayout,
+)
+
+from .history_db import STATUS_FAILED, STATUS_OK, STATUS_STOPPED, HistoryDB
+from .utils import human_duration, human_size
+
+PAGE_SIZE = 200
+
+_STATUS_LABELS = {STATUS_OK: "OK", STATUS_FAILED: "Błąd", STATUS_STOPPED: "Zatrzymane"}
+
+_PERIODS = (
+    ("Cała historia", None),
+    ("Ostatnie 24 h", 24 * 3600),
+    ("Ostatnie 7 dni", 7 * 24 * 3600),
+    ("Ostatnie 30 dni", 30 * 24 * 3600),
+)
+
+
+class HistoryTableModel(QAbstractTableModel):
+    HEADERS = ("Zakończono", "Tytuł", "Serwis", "Rozmiar", "Pobieranie", "Śr. prędkość", "Status", "Plik / URL")
+
+    def __init__(self, db: HistoryDB, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self._rows: List = []
+        self._filters = {}
+        self._exhausted = True
+
+    def set_filters(self, text: str = "", status: Optional[str] = None, since: Optional[float] = None):
+        self.beginResetModel()
+        self._filters = {"text": text, "status": status, "since": since}
+        self._rows = []
+        self._exhausted = False
+        self.endResetModel()
+        self.fetchMore(QModelIndex())
+
+    def row_at(self, row: int):
+        return self._rows[row] if 0 <= row < len(self._rows) else None
+
+    # --- stronicowanie ---
+
+    def canFetchMore(self, parent=QModelIndex()) -> bool:
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted:
+            return
+        after = None
+        if self._rows:
+            last = self._rows[-1]
+            after = (last["finished_at"], last["id"])
+        page = self.db.page(after=after, limit=PAGE_SIZE, **self._filters)
+        self._exhausted = len(page) < PAGE_SIZE
+        if page:
+            self.beginInsertRows(QModelIndex(), len(self._rows), len(self._rows) + len(page) - 1)
+            self._rows.extend(page)
+            self.endInsertRows()
+
+    # --- dane ---
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index: QModelIndex, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        r = self._rows[index.row()]
+        col = index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if col == 0:
+                return datetime.fromtimestamp(r["finished_at"]).strftime("%Y-%m-%d %H:%M")
+            if col == 1:
+                return r["title"] or ""
+            if col == 2:
+                return r["extractor"] or ""
+            if col == 3:
+                return human_size(r["bytes"]) if r["bytes"] else ""
+            if col == 4:
+                return human_duration(r["download_s"]) if r["download_s"] else ""
+            if col == 5:
+                return f"{human_size(int(r['avg_speed']))}/s" if r["avg_speed"] else ""
+            if col == 6:
+                return _STATUS_LABELS.get(r["status"], r["status"])
+            if col == 7:
+                return r["filepath"] or r["url"]
+        elif role == Qt.ItemDataRole.ToolTipRole:
+            lines = [r["url"]]
+            if r["source_url"]:
+                lines.append(f"Z kolejki: {r['source_url']}")
+            if r["filepath"]:
+                lines.append(r["filepath"])
+            phases = [
+                ("w kolejce", r["queued_s"]), ("pobieranie", r["download_s"]),
+                ("przetwarzanie", r["postprocess_s"]),
+            ]
+            phases = [f"{name} {human_duration(v)}" for name, v in phases if v]
+            if phases:
+                lines.append("Czas: " + ", ".join(phases))
+            if r["attempt"] and r["attempt"] > 1:
+                lines.append(f"Próba: {r['attempt']}")
+            return "\n".join(lines)
+        elif role == Qt.ItemDataRole.ForegroundRole and col == 6:
+            if r["status"] == STATUS_FAILED:
+                return QColor(217, 83, 79)
+            if r["status"] == STATUS_STOPPED:
+                return QColor(200, 140, 40)
+        return None
+
+
+class HistoryDialog(QDialog):
+    def __init__(self, db: HistoryDB, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Historia pobrań")
+        self.resize(1000, 560)
+        self.db = db
+
+        lay = QVBoxLayout(self)
+        filters = QHBoxLayout()
+        self.search = QLineEdit()
+        self.search.setPlaceholderText("Szukaj w tytułach, URL-ach i ścieżkach...")
+        self.search.setClearButtonEnabled(True)
+        filters.addWidget(self.search, 3)
+        self.status = QComboBox()
+        self.status.addItem("Wszystkie", None)
+        for key, label in _STATUS_LABELS.items():
+            self.status.addItem(label, key)
+        filters.addWidget(self.status)
+        self.period = QComboBox()
+        for label, seconds in _PERIODS:
+            self.period.addItem(label, seconds)
+        filters.addWidget(self.period)
+        lay.addLayout(filters)
+
+        self.summary = QLabel("")
+        lay.addWidget(self.summary)
+
+        self.model = HistoryTableModel(db, self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setAlternatingRowColors(True)
+        self.table.verticalHeader().setVisible(False)
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        header.setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
+        header.setStretchLastSection(False)
+        self.table.setColumnWidth(0, 120)
+        self.table.setColumnWidth(7, 260)
+        self.table.doubleClicked.connect(self._open_location)
+        lay.addWidget(self.table, 1)
+
+        btns = QHBoxLayout()
+        btns.addStretch()
+        close_btn = QPushButton("Zamknij")
+        close_btn.clicked.connect(self.close)
+        btns.addWidget(close_btn)
+        lay.addLayout(btns)
+
+        # wyszukiwanie po krótkiej przerwie w pisaniu, nie po każdym znaku
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(250)
+        self._search_timer.timeout.connect(self.refresh)
+        self.search.textChanged.connect(lambda _: self._search_timer.start())
+        self.status.currentIndexChanged.connect(lambda _: self.refresh())
+        self.period.currentIndexChanged.connect(lambda _: self.refresh())
+        self.refresh()
+
+    def refresh(self):
+        seconds = self.period.currentData()
+        since = time.time() - seconds if seconds else None
+        text = self.search.text().strip()
+        status = self.status.currentData()
+        self.model.set_filters(text, status, since)
+        st = self.db.stats(text, status, since)
+        parts = [f"{st['count']} wpisów ({st['ok']} udanych)"]
+        if st["bytes"]:
+            parts.append(f"łącznie {human_size(st['bytes'])}")
+        if st["throughput"]:
+            parts.append(f"średnio {human_size(int(st['throughput']))}/s "
+                         f"(czas pobierania {human_duration(st['download_s'])})")
+        self.summary.setText(" | ".join(parts))
+
+    def _open_location(self, index: QModelIndex):
+        r = self.model.row_at(index.row())
+        if not r:
+            return
+        path = Path(r["filepath"]) if r["filepath"] else None
+        if path and path.parent.exists():
+            QDesktopServices.openUrl(QUrl.fromLocalFile(str(path.parent)))
+        else:
+            QDesktopServices.openUrl(QUrl(r["url"]))
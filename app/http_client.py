@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Wspólny klient HTTP (bez zależności od Qt).
+
+Jedna sesja requests dla całej aplikacji: połączenia keep-alive są
+utrzymywane w puli per host (skan kolejki YouTube pobiera setki miniatur
+z i.ytimg.com jednym-kilkoma połączeniami zamiast nowego TCP+TLS na każdą),
+błędy połączenia i odpowiedzi 429/5xx są ponawiane z narastającą przerwą,
+a liczba równoczesnych żądań do jednego hosta jest ograniczona.
+
+Duże pliki (`download_to`) są zapisywane na dysk strumieniowo, kawałkami;
+małe odpowiedzi (`get_bytes`) mają limit rozmiaru.
+"""
+
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .config import HTTP_CONNECT_TIMEOUT_S, HTTP_MAX_PER_HOST, HTTP_POOL_SIZE, HTTP_RETRIES
+
+CHUNK_SIZE = 64 * 1024
+USER_AGENT = "YTDLP-GUI (+https://github.com/PaffcioStudio/YTDLP-GUI)"
+
+_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+_host_slots: Dict[str, threading.BoundedSemaphore] = {}
+
+
+class ResponseTooLarge(requests.exceptions.RequestException):
+    pass
+
+
+def session() -> requests.Session:
+    global _session
+    with _lock:
+        if _session is None:
+            retry = Retry(
+                total=HTTP_RETRIES,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset({"GET", "HEAD"}),
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+            s = requests.Session()
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            s.headers["User-Agent"] = USER_AGENT
+            _session = s
+        return _session
+
+
+def _slot(url: str) -> threading.BoundedSemaphore:
+    host = (urlsplit(url).hostname or "").lower()
+    with _lock:
+        sem = _host_slots.get(host)
+        if sem is None:
+            sem = _host_slots[host] = threading.BoundedSemaphore(HTTP_MAX_PER_HOST)
+        return sem
+
+
+def _get(url: str, timeout: float, stream: bool) -> requests.Response:
+    resp = session().get(url, timeout=(HTTP_CONNECT_TIMEOUT_S, timeout), stream=stream)
+    resp.raise_for_status()
+    return resp
+
+
+def get_json(url: str, timeout: float = 10):
+    with _slot(url):
+        return _get(url, timeout, stream=False).json()
+
+
+def get_bytes(url: str, timeout: float = 15, max_bytes: int = 16 * 1024 * 1024) -> bytes:
+    """Małe odpowiedzi (np. miniatury) — w pamięci, ale z limitem rozmiaru."""
+    with _slot(url):
+        with _get(url, timeout, stream=True) as resp:
+            declared = int(resp.headers.get("content-length") or 0)
+            if declared > max_bytes:
+                raise ResponseTooLarge(f"Odpowiedź za duża ({declared} B): {url}")
+            parts, size = [], 0
+            for chunk in resp.iter_content(chunk_size=CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ResponseTooLarge(f"Odpowiedź za duża (> {max_bytes} B): {url}")
+                parts.append(chunk)
+            return b"".join(parts)
+
+
+def download_to(url: str, dest: Path, timeout: float = 180,
+                on_progress: Optional[Callable[[int, int], None]] = None) -> int:
+    """
+    Zapisuje odpowiedź strumieniowo do `dest`; `on_progress(pobrane, całość)`
+    po każdym kawałku (całość = 0, gdy serwer jej nie podał). Zwraca liczbę bajtów.
+    """
+    with _slot(url):
+        with _get(url, timeout, stream=True) as resp:
+            total = int(resp.headers.get("content-length") or 0)
+            done = 0
+            with open(dest, "wb") as f:
+                for chunk in resp.iter_content(chunk_size=CHUNK_SIZE):
+                    if not chunk:
+                        continue
+                    f.write(chunk)
+                    done += len(chunk)
+                    if on_progress:
+                        on_progress(done, total)
+            return done
+
+
+def close():
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+            _session = None
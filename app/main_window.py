@@ -9,14 +9,17 @@ Klasa jest złożona z mixinów — każdy odpowiada za jeden obszar logiki:
   - QueueMixin        → kolejka, ścieżki, schowek, CDA
   - PreviewMixin      → podgląd metadanych URL
   - DownloadMixin     → pobieranie, retry, budowanie komendy
+  - HistoryMixin      → historia pobrań (SQLite)
   - SettingsMixin     → zapis / odczyt / reset ustawień
 """
 
 import logging
 import os
 import platform
+import shutil
+import threading
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set
 
 from PyQt6.QtCore import QSettings, QTimer, Qt
 from PyQt6.QtGui import QAction
@@ -34,35 +37,51 @@ from PyQt6.QtWidgets import (
     QStatusBar,
     QStyle,
     QTabWidget,
-    QTextEdit,
     QVBoxLayout,
     QWidget,
 )
 
 from .config import (
     DEFAULT_SOCKET_TIMEOUT,
+    ARIA2C_PATH_LINUX,
+    ARIA2C_PATH_WINDOWS,
     FFMPEG_PATH_LINUX,
     FFMPEG_PATH_WINDOWS,
+    METADATA_WORKERS,
+    PROGRESS_FLUSH_INTERVAL_MS,
+    QUEUE_JOURNAL_COMPACT_EVERY,
+    QUEUE_JOURNAL_DEBOUNCE_S,
     STRICT_URL_REGEX,
+    THUMB_MEMORY_CACHE_BYTES,
+    THUMB_STORE_MAX_MB,
+    THUMBS_CACHE_DIR,
+    THUMBS_STORE_PATH,
     YTDLP_PATH_LINUX,
     YTDLP_PATH_WINDOWS,
     app_data_base_dir,
     log_dir,
 )
+from . import http_client, ytdlp_engine
+from .console_widget import DEFAULT_MAX_LINES, ConsoleWidget
+from .metadata_service import MetadataService
 from .mixins.dependencies import DependenciesMixin
 from .mixins.download import DownloadMixin
+from .mixins.history import HistoryMixin
 from .mixins.preview import PreviewMixin
 from .mixins.progress import ProgressMixin
 from .mixins.queue import QueueMixin
 from .mixins.settings import SettingsMixin
 from .mixins.theme import ThemeMixin
-from .queue_widget import QueueListWidget
+from .progress_protocol import ProgressRecord
+from .queue_journal import QueueJournal
+from .queue_store import QueueStore
+from .queue_widget import QueueListView
+from .scheduler import BandwidthAllocator, RetrySchedule
+from .thumb_store import ThumbStore
+from .thumbnail_cache import ThumbnailCache
 from .threads import (
-    BatchPreviewThread,
     CDAStatusCheckThread,
     DownloadFFmpegThread,
-    PreviewFetchThread,
-    TitleFetchThread,
     UpdateYTDLPThread,
     YTDLPThread,
 )
@@ -79,6 +98,7 @@ from .ui.tabs import (
     init_video_tab,
 )
 from .utils import human_duration, human_size, resource_path
+from .worker_pool import shutdown_shared_pool
 
 logger = logging.getLogger(__name__)
 
@@ -90,6 +110,7 @@ class YTDLPGUI(
     QueueMixin,
     PreviewMixin,
     DownloadMixin,
+    HistoryMixin,
     SettingsMixin,
     QMainWindow,
 ):
@@ -106,8 +127,10 @@ class YTDLPGUI(
             str(self.appdata_dir / "settings.ini"), QSettings.Format.IniFormat
         )
 
-        self.current_video_title = "Unknown"
-        self.current_processing_url: Optional[str] = None
+        self.item_titles: Dict[str, str] = {}
+        self.item_progress: Dict[str, ProgressRecord] = {}
+        self.item_timing: Dict[str, dict] = {}    # czasy faz bieżących pobierań (historia)
+        self._resume_checkpoint_at: Dict[str, float] = {}   # ostatni zapis stanu wznawiania do dziennika
 
         self.failed_log_file = log_dir / "failed_downloads.log"
         self.failed_logger = logging.getLogger("failed_downloads")
@@ -122,22 +145,61 @@ class YTDLPGUI(
         self.default_ffmpeg_path_local_fallback = (
             str(FFMPEG_PATH_WINDOWS) if os.name == "nt" else str(FFMPEG_PATH_LINUX)
         )
+        self.default_aria2c_path_local_fallback = (
+            str(ARIA2C_PATH_WINDOWS) if os.name == "nt" else str(ARIA2C_PATH_LINUX)
+        )
 
-        self.thread: Optional[YTDLPThread] = None
+        self.active_downloads: Dict[str, YTDLPThread] = {}
+        self.active_batches: Dict[str, List[str]] = {}   # URL prowadzący -> URL-e paczki
+        self.bandwidth = BandwidthAllocator()
         self.update_ytdlp_thread: Optional[UpdateYTDLPThread] = None
         self.download_ffmpeg_thread: Optional[DownloadFFmpegThread] = None
         self.cda_check_thread: Optional[CDAStatusCheckThread] = None
-        self.preview_thread: Optional[PreviewFetchThread] = None
-        self.batch_preview_thread: Optional[BatchPreviewThread] = None
-        self.title_thread: Optional[TitleFetchThread] = None
 
-        self.download_queue: List[str] = []
-        self.failed_queue: List[str] = []
-        self.item_retry_counts: Dict[str, int] = {}
+        # Kolejka: elementy (status, ponowienia, priorytet, stan wznawiania, szacowany rozmiar)
+        self.queue_store = QueueStore()
+        self.queue_journal = QueueJournal(
+            self.appdata_dir, QUEUE_JOURNAL_DEBOUNCE_S, QUEUE_JOURNAL_COMPACT_EVERY
+        )
+        self.retry_schedule = RetrySchedule()
+        self._open_history_db()
+        self.thumb_store = ThumbStore(
+            THUMBS_STORE_PATH,
+            self.settings.value("thumb_store_max_mb", THUMB_STORE_MAX_MB, type=int) * 1024 * 1024,
+        )
+        threading.Thread(
+            target=ThumbStore.remove_legacy_dir, args=(THUMBS_CACHE_DIR,), daemon=True
+        ).start()
+        self.thumbnails = ThumbnailCache(self.thumb_store, THUMB_MEMORY_CACHE_BYTES, self)
+        self.thumbnails.ready.connect(self._on_thumbnail_ready)
+        self._preview_thumb_key = ""
+
+        # Metadane (podgląd, skan kolejki, tytuły): wspólna pula z łączeniem żądań o ten sam URL
+        self.metadata = MetadataService(METADATA_WORKERS, self)
+        self._open_metadata_cache()
+        self._preview_url = ""
+        self._scan_pending: Set[str] = set()
+        self._scan_updated = 0
+        self._scan_total = 0
+        self._space_held: set = set()              # URL-e wstrzymane z braku miejsca na dysku
         self.pending_queue_check = False
         self.failed_dialog_shown = False
         self._user_stopped = False
 
+        self.retry_timer = QTimer(self)
+        self.retry_timer.setSingleShot(True)
+        self.retry_timer.timeout.connect(self._on_retry_due)
+
+        self.progress_flush_timer = QTimer(self)
+        self.progress_flush_timer.setInterval(PROGRESS_FLUSH_INTERVAL_MS)
+        self.progress_flush_timer.timeout.connect(self._flush_download_progress)
+
+        # wyniki skanu kolejki przychodzą po jednym — etykietę miejsca przeliczamy raz na serię
+        self.disk_projection_timer = QTimer(self)
+        self.disk_projection_timer.setSingleShot(True)
+        self.disk_projection_timer.setInterval(250)
+        self.disk_projection_timer.timeout.connect(self._update_disk_projection)
+
         self._clipboard_prev = ""
         self.clipboard_timer = QTimer(self)
         self.clipboard_timer.setInterval(1200)
@@ -166,6 +228,23 @@ class YTDLPGUI(
         local = Path(self.default_ffmpeg_path_local_fallback)
         return str(local) if local.exists() else "ffmpeg"
 
+    def get_aria2c_path(self) -> str:
+        """Ścieżka aria2c: ustawienia, potem katalog narzędzi aplikacji, potem PATH ("" = brak)."""
+        p = self.settings.value("aria2c_path", "", type=str).strip()
+        if p:
+            return p
+        local = Path(self.default_aria2c_path_local_fallback)
+        if local.exists():
+            return str(local)
+        return shutil.which("aria2c") or ""
+
+    def _active_engine(self) -> str:
+        """Wybrany silnik yt-dlp; bez modułu yt_dlp zawsze zewnętrzny plik wykonywalny."""
+        engine = self.ytdlp_engine.currentData()
+        if engine != ytdlp_engine.ENGINE_PROCESS and ytdlp_engine.is_available():
+            return engine
+        return ytdlp_engine.ENGINE_PROCESS
+
     def get_user_downloads_path(self) -> str:
         if os.name == "nt":
             import winreg
@@ -277,9 +356,10 @@ class YTDLPGUI(
         # --- Wyjście i postęp ---
         out_group = QGroupBox("Wyjście i postęp")
         out_layout = QVBoxLayout()
-        self.output_text = QTextEdit()
-        self.output_text.setReadOnly(True)
-        self.output_text.setLineWrapMode(QTextEdit.LineWrapMode.WidgetWidth)
+        self.output_text = ConsoleWidget(
+            max_lines=self.settings.value("console_max_lines", DEFAULT_MAX_LINES, type=int),
+            log_dir=log_dir,
+        )
         font = QFont("Consolas" if platform.system() == "Windows" else "Monospace", 9)
         self.output_text.setFont(font)
         out_layout.addWidget(self.output_text)
@@ -298,6 +378,10 @@ class YTDLPGUI(
         scan_btn.setIcon(style.standardIcon(QStyle.StandardPixmap.SP_BrowserReload))
         scan_btn.clicked.connect(self.scan_queue_metadata)
         actions_row.addWidget(scan_btn)
+        history_btn = QPushButton(" Historia pobrań")
+        history_btn.setIcon(style.standardIcon(QStyle.StandardPixmap.SP_FileDialogDetailedView))
+        history_btn.clicked.connect(self.open_history_dialog)
+        actions_row.addWidget(history_btn)
         actions_row.addStretch()
         out_layout.addLayout(actions_row)
         out_group.setLayout(out_layout)
@@ -369,17 +453,26 @@ class YTDLPGUI(
         self.save_settings()
         self.save_queue()
         timeout = 3000
-        for t in [self.thread, self.update_ytdlp_thread, self.download_ffmpeg_thread]:
+        downloads = list(self.active_downloads.values())
+        for t in downloads + [self.update_ytdlp_thread, self.download_ffmpeg_thread]:
             if t and t.isRunning():
-                if t is self.thread:
+                if t in downloads:
                     t.stop()
                 else:
                     t.quit()
                 if not t.wait(timeout):
                     t.terminate()
                     t.wait(1000)
-        for t in [self.preview_thread, self.batch_preview_thread, self.title_thread]:
-            if t and t.isRunning():
-                t.terminate()
-                t.wait(500)
+        self.metadata.close()
+        if self.metadata_cache:
+            self.metadata_cache.close()
+        self.save_queue()
+        self.queue_journal.close()
+        self.thumbnails.close()
+        self.thumb_store.close()
+        if self.history_db:
+            self.history_db.close()
+        self.output_text.close_log()
+        shutdown_shared_pool()
+        http_client.close()
         event.accept()
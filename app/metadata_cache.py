@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Trwała pamięć podręczna metadanych w SQLite (bez zależności od Qt).
+
+Przechowuje pola wyciągnięte przez `fetch_metadata` (tytuł, kanał, czas,
+klucz miniatury, lista formatów, szacowany rozmiar), kluczowane
+znormalizowanym URL-em i selektorem formatu z podglądu — szacowany rozmiar
+zależy od wybranego formatu. Wpisy starsze niż TTL są pomijane przy
+odczycie i usuwane przy starcie.
+
+Zapisy przychodzą z wątków usługi metadanych, odczyty z wątku GUI, więc
+połączenie jest współdzielone i chronione blokadą.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from .utils import normalize_url
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (
+    url         TEXT NOT NULL,      -- znormalizowany URL
+    fmt         TEXT NOT NULL,      -- selektor formatu użyty przy ekstrakcji
+    data        TEXT NOT NULL,      -- JSON z polami podglądu
+    fetched_at  REAL NOT NULL,
+    PRIMARY KEY (url, fmt)
+);
+CREATE INDEX IF NOT EXISTS idx_metadata_fetched ON metadata(fetched_at);
+"""
+
+# SQLite ogranicza liczbę parametrów zapytania (domyślnie 999 w starszych wersjach)
+_IN_CHUNK = 500
+
+
+class MetadataCache:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        with self._lock:
+            try:
+                self.conn.close()
+            except sqlite3.Error:
+                pass
+
+    def get(self, url: str, fmt: str, max_age: float) -> Optional[dict]:
+        return self.get_many([url], fmt, max_age).get(url)
+
+    def get_many(self, urls: Iterable[str], fmt: str, max_age: float) -> Dict[str, dict]:
+        """Świeże wpisy dla wielu URL-i naraz: URL (w postaci podanej) -> metadane."""
+        by_key: Dict[str, list] = {}
+        for u in urls:
+            by_key.setdefault(normalize_url(u), []).append(u)
+        keys = list(by_key)
+        since = time.time() - max_age
+        found: Dict[str, dict] = {}
+        with self._lock:
+            for i in range(0, len(keys), _IN_CHUNK):
+                chunk = keys[i:i + _IN_CHUNK]
+                rows = self.conn.execute(
+                    f"SELECT url, data FROM metadata WHERE fmt = ? AND fetched_at >= ? "
+                    f"AND url IN ({','.join('?' * len(chunk))})",
+                    [fmt, since, *chunk],
+                ).fetchall()
+                for key, data in rows:
+                    try:
+                        info = json.loads(data)
+                    except ValueError:
+                        continue
+                    for u in by_key[key]:
+                        found[u] = info
+        return found
+
+    def put(self, url: str, fmt: str, info: dict):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO metadata (url, fmt, data, fetched_at) VALUES (?, ?, ?, ?)",
+                (normalize_url(url), fmt, json.dumps(info, ensure_ascii=False), time.time()),
+            )
+            self.conn.commit()
+
+    def invalidate(self, urls: Optional[Iterable[str]] = None) -> int:
+        """Usuwa wpisy podanych URL-i (we wszystkich formatach) albo — bez argumentu — wszystkie."""
+        with self._lock:
+            if urls is None:
+                n = self.conn.execute("DELETE FROM metadata").rowcount
+            else:
+                keys = list({normalize_url(u) for u in urls})
+                n = 0
+                for i in range(0, len(keys), _IN_CHUNK):
+                    chunk = keys[i:i + _IN_CHUNK]
+                    n += self.conn.execute(
+                        f"DELETE FROM metadata WHERE url IN ({','.join('?' * len(chunk))})", chunk
+                    ).rowcount
+            self.conn.commit()
+        return n
+
+    def purge(self, max_age: float) -> int:
+        """Usuwa wpisy starsze niż `max_age` sekund."""
+        with self._lock:
+            n = self.conn.execute(
+                "DELETE FROM metadata WHERE fetched_at < ?", (time.time() - max_age,)
+            ).rowcount
+            self.conn.commit()
+        if n:
+            logger.debug(f"Usunięto {n} przeterminowanych wpisów metadanych.")
+        return n
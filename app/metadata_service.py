@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Wspólna usługa pobierania metadanych (podgląd, skan kolejki, tytuły).
+
+Zadania wykonuje ograniczona liczba wątków roboczych, uruchamianych leniwie.
+Żądania o ten sam klucz (URL + selektor formatu) są łączone: dopóki zadanie
+czeka lub trwa, kolejni chętni tylko dopisują się do listy odbiorców, a jeden
+wynik trafia do wszystkich (dymek kolejki, panel podglądu, tytuł pobierania).
+
+Żądania interaktywne (`priority=True`, np. podgląd) wskakują na początek
+kolejki przed skan całej kolejki. Odbiorcy są wywoływani w wątku GUI.
+"""
+
+import logging
+import threading
+from collections import deque
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+logger = logging.getLogger(__name__)
+
+OnResult = Callable[[dict], None]
+OnError = Optional[Callable[[str], None]]
+
+
+class MetadataService(QObject):
+    _finished = pyqtSignal(object, object, str)   # klucz, wynik (None przy błędzie), błąd
+
+    def __init__(self, max_workers: int, parent=None):
+        super().__init__(parent)
+        self.max_workers = max(1, max_workers)
+        self._cond = threading.Condition()
+        self._queue: deque = deque()                 # klucze czekające na wątek
+        self._jobs: Dict[Hashable, Callable[[], dict]] = {}
+        self._subscribers: Dict[Hashable, List[Tuple[OnResult, OnError]]] = {}
+        self._workers: List[threading.Thread] = []
+        self._idle = 0
+        self._stopping = False
+        self._finished.connect(self._deliver)
+
+    def request(self, key: Hashable, job: Callable[[], dict], on_result: OnResult,
+                on_error: OnError = None, priority: bool = False) -> bool:
+        """
+        Zleca `job` (wykonywany poza wątkiem GUI) albo dopina odbiorcę do
+        zadania o tym samym kluczu. Zwraca True, gdy powstało nowe zadanie.
+        """
+        if self._stopping:
+            return False
+        subs = self._subscribers.get(key)
+        if subs is not None:
+            subs.append((on_result, on_error))
+            if priority:
+                with self._cond:
+                    if key in self._jobs:   # jeszcze czeka — przesuwamy na początek
+                        self._queue.remove(key)
+                        self._queue.appendleft(key)
+            return False
+        self._subscribers[key] = [(on_result, on_error)]
+        with self._cond:
+            self._jobs[key] = job
+            if priority:
+                self._queue.appendleft(key)
+            else:
+                self._queue.append(key)
+            if len(self._queue) > self._idle and len(self._workers) < self.max_workers:
+                t = threading.Thread(target=self._work, name=f"metadata-{len(self._workers)}", daemon=True)
+                self._workers.append(t)
+                t.start()
+            self._cond.notify()
+        return True
+
+    def is_pending(self, key: Hashable) -> bool:
+        return key in self._subscribers
+
+    def pending_count(self) -> int:
+        return len(self._subscribers)
+
+    def close(self):
+        """Porzuca czekające zadania; trwające ekstrakcje kończą się same (mają własne limity czasu)."""
+        with self._cond:
+            self._stopping = True
+            self._queue.clear()
+            self._jobs.clear()
+            self._cond.notify_all()
+        self._subscribers.clear()
+
+    def _work(self):
+        while True:
+            with self._cond:
+                self._idle += 1
+                while not self._queue and not self._stopping:
+                    self._cond.wait()
+                self._idle -= 1
+                if self._stopping:
+                    return
+                key = self._queue.popleft()
+                job = self._jobs.pop(key)
+            try:
+                result, error = job(), ""
+            except Exception as e:
+                result, error = None, str(e) or e.__class__.__name__
+            if not self._stopping:
+                self._finished.emit(key, result, error)
+
+    def _deliver(self, key: Hashable, result: Optional[dict], error: str):
+        for on_result, on_error in self._subscribers.pop(key, []):
+            try:
+                if result is not None:
+                    on_result(result)
+                elif on_error is not None:
+                    on_error(error)
+            except Exception:
+                logger.exception(f"Błąd odbiorcy metadanych dla {key!r}")
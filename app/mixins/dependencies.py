@@ -4,6 +4,9 @@
 import re
 import subprocess
 
+from PyQt6.QtWidgets import QMessageBox
+
+from .. import ytdlp_engine
 from ..threads import DownloadFFmpegThread, UpdateYTDLPThread
 
 
@@ -18,6 +21,19 @@ class DependenciesMixin:
         self.update_ytdlp_thread.start()
         self.pending_queue_check = True
 
+    def _on_engine_changed(self, _index):
+        if self.ytdlp_engine.currentData() == ytdlp_engine.ENGINE_PROCESS:
+            return
+        if not ytdlp_engine.is_available():
+            QMessageBox.warning(
+                self, "Brak modułu yt_dlp",
+                "Wbudowany silnik i pula procesów wymagają pakietu Python 'yt-dlp' (pip install yt-dlp).\n"
+                "Pozostaję przy zewnętrznym pliku yt-dlp.",
+            )
+            self.ytdlp_engine.setCurrentIndex(
+                self.ytdlp_engine.findData(ytdlp_engine.ENGINE_PROCESS)
+            )
+
     def handle_ytdlp_update(self, success, message):
         self.output_text.append(message)
         self.ytdlp_path_input.setText(self.get_ytdlp_path())
@@ -2,25 +2,51 @@
 """Mixin: logika pobierania, kolejkowanie, retry, budowanie komendy yt-dlp."""
 
 import logging
+import os
 import shlex
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional
 
-from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QIcon
 from PyQt6.QtWidgets import (
     QDialog,
     QHBoxLayout,
     QLabel,
     QListWidget,
-    QListWidgetItem,
     QMessageBox,
     QPushButton,
     QVBoxLayout,
 )
 
-from ..config import DEFAULT_SOCKET_TIMEOUT
-from ..threads import TitleFetchThread, YTDLPThread
+from ..config import (
+    DEFAULT_SOCKET_TIMEOUT,
+    DISK_RESERVE_BYTES,
+    EXTERNAL_DOWNLOADER_FFMPEG,
+    QUEUE_AGING_S,
+    RETRY_BASE_DELAY_S,
+    RETRY_MAX_DELAY_S,
+)
+from ..progress_protocol import PROGRESS_ARGS, RESUME_STATE_TEMPLATE
+from ..queue_store import STATUS_FAILED
+from ..scheduler import (
+    effective_priority,
+    host_key,
+    host_limit,
+    order_queue,
+    parse_host_limits,
+    pick_next_by_lane,
+    retry_delay,
+    source_key,
+)
+from ..utils import free_space, human_duration, human_size, parse_rate
+from ..ytdlp_engine import ENGINE_INPROCESS, ENGINE_POOL, ENGINE_PROCESS
+from ..threads import (
+    BatchYTDLPThread,
+    InProcessYTDLPThread,
+    PooledYTDLPThread,
+    YTDLPThread,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -32,40 +58,31 @@ class DownloadMixin:
 
     def start_download(self, add_current_url: bool = True):
         self.failed_dialog_shown = False
-        if self.thread and self.thread.isRunning():
+        current_url = self.url_input.text().strip()
+        if self.active_downloads and not (add_current_url and current_url):
             QMessageBox.warning(self, "Pobieranie w toku", "Poczekaj na zakończenie obecnego pobierania.")
             return
 
-        current_url = self.url_input.text().strip()
         if add_current_url and current_url:
-            self.download_queue.append(current_url)
-            item = QListWidgetItem(current_url)
-            item.setData(self.queue_list.ROLE_STATUS, self.queue_list.STATUS_NORMAL)
-            self.queue_list.addItem(item)
+            if self.queue_store.add(current_url):
+                self._add_queue_row(current_url)
+                self._start_batch_preview([current_url])
             self.url_input.clear()
             self.save_queue()
-            self._start_batch_preview([current_url])
-        elif not self.download_queue and not self.failed_queue:
+        elif not len(self.queue_store):
             QMessageBox.warning(self, "Brak URL", "Wprowadź URL lub dodaj coś do kolejki.")
             return
 
-        if self.failed_queue and not self.download_queue:
+        n_failed = self.queue_store.count(STATUS_FAILED)
+        if n_failed and n_failed == len(self.queue_store):
             reply = QMessageBox.question(
                 self, "Ponów pobierania",
-                f"W kolejce są tylko nieudane pobrania ({len(self.failed_queue)}).\n"
+                f"W kolejce są tylko nieudane pobrania ({n_failed}).\n"
                 "Czy chcesz spróbować ponownie?",
                 QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
             )
             if reply == QMessageBox.StandardButton.Yes:
-                for url in self.failed_queue:
-                    if url not in self.download_queue:
-                        self.download_queue.append(url)
-                for i in range(self.queue_list.count()):
-                    it = self.queue_list.item(i)
-                    if it and it.text() in self.failed_queue:
-                        self.queue_list.mark_status(it, self.queue_list.STATUS_NORMAL, self.is_dark_theme())
-                self.failed_queue.clear()
-                self.item_retry_counts = {}
+                self._requeue_failed()
                 self.save_queue()
             else:
                 self.download_btn.setEnabled(True)
@@ -73,129 +90,470 @@ class DownloadMixin:
 
         self.start_next_in_queue()
 
-    def start_next_in_queue(self):
-        if not self.download_queue:
-            self.download_btn.setEnabled(True)
-            return
-        next_url = next((u for u in self.download_queue if u not in self.failed_queue), None)
-        if not next_url:
-            self.download_btn.setEnabled(True)
+    def _max_parallel_downloads(self) -> int:
+        return max(1, self.max_parallel_downloads.value())
+
+    def _busy_urls(self) -> set:
+        """URL-e w trakcie pobierania, łącznie z członkami uruchomień wsadowych."""
+        busy = set(self.active_downloads)
+        for members in self.active_batches.values():
+            busy.update(members)
+        return busy
+
+    def _pending_urls(self) -> List[str]:
+        """Elementy gotowe do pobrania (bez aktywnych, nieudanych i czekających na ponowienie)."""
+        busy = self._busy_urls()
+        now = time.time()
+        return [qi.url for qi in self.queue_store
+                if not qi.failed and qi.url not in busy
+                and not self.retry_schedule.is_waiting(qi.url, now)]
+
+    def _arm_retry_timer(self):
+        """Nastawia timer na najbliższe ponowienie (jeden timer dla całej kolejki)."""
+        due = self.retry_schedule.next_due()
+        if due is None:
+            self.retry_timer.stop()
             return
+        ms = int(max(0.0, due - time.time()) * 1000) + 250
+        self.retry_timer.start(min(ms, 2 ** 31 - 1))
+
+    def _on_retry_due(self):
+        ready = self.retry_schedule.pop_due(time.time())
+        self.queue_model.refresh_urls(ready)
+        if ready:
+            self.output_text.append(f"Mija czas oczekiwania — ponawiam {len(ready)} element(ów).")
+        self.start_next_in_queue()
+        if not self.active_downloads:
+            self._arm_retry_timer()
+
+    def _next_queued_url(self, candidates: List[str]) -> Optional[str]:
+        """Następny element spośród `candidates` (oczekujące dopuszczone przez kontrolę miejsca)."""
+        limits = parse_host_limits(self.host_concurrency_limits.text())
+        lanes = self._item_lanes(candidates)
+        ordered = order_queue(
+            candidates, self.queue_policy.currentData(), lanes,
+            {u: self._remaining_estimate(u) for u in candidates},
+            {u: self.queue_store.get(u).source_group for u in candidates},
+            [self._item_source(u) for u in self._busy_urls()],
+        )
+        return pick_next_by_lane(ordered, lanes, self.active_downloads.keys(), limits)
 
-        if self.thread and self.thread.isRunning():
-            logger.warning("start_next_in_queue: poprzedni wątek wciąż aktywny, oczekuję...")
-            self.thread.wait(3000)
-            if self.thread.isRunning():
-                logger.error("Wątek nie zakończył się w czasie — przerywam.")
-                return
+    def _item_source(self, url: str) -> str:
+        qi = self.queue_store.get(url)
+        return qi.source_group if qi else source_key(url)
 
-        self.current_processing_url = next_url
-        self.output_text.append(f"\n--- ROZPOCZYNAM POBIERANIE DLA: {next_url} ---")
-        self.progress_bar.setValue(0)
-        self.progress_bar.setFormat("0%")
+    def _item_lanes(self, urls: List[str]) -> Dict[str, int]:
+        """Tor priorytetu każdego elementu, podniesiony o czas oczekiwania w kolejce."""
+        now = time.time()
+        lanes = {}
+        for u in urls:
+            qi = self.queue_store.get(u)
+            lanes[u] = effective_priority(qi.priority, now - (qi.added_at or now), QUEUE_AGING_S)
+        return lanes
+
+    # =========================================================
+    # Kontrola miejsca na dysku
+    # =========================================================
 
-        if self.title_thread and self.title_thread.isRunning():
-            self.title_thread.wait(100)
-        self.title_thread = TitleFetchThread(self.get_ytdlp_path(), next_url, self)
-        self.title_thread.title_signal.connect(self._on_title_fetched)
-        self.title_thread.error_signal.connect(self._on_title_error)
-        self.title_thread.start()
+    def _output_dir(self) -> str:
+        """Katalog -P dla bieżącego trybu (jak w build_command)."""
+        mode = self._download_mode()
+        default = self.default_output_path.text().strip()
+        if mode == "audio":
+            return self.audio_output_path.text().strip() or default
+        if mode == "audio_adv":
+            return default
+        return self.output_path.text().strip() or default
+
+    def _download_dirs(self) -> List[Path]:
+        """Katalogi, w których yt-dlp zapisze dane: wyjściowy i ewentualny `-P temp:` z własnych argumentów."""
+        dirs = [Path(self._output_dir() or os.getcwd())]
+        try:
+            extra = shlex.split(self.custom_ytdlp_args.text())
+        except ValueError:
+            extra = self.custom_ytdlp_args.text().split()
+        for flag, value in zip(extra, extra[1:]):
+            if flag in ("-P", "--paths") and value.startswith("temp:"):
+                dirs.append(Path(value[len("temp:"):]))
+        return dirs
+
+    def _remaining_estimate(self, url: str) -> int:
+        """Ile bajtów element jeszcze zapisze (szacunek minus to, co już jest na dysku)."""
+        qi = self.queue_store.get(url)
+        est = qi.estimated_bytes if qi else 0
+        if not est:
+            return 0
+        rec = self.item_progress.get(url)
+        done = rec.downloaded_bytes if rec else qi.state.get("downloaded_bytes", 0)
+        return max(0, est - (done or 0))
+
+    def _free_space_by_dir(self) -> Dict[Path, Optional[int]]:
+        """Wolne miejsce w katalogach pobierania — liczone raz na przebieg dopuszczania."""
+        return {d: free_space(d) for d in self._download_dirs()}
+
+    def _fits_on_disk(self, url: str, committed: int, free_by_dir: Dict[Path, Optional[int]]) -> bool:
+        need = self._remaining_estimate(url)
+        if not need:
+            return True   # brak szacunku — nie blokujemy
+        for free in free_by_dir.values():
+            if free is not None and committed + need + DISK_RESERVE_BYTES > free:
+                return False
+        return True
+
+    def _admitted_urls(self) -> List[str]:
+        """
+        Oczekujące elementy, które zmieszczą się na dysku razem z tym, co jeszcze
+        dopiszą aktywne pobierania. Za duże są wstrzymywane (mniejsze mogą je wyprzedzić).
+        """
+        pending = self._pending_urls()
+        if not self.disk_space_check.isChecked():
+            self._space_held.clear()
+            return pending
+        committed = sum(self._remaining_estimate(u) for u in self._busy_urls())
+        free_by_dir = self._free_space_by_dir()
+        admitted = []
+        for u in pending:
+            if self._fits_on_disk(u, committed, free_by_dir):
+                admitted.append(u)
+                self._space_held.discard(u)
+            elif u not in self._space_held:
+                self._space_held.add(u)
+                self.output_text.append(
+                    f"Za mało miejsca na dysku dla ≈ {human_size(self._remaining_estimate(u))} — "
+                    f"wstrzymano: {u}"
+                )
+        return admitted
+
+    def _schedule_disk_projection(self):
+        """Odświeżenie etykiety miejsca za chwilę — seria zmian (np. wyniki skanu) liczy ją raz."""
+        self.disk_projection_timer.start()
+
+    def _update_disk_projection(self):
+        """Etykieta pod kolejką: szacowane miejsce potrzebne na resztę kolejki vs wolne miejsce."""
+        items = [qi for qi in self.queue_store if not qi.failed]
+        total = sum(self._remaining_estimate(qi.url) for qi in items)
+        unknown = sum(1 for qi in items if not qi.estimated_bytes)
+        out_dir = self._output_dir() or os.getcwd()
+        free = free_space(out_dir)
+        text = f"Potrzebne miejsce: ≈ {human_size(total) if total else '0 B'}"
+        if unknown:
+            text += f" (+{unknown} bez szacunku)"
+        if free is not None:
+            text += f" | wolne: {human_size(free)}"
+        self.disk_usage_label.setText(text)
+        over = free is not None and total + DISK_RESERVE_BYTES > free
+        self.disk_usage_label.setStyleSheet("color: #d9534f; font-weight: bold;" if over else "")
+        self.disk_usage_label.setToolTip(
+            f"Katalog wyjściowy: {out_dir}\n"
+            f"Wstrzymane z braku miejsca: {len(self._space_held)}" if self._space_held
+            else f"Katalog wyjściowy: {out_dir}"
+        )
 
-        command = self.build_command(next_url)
-        if not command:
-            self.download_finished(False)
-            return
+    def _collect_batch(self, url: str, candidates: List[str]) -> List[str]:
+        """
+        Dobiera do `url` kolejne elementy z tego samego serwisu spośród
+        dopuszczonych `candidates`, które można pobrać jednym uruchomieniem
+        yt-dlp (--batch-file). Przy kontroli miejsca cała paczka musi się
+        zmieścić na dysku razem z tym, co dopiszą aktywne pobierania.
+        """
+        size = self.batch_size.value()
+        if (size <= 1 or self._active_engine() != ENGINE_PROCESS
+                or self.use_archive.isChecked() or self.queue_store.get(url).retries
+                or self._resume_format(url)):
+            # Pominięte przez archiwum elementy nie trafiają do pliku wyników,
+            # a ponowienia i wznowienia idą pojedynczo.
+            return [url]
+        host = host_key(url)
+        lane = self.queue_store.get(url).priority
+        check_space = self.disk_space_check.isChecked()
+        free_by_dir = self._free_space_by_dir() if check_space else {}
+        committed = sum(self._remaining_estimate(u) for u in self._busy_urls()) + self._remaining_estimate(url)
+        batch = [url]
+        for u in candidates:
+            if len(batch) >= size:
+                break
+            qi = self.queue_store.get(u)
+            if (u == url or host_key(u) != host or qi.retries or qi.priority != lane
+                    or self._resume_format(u)):
+                continue
+            if check_space and not self._fits_on_disk(u, committed, free_by_dir):
+                continue
+            batch.append(u)
+            committed += self._remaining_estimate(u)
+        return batch
 
-        self.thread = YTDLPThread(command, self)
-        self.thread.progress_signal.connect(self.update_progress)
-        self.thread.finished_signal.connect(self.download_finished)
-        self.thread.progress_percent_signal.connect(self.update_progress_percent)
-        self.thread.progress_detailed_signal.connect(self.update_detailed_progress)
-        self.thread.start()
-        self.download_btn.setEnabled(False)
-        self.stop_btn.setEnabled(True)
+    def start_next_in_queue(self):
+        """Wypełnia wolne sloty pobierania kolejnymi elementami z kolejki."""
+        while len(self.active_downloads) < self._max_parallel_downloads():
+            # po każdym starcie rośnie to, co dopiszą aktywne pobierania — dopuszczamy od nowa
+            candidates = self._admitted_urls()
+            next_url = self._next_queued_url(candidates)
+            if not next_url:
+                break
+            rate = self._acquire_bandwidth(next_url)
+            if rate == 0:
+                # cały globalny budżet zajęty – czekamy aż któreś pobieranie go zwolni
+                break
+            batch = self._collect_batch(next_url, candidates)
+            if len(batch) > 1:
+                if not self._start_batch_download(batch, rate):
+                    break
+            elif not self._start_item_download(next_url, rate):
+                break
+        if not self.active_downloads and self._space_held:
+            self.output_text.append(
+                f"Wstrzymano {len(self._space_held)} element(ów) z braku miejsca na dysku. "
+                "Zwolnij miejsce lub zmień katalog wyjściowy i uruchom kolejkę ponownie."
+            )
+        self._apply_live_rates()
+        self._arm_retry_timer()
+        self._update_download_buttons()
+
+    def _acquire_bandwidth(self, url: str) -> Optional[int]:
+        self.bandwidth.set_budget(parse_rate(self.global_rate_limit.text()))
+        pending = len(self._pending_urls())
+        expected = min(self._max_parallel_downloads(), len(self.active_downloads) + max(1, pending))
+        return self.bandwidth.acquire(url, expected, live=self._active_engine() != ENGINE_PROCESS)
+
+    def _apply_live_rates(self):
+        """Przekazuje przeliczone udziały budżetu do pobierań, które obsługują zmianę limitu w locie."""
+        static = parse_rate(self.limit_rate.text())
+        for url, rate in self.bandwidth.live_shares().items():
+            thread = self.active_downloads.get(url)
+            if isinstance(thread, (InProcessYTDLPThread, PooledYTDLPThread)):
+                thread.set_rate_limit(min(rate, static) if static else rate)
+
+    def _start_item_download(self, url: str, rate_limit: Optional[int] = None) -> bool:
+        self.output_text.append(f"\n--- ROZPOCZYNAM POBIERANIE DLA: {url} ---")
+        if rate_limit:
+            self.output_text.append(f"Przydzielony limit prędkości: {human_size(rate_limit)}/s")
+        self.progress_bar.setValue(0)
+        self.progress_bar.setFormat("0%")
 
-    def _on_title_fetched(self, url: str, title: str):
-        if self.current_processing_url == url and title:
-            self.current_video_title = title
+        command = self.build_command(url, rate_limit)
+        if not command:
+            self.download_finished(False, url)
+            return False
+        if fid := self._resume_format(url):
+            done = self.queue_store.get(url).state.get("downloaded_bytes") or 0
+            self.output_text.append(
+                f"Wznawiam częściowe pobieranie ({human_size(done)} na dysku), format {fid}."
+            )
+        command = self._with_history_tracking(self._with_resume_tracking(command, url), url)
+        self._history_started([url])
+
+        engine = self._active_engine()
+        # tytuł z pamięci metadanych; bez niej — z pierwszej linii postępu samego pobierania
+        cached = self._cached_metadata([url], self._build_format_string_for_preview()[0]).get(url)
+        if cached and cached.get("title"):
+            self.item_titles[url] = cached["title"]
+        elif not self.structured_progress.isChecked():
+            # bez ustrukturyzowanego postępu tytułu nie poda też samo pobieranie
+            self._request_missing_titles([url])
+
+        thread_cls = {
+            ENGINE_INPROCESS: InProcessYTDLPThread,
+            ENGINE_POOL: PooledYTDLPThread,
+        }.get(engine, YTDLPThread)
+        thread = thread_cls(command, self)
+        thread.finished_signal.connect(lambda ok, u=url: self.download_finished(ok, u))
+        self.active_downloads[url] = thread
+        thread.start()
+        if not self.progress_flush_timer.isActive():
+            self.progress_flush_timer.start()
+        return True
+
+    def _start_batch_download(self, urls: List[str], rate_limit: Optional[int] = None) -> bool:
+        """Uruchamia jeden proces yt-dlp dla paczki URL-i o identycznych opcjach."""
+        leader = urls[0]
+        command = self.build_command(leader, rate_limit)
+        if not command:
+            self.download_finished(False, leader)
+            return False
+        members = [leader]
+        for u in urls[1:]:
+            # tylko elementy, dla których komenda różni się wyłącznie URL-em
+            # (np. CDA premium wymaga innych argumentów niż zwykłe filmy)
+            cmd = self.build_command(u, rate_limit)
+            if cmd and cmd[:-1] == command[:-1]:
+                members.append(u)
+        if len(members) == 1:
+            return self._start_item_download(leader, rate_limit)
+
+        self.output_text.append(
+            f"\n--- ROZPOCZYNAM POBIERANIE WSADOWE ({len(members)} URL) ---\n" + "\n".join(members)
+        )
+        if rate_limit:
+            self.output_text.append(f"Przydzielony limit prędkości: {human_size(rate_limit)}/s")
+        self.progress_bar.setValue(0)
+        self.progress_bar.setFormat("0%")
 
-    def _on_title_error(self, url: str, err: str):
-        logger.warning(f"Nie udało się pobrać tytułu dla {url}: {err}")
+        command = self._with_history_tracking(self._with_resume_tracking(command, leader), leader)
+        self._history_started(members)
+        thread = BatchYTDLPThread(command, members, self)
+        thread.finished_signal.connect(lambda ok, u=leader: self._batch_finished(ok, u))
+        self.active_batches[leader] = members
+        self.active_downloads[leader] = thread
+        # postęp paczki nie rozróżnia elementów — tytuły z pamięci metadanych albo z usługi
+        self._request_missing_titles(members)
+        thread.start()
+        if not self.progress_flush_timer.isActive():
+            self.progress_flush_timer.start()
+        return True
+
+    def _request_missing_titles(self, urls: List[str]):
+        """Tytuły pobieranych URL-i z pamięci metadanych, a gdy ich tam nie ma — z usługi metadanych."""
+        for u in urls:
+            if u not in self.item_titles:
+                self._request_metadata(
+                    u,
+                    lambda info, u=u: self._on_title_fetched(u, info),
+                    lambda err, u=u: logger.warning(f"Nie udało się pobrać tytułu dla {u}: {err}"),
+                )
+
+    def _on_title_fetched(self, url: str, info: dict):
+        self._apply_item_preview(url, info)
+        title = info.get("title")
+        downloading = url in self.active_downloads or any(url in m for m in self.active_batches.values())
+        if title and downloading and url not in self.item_titles:
+            self.item_titles[url] = title
+
+    def _with_resume_tracking(self, command: list, key_url: str) -> list:
+        """Dopisuje przed URL-em zapis formatu i nazwy pliku do pliku stanu wznawiania."""
+        path = self._resume_state_file(key_url)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return command[:-1] + ["--print-to-file", RESUME_STATE_TEMPLATE, str(path), command[-1]]
+
+    def _batch_finished(self, success: bool, leader: str):
+        self._collect_resume_state(self._resume_state_file(leader))
+        members = self.active_batches.pop(leader, [leader])
+        thread = self.active_downloads.get(leader)
+        succeeded = getattr(thread, "succeeded", set())
+        self._history_finish(leader, {u: self._history_result(u in succeeded) for u in members})
+        if not self._user_stopped:
+            self.output_text.append(
+                f"Paczka zakończona: {len(succeeded)}/{len(members)} pobranych pomyślnie."
+            )
+            for u in members[1:]:
+                self._finish_queue_item(u in succeeded, u)
+        self.download_finished(leader in succeeded, leader)
+
+    def _update_download_buttons(self):
+        running = bool(self.active_downloads)
+        if not running:
+            self.progress_flush_timer.stop()
+        self.download_btn.setEnabled(not running)
+        self.stop_btn.setEnabled(running)
+        waiting = self.retry_schedule.waiting(time.time())
+        if running:
+            self.statusBar().showMessage(
+                f"Aktywne pobierania: {len(self.active_downloads)}/{self._max_parallel_downloads()}"
+            )
+        elif waiting and self.retry_timer.isActive():
+            self.statusBar().showMessage(
+                f"Oczekiwanie na ponowienie: {len(waiting)} (najbliższe za "
+                f"{human_duration(self.retry_timer.remainingTime() // 1000)})"
+            )
+        else:
+            self.statusBar().clearMessage()
 
     def stop_download(self):
-        if self.thread and self.thread.isRunning():
+        running = [t for t in self.active_downloads.values() if t.isRunning()]
+        self.retry_timer.stop()
+        if running:
             self._user_stopped = True
-            self.thread.stop()
+            for t in running:
+                t.stop()
             self.output_text.append("\nZatrzymuję pobieranie...")
             self.download_btn.setEnabled(True)
             self.stop_btn.setEnabled(False)
 
-    def download_finished(self, success: bool):
-        self.stop_btn.setEnabled(False)
+    def download_finished(self, success: bool, url: Optional[str] = None):
+        thread = self.active_downloads.pop(url, None)
+        if thread is not None:
+            self._drain_download(url, thread)
+        if url:
+            self._collect_resume_state(self._resume_state_file(url))
+            self._history_finish(url, {url: self._history_result(success)})
+        self.item_progress.pop(url, None)
+        self._resume_checkpoint_at.pop(url, None)
+        self.queue_model.refresh(url)
+        self.bandwidth.release(url)
+        self._apply_live_rates()
         self.progress_bar.setFormat("%p%")
-        cur = getattr(self, "current_processing_url", None)
 
         if self._user_stopped:
-            self._user_stopped = False
-            self.current_video_title = "Unknown"
-            self.current_processing_url = None
-            self.download_btn.setEnabled(True)
-            self.output_text.append("Pobieranie zatrzymane przez użytkownika.")
-            return
-
-        if self.download_queue and cur and cur == self.download_queue[0]:
-            finished_url = self.download_queue.pop(0)
-            items = self.queue_list.findItems(finished_url, Qt.MatchFlag.MatchExactly)
-            if items:
-                item = items[0]
-                row = self.queue_list.row(item)
-                self.queue_list.takeItem(row)
-                if not success:
-                    self._handle_retry_or_fail(finished_url, row)
-                else:
-                    self.output_text.append("Pobieranie zakończone pomyślnie.")
+            self.item_titles.pop(url, None)
+            self._refresh_queue_row(url)
             self.save_queue()
-            self.url_input.clear()
+            if not self.active_downloads:
+                self._user_stopped = False
+                self._update_download_buttons()
+                self.output_text.append("Pobieranie zatrzymane przez użytkownika.")
+            return
 
-        self.current_video_title = "Unknown"
-        self.current_processing_url = None
+        self._finish_queue_item(success, url)
 
-        remaining = [u for u in self.download_queue if u not in self.failed_queue]
+        remaining = self._pending_urls()
         if remaining:
             self.output_text.append(f"Pozostało {len(remaining)} elementów. Rozpoczynam następny...")
             self.start_next_in_queue()
         else:
-            self._handle_queue_completion()
-
-    def _handle_retry_or_fail(self, url: str, row: int):
-        retry_count = self.item_retry_counts.get(url, 0)
-        max_retry   = self.max_retry_per_item.value()
-        if retry_count < max_retry:
-            self.item_retry_counts[url] = retry_count + 1
-            retry_item = QListWidgetItem(url)
-            self.queue_list.mark_status(retry_item, self.queue_list.STATUS_RETRYING, self.is_dark_theme())
-            self.queue_list.addItem(retry_item)
-            self.download_queue.append(url)
+            if not self.active_downloads and self.retry_schedule.next_due() is not None:
+                self._arm_retry_timer()
+                self.output_text.append(
+                    f"Czekam na ponowienie {len(self.retry_schedule.waiting(time.time()))} element(ów)..."
+                )
+            self._update_download_buttons()
+            if not self.active_downloads and not self.retry_timer.isActive():
+                self._handle_queue_completion()
+
+    def _finish_queue_item(self, success: bool, url: Optional[str]):
+        """Zdejmuje zakończony element z kolejki: sukces albo ponowienie / lista nieudanych."""
+        qi = self.queue_store.get(url) if url else None
+        if qi and not qi.failed:
+            if success:
+                self._remove_queue_item(url)
+                self.output_text.append(f"Pobieranie zakończone pomyślnie: {url}")
+            else:
+                self._handle_retry_or_fail(url)
+            self.save_queue()
+            self.url_input.clear()
+        self.item_titles.pop(url, None)
+
+    def _handle_retry_or_fail(self, url: str):
+        qi = self.queue_store.get(url)
+        max_retry = self.max_retry_per_item.value()
+        title = self.item_titles.get(url, "Unknown")
+        if qi.retries < max_retry:
+            qi.retries += 1
+            self.queue_store.touch(url)
+            # Nie od razu: chwilowa awaria serwisu zjadłaby cały limit ponowień w minutę
+            delay = retry_delay(qi.retries, RETRY_BASE_DELAY_S, RETRY_MAX_DELAY_S)
+            self.retry_schedule.schedule(url, time.time() + delay)
+            # ponowienie trafia na koniec kolejki
+            self.queue_store.move_to_end(url)
+            self.queue_model.move_to_end(url)
+            self.queue_model.refresh(url)
             self.output_text.append(
-                f"Ponawiam później ({self.item_retry_counts[url]}/{max_retry}): {url}"
+                f"Ponawiam za {human_duration(delay)} ({qi.retries}/{max_retry}): {url}"
             )
         else:
-            if url not in self.failed_queue:
-                self.failed_queue.append(url)
-            failed_item = QListWidgetItem(url)
-            self.queue_list.mark_status(failed_item, self.queue_list.STATUS_FAILED, self.is_dark_theme())
-            self.queue_list.insertItem(row, failed_item)
+            self.retry_schedule.cancel(url)
+            self._set_item_status(url, STATUS_FAILED)
+            self._refresh_queue_row(url)
             self.output_text.append(
-                f"--- BŁĄD ---\nNieudane pobieranie: {url}\nTytuł: {self.current_video_title}\nZapisano do listy nieudanych."
+                f"--- BŁĄD ---\nNieudane pobieranie: {url}\nTytuł: {title}\nZapisano do listy nieudanych."
             )
-            self.failed_logger.info(f"FAILED_URL: {url} | TITLE: {self.current_video_title}")
+            self.failed_logger.info(f"FAILED_URL: {url} | TITLE: {title}")
 
     def _handle_queue_completion(self):
-        if self.failed_queue and not self.failed_dialog_shown:
-            self.output_text.append(f"Kolejka zakończona. {len(self.failed_queue)} nieudanych.")
+        n_failed = self.queue_store.count(STATUS_FAILED)
+        if n_failed and not self.failed_dialog_shown:
+            self.output_text.append(f"Kolejka zakończona. {n_failed} nieudanych.")
             self.failed_dialog_shown = True
             self._show_failed_downloads_dialog()
-        elif not self.failed_queue and not self.download_queue:
+        elif not len(self.queue_store):
             self.output_text.append("Kolejka jest pusta. Pobieranie zakończone.")
             self.download_btn.setEnabled(True)
 
@@ -205,9 +563,10 @@ class DownloadMixin:
         dialog.setModal(True)
         dialog.resize(560, 360)
         lay = QVBoxLayout(dialog)
-        lay.addWidget(QLabel(f"Znaleziono {len(self.failed_queue)} nieudanych pobierań:"))
+        failed = self.queue_store.urls(STATUS_FAILED)
+        lay.addWidget(QLabel(f"Znaleziono {len(failed)} nieudanych pobierań:"))
         failed_list = QListWidget()
-        for url in self.failed_queue:
+        for url in failed:
             failed_list.addItem(url)
         lay.addWidget(failed_list)
         btn_row = QHBoxLayout()
@@ -228,36 +587,22 @@ class DownloadMixin:
         dialog.close()
         self.download_btn.setEnabled(True)
 
+    def _requeue_failed(self) -> List[str]:
+        moved = self.queue_store.requeue_failed()
+        self.queue_model.refresh_urls(moved)
+        return moved
+
     def _retry_failed_downloads(self, dialog: QDialog):
-        to_move = list(self.failed_queue)
-        for i in range(self.queue_list.count()):
-            it = self.queue_list.item(i)
-            if it and it.text() in to_move:
-                self.queue_list.mark_status(it, self.queue_list.STATUS_NORMAL, self.is_dark_theme())
-        for url in to_move:
-            if url not in self.download_queue:
-                self.download_queue.append(url)
-        self.failed_queue.clear()
-        self.item_retry_counts = {}
+        moved = self._requeue_failed()
         self.save_queue()
-        self.output_text.append(f"Przeniesiono {len(to_move)} nieudanych z powrotem do kolejki.")
+        self.output_text.append(f"Przeniesiono {len(moved)} nieudanych z powrotem do kolejki.")
         self.failed_dialog_shown = False
         dialog.close()
         self.start_next_in_queue()
 
     def _clear_failed_downloads(self, dialog: QDialog):
-        to_remove = []
-        for i in range(self.queue_list.count()):
-            it = self.queue_list.item(i)
-            if it and self.queue_list.is_failed_item(it):
-                to_remove.append((i, it.text()))
-        for i, url in reversed(to_remove):
-            self.queue_list.takeItem(i)
-            if url in self.download_queue:
-                self.download_queue.remove(url)
-        self.failed_queue.clear()
-        self.save_queue()
-        self.output_text.append(f"Usunięto {len(to_remove)} nieudanych z kolejki.")
+        removed = self.remove_failed_items()
+        self.output_text.append(f"Usunięto {removed} nieudanych z kolejki.")
         self.failed_dialog_shown = False
         dialog.close()
         self.download_btn.setEnabled(True)
@@ -266,9 +611,51 @@ class DownloadMixin:
     # Budowanie komendy yt-dlp
     # =========================================================
 
-    def build_command(self, url: str) -> Optional[list]:
+    def _external_downloader_args(self, url: str) -> list:
+        """Argumenty --downloader / --downloader-args wg ustawień i profilu serwisu."""
+        name = self.external_downloader.currentData()
+        protocols = [p for p, cb in self.downloader_protocols.items() if cb.isChecked()]
+        if not name or not protocols:
+            return []
+        if name == EXTERNAL_DOWNLOADER_FFMPEG:
+            return [arg for p in protocols for arg in ("--downloader", f"{p}:ffmpeg")]
+
+        aria2c = self.aria2c_path.text().strip() or self.get_aria2c_path()
+        if not aria2c or (Path(aria2c).is_absolute() and not Path(aria2c).is_file()):
+            if not getattr(self, "_aria2c_missing_warned", False):
+                self._aria2c_missing_warned = True
+                self.output_text.append(
+                    "OSTRZEŻENIE: Nie znaleziono aria2c — pobieram bez zewnętrznego downloadera."
+                )
+            return []
+        profiles = parse_host_limits(self.downloader_host_profiles.text(), minimum=0)
+        conns = host_limit(host_key(url), profiles)
+        if conns is None:
+            conns = self.aria2_connections.value()
+        if conns == 0:
+            return []
+        conns = min(conns, 16)   # aria2c nie przyjmuje -x > 16
+        args = [arg for p in protocols for arg in ("--downloader", f"{p}:{aria2c}")]
+        args += [
+            "--downloader-args",
+            f"aria2c:-x {conns} -s {self.aria2_split.value()} -k 1M --file-allocation=none",
+        ]
+        return args
+
+    def _download_mode(self) -> str:
+        mode = "audio_adv" if self.extract_audio_adv.isChecked() else (
+            "audio" if getattr(self, '_mode_audio', None) and self._mode_audio.isChecked()
+            else ("video_only" if getattr(self, '_mode_video', None) and self._mode_video.isChecked()
+                  else "video")
+        )
+        # fallback dla starego kodu (extract_audio checkbox)
+        if mode == "video" and hasattr(self, 'extract_audio') and self.extract_audio.isChecked():
+            mode = "audio"
+        return mode
+
+    def build_command(self, url: str, rate_limit: Optional[int] = None) -> Optional[list]:
         ytdlp = self.get_ytdlp_path()
-        if ytdlp != "yt-dlp" and not Path(ytdlp).exists():
+        if ytdlp != "yt-dlp" and not Path(ytdlp).exists() and self._active_engine() == ENGINE_PROCESS:
             QMessageBox.critical(self, "Błąd YT-DLP", f"Nie znaleziono YT-DLP: '{ytdlp}'.")
             return None
         cmd = [ytdlp]
@@ -281,6 +668,8 @@ class DownloadMixin:
                 self.output_text.append(f"OSTRZEŻENIE: Ścieżka FFmpeg '{ffmpeg}' nie jest plikiem.")
 
         cmd += ["--socket-timeout", str(DEFAULT_SOCKET_TIMEOUT)]
+        if self.structured_progress.isChecked():
+            cmd += PROGRESS_ARGS
 
         vfmt   = self.video_format.currentText()
         vqual  = self.video_quality.currentText()
@@ -288,16 +677,8 @@ class DownloadMixin:
         afmt   = self.audio_format.currentText()
         aqi    = self.audio_quality.currentIndex()
         recode = self.recode_video.currentText()
-        extract_adv = self.extract_audio_adv.isChecked()
 
-        mode = "audio_adv" if extract_adv else (
-            "audio" if getattr(self, '_mode_audio', None) and self._mode_audio.isChecked()
-            else ("video_only" if getattr(self, '_mode_video', None) and self._mode_video.isChecked()
-                  else "video")
-        )
-        # fallback dla starego kodu (extract_audio checkbox)
-        if mode == "video" and hasattr(self, 'extract_audio') and self.extract_audio.isChecked():
-            mode = "audio"
+        mode = self._download_mode()
 
         if recode != "Nie przetwarzaj":
             cmd += ["--recode-video", recode]
@@ -354,15 +735,28 @@ class DownloadMixin:
             out_path = self.output_path.text().strip() or self.default_output_path.text().strip()
             out_tmpl = self.output_template.text().strip() or self.default_template.text().strip()
 
+        if fid := self._resume_format(url):
+            # Wznowienie: ten sam format co poprzednio, żeby yt-dlp dopisał do istniejącego .part
+            if "-f" in cmd:
+                i = cmd.index("-f")
+                del cmd[i:i + 2]
+            cmd += ["-f", fid]
+
         if out_path: cmd += ["-P", out_path]
         if out_tmpl: cmd += ["-o", out_tmpl]
 
-        if r := self.limit_rate.text().strip():    cmd += ["-r", r]
+        r = self.limit_rate.text().strip()
+        if rate_limit:
+            static = parse_rate(r)
+            cmd += ["-r", str(min(rate_limit, static) if static else rate_limit)]
+        elif r:
+            cmd += ["-r", r]
         if v := self.retries.value():              cmd += ["--retries", str(v)]
         if self.write_subs.isChecked():            cmd.append("--write-subs")
         if self.write_auto_subs.isChecked():       cmd.append("--write-auto-subs")
         if self.write_info_json.isChecked():       cmd.append("--write-info-json")
         if self.prefer_ffmpeg.isChecked():         cmd.append("--prefer-ffmpeg")
+        cmd += self._external_downloader_args(url)
 
         # playlista - uwzględniamy nowe radio buttony
         _pl_single_active = getattr(self, '_pl_single', None) and self._pl_single.isChecked()
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""Mixin: historia pobrań (zapis do bazy SQLite, czasy faz, okno historii)."""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from ..config import PARTIAL_STATE_DIR
+from ..history_db import STATUS_FAILED, STATUS_OK, STATUS_STOPPED, HistoryDB
+from ..history_widget import HistoryDialog
+from ..progress_protocol import HISTORY_TEMPLATE, parse_history_lines
+
+logger = logging.getLogger(__name__)
+
+
+class HistoryMixin:
+    def _open_history_db(self):
+        try:
+            self.history_db: Optional[HistoryDB] = HistoryDB(self.appdata_dir / "history.sqlite3")
+        except sqlite3.Error as e:
+            logger.error(f"Nie udało się otworzyć historii pobrań: {e}", exc_info=True)
+            self.history_db = None
+            return
+        self._recover_history_files()
+
+    def open_history_dialog(self):
+        if not self.history_db:
+            self.output_text.append("Historia pobrań jest niedostępna (błąd bazy danych).")
+            return
+        HistoryDialog(self.history_db, self).exec()
+
+    # =========================================================
+    # Czasy faz pobierania
+    # =========================================================
+
+    def _history_started(self, urls: List[str]):
+        now = time.time()
+        for u in urls:
+            qi = self.queue_store.get(u)
+            self.item_timing[u] = {
+                "started": now,
+                "queued_s": now - qi.added_at if qi and qi.added_at else None,
+                "attempt": qi.retries + 1 if qi else 1,
+                "postprocess_s": 0.0,
+                "pp_since": None,
+            }
+
+    def _history_phase(self, url: str, record):
+        """
+        Rozdziela czas uruchomienia na pobieranie i przetwarzanie: od "finished"
+        lub rekordu postprocesora do kolejnego "downloading" (playlisty) liczy
+        się przetwarzanie.
+        """
+        t = self.item_timing.get(url)
+        if t is None:
+            return
+        now = time.time()
+        if record.status == "downloading" and not record.postprocessor:
+            if t["pp_since"] is not None:
+                t["postprocess_s"] += now - t["pp_since"]
+                t["pp_since"] = None
+        elif t["pp_since"] is None:
+            t["pp_since"] = now
+
+    # =========================================================
+    # Zapis do historii
+    # =========================================================
+
+    def _history_file(self, url: str) -> Path:
+        return PARTIAL_STATE_DIR / f"{hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]}.done"
+
+    def _with_history_tracking(self, command: list, key_url: str) -> list:
+        """Dopisuje przed URL-em zapis danych gotowych plików (after_move) do pliku historii."""
+        if not self.history_db:
+            return command
+        path = self._history_file(key_url)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return command[:-1] + ["--print-to-file", HISTORY_TEMPLATE, str(path), command[-1]]
+
+    def _read_history_file(self, path: Path) -> List[dict]:
+        try:
+            text = path.read_text(encoding="utf-8", errors="ignore")
+        except OSError:
+            return []
+        try:
+            path.unlink()
+        except OSError:
+            pass
+        return parse_history_lines(text)
+
+    def _history_finish(self, key_url: str, results: Dict[str, str]):
+        """
+        Zapisuje wynik uruchomienia yt-dlp: wiersz na każdy gotowy plik, a dla
+        elementów bez plików (błąd, zatrzymanie, pominięcie) jeden wiersz ze statusem.
+        `results` to URL z kolejki -> status (dla paczki: wszyscy jej członkowie).
+        """
+        timing = self.item_timing.pop(key_url, None)
+        for u in results:
+            if u != key_url:
+                self.item_timing.pop(u, None)
+        entries = self._read_history_file(self._history_file(key_url))
+        if not self.history_db or timing is None:
+            return
+        now = time.time()
+        if timing["pp_since"] is not None:
+            timing["postprocess_s"] += now - timing["pp_since"]
+        run_s = now - timing["started"]
+        download_s = max(0.0, run_s - timing["postprocess_s"])
+
+        # wpisy przypisujemy do elementów kolejki po original_url (w paczce),
+        # a w pojedynczym uruchomieniu (np. playlista) wszystkie należą do jednego URL-a
+        by_member: Dict[str, List[dict]] = {u: [] for u in results}
+        for e in entries:
+            if len(results) == 1:
+                by_member[key_url].append(e)
+                continue
+            owner = next((u for u in results if u in (e.get("original_url"), e.get("webpage_url"))), None)
+            by_member.setdefault(owner, []).append(e)
+
+        sizes = {id(e): self._entry_bytes(e) for e in entries}
+        total_bytes = sum(sizes.values())
+        rows = []
+        for member, member_entries in by_member.items():
+            status = results.get(member, STATUS_OK)
+            common = {
+                "started_at": timing["started"], "finished_at": now,
+                "queued_s": timing["queued_s"], "attempt": timing["attempt"],
+            }
+            if member_entries and status == STATUS_OK:
+                for e in member_entries:
+                    size = sizes[id(e)]
+                    # czas paczki / playlisty dzielimy proporcjonalnie do rozmiaru plików
+                    share = size / total_bytes if total_bytes else 1.0 / len(entries)
+                    url = e.get("webpage_url") or e.get("original_url") or member
+                    rows.append(dict(
+                        common,
+                        url=url,
+                        source_url=member if member and member != url else None,
+                        extractor=e.get("extractor_key"),
+                        video_id=e.get("id"),
+                        title=e.get("title"),
+                        filepath=e.get("filepath"),
+                        bytes=size or None,
+                        duration=e.get("duration"),
+                        download_s=download_s * share,
+                        postprocess_s=timing["postprocess_s"] * share,
+                        avg_speed=size / (download_s * share) if size and download_s else None,
+                        status=STATUS_OK,
+                    ))
+            elif member:
+                rows.append(dict(
+                    common, url=member, title=self.item_titles.get(member),
+                    download_s=download_s if len(results) == 1 else None, status=status,
+                ))
+        try:
+            for row in rows:
+                self.history_db.add(**row)
+        except sqlite3.Error as e:
+            logger.error(f"Błąd zapisu historii pobrań: {e}", exc_info=True)
+
+    @staticmethod
+    def _entry_bytes(entry: dict) -> int:
+        path = entry.get("filepath")
+        if path:
+            try:
+                return os.stat(path).st_size
+            except OSError:
+                pass
+        try:
+            return int(entry.get("filesize") or entry.get("filesize_approx") or 0)
+        except (TypeError, ValueError):
+            return 0
+
+    def _history_result(self, success: bool) -> str:
+        if self._user_stopped:
+            return STATUS_STOPPED
+        return STATUS_OK if success else STATUS_FAILED
+
+    def _recover_history_files(self):
+        """Po starcie: pliki historii z przerwanej sesji zapisujemy bez czasów faz."""
+        if not PARTIAL_STATE_DIR.is_dir():
+            return
+        for path in PARTIAL_STATE_DIR.glob("*.done"):
+            for e in self._read_history_file(path):
+                url = e.get("webpage_url") or e.get("original_url")
+                if not url:
+                    continue
+                size = self._entry_bytes(e)
+                try:
+                    self.history_db.add(
+                        url=url,
+                        source_url=e.get("original_url") if e.get("original_url") != url else None,
+                        extractor=e.get("extractor_key"), video_id=e.get("id"),
+                        title=e.get("title"), filepath=e.get("filepath"), bytes=size or None,
+                        duration=e.get("duration"), status=STATUS_OK,
+                    )
+                except sqlite3.Error as err:
+                    logger.error(f"Błąd zapisu historii pobrań: {err}", exc_info=True)
+                    return
+
+    # =========================================================
+    # "Czy już to pobieraliśmy?"
+    # =========================================================
+
+    def _note_already_downloaded(self, urls: List[str]):
+        if not self.history_db:
+            return
+        hits = []
+        for url in urls:
+            try:
+                row = self.history_db.already_downloaded(url)
+            except sqlite3.Error:
+                return
+            if row:
+                hits.append((url, row))
+        for url, row in hits[:5]:
+            when = datetime.fromtimestamp(row["finished_at"]).strftime("%Y-%m-%d %H:%M")
+            where = f" -> {row['filepath']}" if row["filepath"] else ""
+            self.output_text.append(f"Uwaga: już pobrane {when}{where}: {url}")
+        if len(hits) > 5:
+            self.output_text.append(f"... oraz {len(hits) - 5} innych URL-i z historii pobrań.")
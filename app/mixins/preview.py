@@ -2,15 +2,15 @@
 """Mixin: podgląd metadanych URL (miniaturka, tytuł, rozmiar)."""
 
 import logging
-from pathlib import Path
-from typing import List, Tuple
+import sqlite3
+from typing import Callable, Dict, List, Optional, Tuple
 
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QIcon, QPixmap
+from PyQt6.QtGui import QPixmap
 from PyQt6.QtWidgets import QMessageBox
 
-from ..config import STRICT_URL_REGEX
-from ..threads import BatchPreviewThread, PreviewFetchThread
+from ..config import DEFAULT_SOCKET_TIMEOUT, METADATA_CACHE_TTL_H, STRICT_URL_REGEX
+from ..metadata_cache import MetadataCache
+from ..threads import fetch_metadata
 from ..utils import human_duration, human_size
 
 logger = logging.getLogger(__name__)
@@ -41,6 +41,113 @@ class PreviewMixin:
             fs = fs.replace("bv*", f"bv*[vcodec~=^({vcodec})]")
         return fs, "video"
 
+    # =========================================================
+    # Metadane przez wspólną usługę
+    # =========================================================
+
+    def _open_metadata_cache(self):
+        try:
+            self.metadata_cache: Optional[MetadataCache] = MetadataCache(self.appdata_dir / "metadata.sqlite3")
+            ttl_h = self.settings.value("metadata_cache_ttl_h", METADATA_CACHE_TTL_H, type=int)
+            if ttl_h > 0:
+                self.metadata_cache.purge(ttl_h * 3600)
+        except sqlite3.Error as e:
+            logger.error(f"Nie udało się otworzyć pamięci metadanych: {e}", exc_info=True)
+            self.metadata_cache = None
+
+    def _metadata_ttl_s(self) -> int:
+        """Ważność zapisanych metadanych w sekundach (0 = pamięć wyłączona)."""
+        return self.metadata_cache_ttl.value() * 3600 if self.metadata_cache else 0
+
+    def _cached_metadata(self, urls: List[str], fmt: str) -> Dict[str, dict]:
+        ttl = self._metadata_ttl_s()
+        if not ttl or not urls:
+            return {}
+        try:
+            return self.metadata_cache.get_many(urls, fmt, ttl)
+        except sqlite3.Error as e:
+            logger.error(f"Błąd odczytu pamięci metadanych: {e}", exc_info=True)
+            return {}
+
+    def _request_metadata(self, url: str, on_result: Callable[[dict], None],
+                          on_error: Optional[Callable[[str], None]] = None,
+                          priority: bool = False, refresh: bool = False) -> bool:
+        """
+        Metadane URL-a: z pamięci podręcznej (odbiorca wywołany od razu), a gdy
+        ich tam nie ma albo `refresh` — przez usługę `self.metadata`, która
+        łączy równoległe żądania o ten sam URL i format w jedną ekstrakcję.
+        Argumenty budujemy tutaj, w wątku GUI (odczyt pól formularza).
+        Zwraca True, gdy zlecono nową ekstrakcję.
+        """
+        fmt, _ = self._build_format_string_for_preview()
+        if not refresh:
+            info = self._cached_metadata([url], fmt).get(url)
+            if info is not None:
+                on_result(info)
+                return False
+        args = ["--socket-timeout", str(DEFAULT_SOCKET_TIMEOUT)]
+        if fmt:
+            args += ["-f", fmt]
+        args += self._metadata_auth_args(url)
+        ytdlp, engine, store = self.get_ytdlp_path(), self._active_engine(), self.thumb_store
+        cache = self.metadata_cache if self._metadata_ttl_s() else None
+
+        def job() -> dict:
+            info = fetch_metadata(ytdlp, args, url, engine, store)
+            if cache is not None:
+                try:
+                    cache.put(url, fmt, info)
+                except sqlite3.Error as e:
+                    logger.error(f"Błąd zapisu pamięci metadanych: {e}", exc_info=True)
+            return info
+
+        return self.metadata.request((url, fmt), job, on_result, on_error, priority)
+
+    def clear_metadata_cache(self):
+        if not self.metadata_cache:
+            return
+        try:
+            n = self.metadata_cache.invalidate()
+        except sqlite3.Error as e:
+            logger.error(f"Błąd czyszczenia pamięci metadanych: {e}", exc_info=True)
+            return
+        self.statusBar().showMessage(f"Wyczyszczono pamięć metadanych ({n} wpisów).", 3000)
+
+    def refresh_queue_metadata(self):
+        """Menu kontekstowe kolejki: zapomina zapisane metadane zaznaczonych i pobiera je od nowa."""
+        urls = self.queue_list.selected_urls()
+        if not urls:
+            return
+        if self.metadata_cache:
+            try:
+                self.metadata_cache.invalidate(urls)
+            except sqlite3.Error as e:
+                logger.error(f"Błąd czyszczenia pamięci metadanych: {e}", exc_info=True)
+        self._start_batch_preview(urls, refresh=True)
+
+    def _metadata_auth_args(self, url: str) -> list:
+        args = []
+        cda_email = self.cda_email.text().strip()
+        cda_pass  = self.cda_password.text()
+        username  = self.username.text().strip()
+        password  = self.password.text()
+        if "cda.pl" in url:
+            args += ["--no-check-certificate"]
+            if "/vfilm" in url and cda_email and cda_pass:
+                # Tylko premium (/vfilm) wymaga credentials.
+                # Zwykłe filmy CDA działają anonimowo; podanie credentials powoduje HTTP 403.
+                args += ["--username", cda_email, "--password", cda_pass]
+        else:
+            if cda_email and cda_pass:
+                args += ["--username", cda_email, "--password", cda_pass]
+            elif username and password:
+                args += ["--username", username, "--password", password]
+        return args
+
+    # =========================================================
+    # Panel podglądu
+    # =========================================================
+
     def preview_current_url(self):
         url = self.url_input.text().strip()
         if not url or not STRICT_URL_REGEX.match(url):
@@ -52,13 +159,11 @@ class PreviewMixin:
         self._run_preview(url)
 
     def preview_selected_from_queue(self):
-        sel = self.queue_list.selectedItems()
+        sel = self.queue_list.selected_urls()
         if sel:
-            self._run_preview(sel[0].text().strip())
+            self._run_preview(sel[0])
 
     def _run_preview(self, url: str):
-        if self.preview_thread and self.preview_thread.isRunning():
-            return
         for lbl, txt in [
             (self.preview_title,    "Tytuł: (pobieranie...)"),
             (self.preview_uploader, "Kanał: -"),
@@ -66,64 +171,118 @@ class PreviewMixin:
             (self.preview_size,     "Szacowany rozmiar: -"),
         ]:
             lbl.setText(txt)
+        self._preview_thumb_key = ""
         self.preview_thumb.setPixmap(QPixmap())
         self.preview_widget.setVisible(True)
-        self.preview_thread = PreviewFetchThread(self, url, self)
-        self.preview_thread.result_signal.connect(self._handle_preview_result)
-        self.preview_thread.error_signal.connect(self._handle_preview_error)
-        self.preview_thread.start()
+        self._preview_url = url
+        self._request_metadata(
+            url,
+            lambda info, u=url: self._handle_preview_result(u, info),
+            lambda err, u=url: self._handle_preview_error(u, err),
+            priority=True,
+        )
 
     def _set_preview_ui(self, info: dict):
         self.preview_title.setText(f"Tytuł: {info.get('title') or '-'}")
         self.preview_uploader.setText(f"Kanał: {info.get('uploader') or '-'}")
         self.preview_duration.setText(f"Czas trwania: {human_duration(info.get('duration', 0))}")
         self.preview_size.setText(f"Szacowany rozmiar: {human_size(info.get('estimated_bytes') or 0)}")
-        tp = info.get("thumb_path") or ""
-        if tp and Path(tp).exists():
-            pix = QPixmap(tp)
-            if not pix.isNull():
-                self.preview_thumb.setPixmap(pix)
-                return
-        self.preview_thumb.setPixmap(QPixmap())
+        self._preview_thumb_key = info.get("thumb_key") or ""
+        self._show_preview_thumb()
+
+    def _show_preview_thumb(self):
+        pix = None
+        if self._preview_thumb_key:
+            # gdy jeszcze nie zdekodowana — pokaże ją _on_thumbnail_ready
+            pix = self.thumbnails.pixmap(self._preview_thumb_key, self.preview_thumb.size())
+        self.preview_thumb.setPixmap(pix or QPixmap())
 
-    def _handle_preview_result(self, info: dict):
+    def _apply_thumb_store_limit(self, megabytes: int):
+        """Nowy limit magazynu miniatur z ustawień (zmniejszenie od razu usuwa nadmiar)."""
+        try:
+            self.thumb_store.set_max_bytes(megabytes * 1024 * 1024)
+        except sqlite3.Error as e:
+            logger.error(f"Błąd zmiany limitu magazynu miniatur: {e}", exc_info=True)
+
+    def _on_thumbnail_ready(self, thumb_key: str):
+        if thumb_key and thumb_key == self._preview_thumb_key:
+            self._show_preview_thumb()
+
+    def _handle_preview_result(self, url: str, info: dict):
+        self._apply_item_preview(url, info)
+        if url != self._preview_url:   # w międzyczasie zlecono podgląd innego URL-a
+            return
         self._set_preview_ui(info)
         self.preview_widget.setVisible(True)
-        url = info.get("webpage_url", "")
-        items = self.queue_list.findItems(url, Qt.MatchFlag.MatchExactly) or []
-        tip = f"{info.get('title', '')}\n{human_duration(info.get('duration', 0))} | ≈ {human_size(info.get('estimated_bytes') or 0)}"
-        if info.get("thumb_path") and Path(info["thumb_path"]).exists():
-            pix = QPixmap(info["thumb_path"])
-            if not pix.isNull():
-                ic = QIcon(pix)
-                for it in items:
-                    it.setIcon(ic); it.setToolTip(tip)
-                return
-        for it in items:
-            it.setToolTip(tip)
-
-    def _handle_preview_error(self, err: str):
+
+    def _handle_preview_error(self, url: str, err: str):
+        if url != self._preview_url:
+            return
+        self._preview_url = ""
         self.preview_widget.setVisible(False)
         QMessageBox.warning(self, "Błąd podglądu", f"Nie udało się pobrać podglądu:\n{err}")
 
-    def _start_batch_preview(self, urls: List[str]):
-        if not urls:
+    # =========================================================
+    # Skan kolejki
+    # =========================================================
+
+    def _start_batch_preview(self, urls: List[str], refresh: bool = False):
+        """
+        Skan metadanych elementów kolejki. Elementy z pamięci podręcznej są
+        uzupełniane od razu, jednym przebiegiem; pozostałe trafiają do usługi
+        metadanych. Nowy skan w trakcie poprzedniego dołącza do niego (wspólny
+        licznik), a URL-e już skanowane nie są zlecane drugi raz.
+        """
+        new = [u for u in dict.fromkeys(urls) if u not in self._scan_pending]
+        if not new:
             return
-        self.batch_preview_thread = BatchPreviewThread(self, urls, self)
-        self.batch_preview_thread.item_result_signal.connect(self._on_batch_item_result)
-        self.batch_preview_thread.finished_signal.connect(self._on_batch_finished)
-        self.batch_preview_thread.start()
+        if not self._scan_pending:
+            self._scan_updated = self._scan_total = 0
+        self._scan_total += len(new)
+        if not refresh:
+            cached = self._cached_metadata(new, self._build_format_string_for_preview()[0])
+            if cached:
+                for u, info in cached.items():
+                    self._apply_item_preview(u, info, project=False)
+                self._update_disk_projection()
+                self._scan_updated += len(cached)
+                new = [u for u in new if u not in cached]
+        self._scan_pending.update(new)
+        for u in new:
+            self._request_metadata(
+                u,
+                lambda info, u=u: self._on_batch_item_result(u, info),
+                lambda err, u=u: self._on_batch_item_error(u, err),
+                refresh=True,   # pamięć podręczna sprawdzona wyżej, zbiorczo
+            )
+        if not self._scan_pending:
+            self._on_batch_finished(self._scan_updated, self._scan_total)
 
     def _on_batch_item_result(self, url: str, info: dict):
-        items = self.queue_list.findItems(url, Qt.MatchFlag.MatchExactly)
-        tip = f"{info.get('title', '')}\n≈ {human_size(info.get('estimated_bytes') or 0)}"
-        for it in items:
-            it.setToolTip(tip)
-            tp = info.get("thumb_path")
-            if tp and Path(tp).exists():
-                pix = QPixmap(tp)
-                if not pix.isNull():
-                    it.setIcon(QIcon(pix))
+        self._apply_item_preview(url, info)
+        self._scan_item_done(url, True)
+
+    def _on_batch_item_error(self, url: str, err: str):
+        logger.debug(f"Batch preview failed for {url}: {err}")
+        self._scan_item_done(url, False)
+
+    def _scan_item_done(self, url: str, ok: bool):
+        if url not in self._scan_pending:
+            return
+        self._scan_pending.discard(url)
+        self._scan_updated += int(ok)
+        if not self._scan_pending:
+            self._on_batch_finished(self._scan_updated, self._scan_total)
+
+    def _apply_item_preview(self, url: str, info: dict, project: bool = True):
+        """Szacowany rozmiar do magazynu kolejki, tytuł i miniatura do wiersza widoku."""
+        qi = self.queue_store.get(url)
+        if qi and info.get("estimated_bytes"):
+            qi.estimated_bytes = int(info["estimated_bytes"])
+            self.queue_store.touch(url)
+            if project:
+                self._schedule_disk_projection()
+        self.queue_model.set_preview(url, info.get("title"), info.get("thumb_key"))
 
     def _on_batch_finished(self, updated: int, total: int):
         self.statusBar().showMessage(
@@ -131,7 +290,7 @@ class PreviewMixin:
         )
 
     def scan_queue_metadata(self):
-        urls = [self.queue_list.item(i).text().strip() for i in range(self.queue_list.count())]
+        urls = self.queue_store.urls()
         if not urls:
             QMessageBox.information(self, "Kolejka pusta", "Brak elementów do skanowania.")
             return
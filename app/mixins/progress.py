@@ -2,7 +2,9 @@
 """Mixin: aktualizacje paska postępu i konsoli wyjścia."""
 
 import logging
-import re
+import time
+
+from ..config import RESUME_CHECKPOINT_S
 
 logger = logging.getLogger(__name__)
 
@@ -14,11 +16,58 @@ class ProgressMixin:
 
     def update_progress(self, text: str):
         self.output_text.append(text)
-        if sb := self.output_text.verticalScrollBar():
-            sb.setValue(sb.maximum())
-        m = re.search(r"\[info\]\s+Title:\s+(.+)", text)
-        if m:
-            self.current_video_title = m.group(1).strip()
+
+    def _flush_download_progress(self):
+        """Wywoływane przez timer: zbiera zbuforowane wyjście wszystkich aktywnych pobierań."""
+        for url, thread in list(self.active_downloads.items()):
+            self._drain_download(url, thread)
+
+    def _drain_download(self, url: str, thread):
+        lines, record, detailed = thread.drain()
+        if thread.title and self.item_titles.get(url) != thread.title:
+            self.item_titles[url] = thread.title
+            if url not in self.active_batches:
+                self.queue_model.set_preview(url, thread.title)
+        if lines:
+            self.update_progress("\n".join(lines))
+            if any("Requested format is not available" in ln for ln in lines):
+                # zapamiętany format zniknął — następna próba wybierze format od nowa
+                qi = self.queue_store.get(url)
+                if qi and qi.state.pop("format_id", None):
+                    self.queue_store.touch(url)
+        if record is not None:
+            self.update_item_record(url, record)
+        elif detailed is not None:
+            self.update_detailed_progress(*detailed)
+
+    def update_item_record(self, url: str, record):
+        """Aktualizuje pasek postępu na podstawie strukturalnego rekordu (ProgressRecord)."""
+        self.item_progress[url] = record
+        self._history_phase(url, record)
+        qi = self.queue_store.get(url)
+        if record.status == "downloading" and qi and url not in self.active_batches:
+            st = qi.state
+            st["downloaded_bytes"] = record.downloaded_bytes
+            if record.total_bytes:
+                st["total_bytes"] = record.total_bytes
+            if record.tmpfilename:
+                st["part_file"] = record.tmpfilename
+            self.queue_store.touch(url)
+            # co kilka sekund do dziennika — po awarii programu wznowimy od zapisanego .part
+            now = time.monotonic()
+            if now - self._resume_checkpoint_at.get(url, 0.0) >= RESUME_CHECKPOINT_S:
+                self._resume_checkpoint_at[url] = now
+                self._checkpoint_queue()
+        self.queue_model.refresh(url)
+        percent = record.percent
+        if percent is not None:
+            self.progress_bar.setValue(int(percent))
+        self.progress_bar._detailed_active = True
+        name = self.item_titles.get(url) or "wideo"
+        if len(name) > 40:
+            name = name[:37] + "..."
+        pct = f" | {int(percent)}%" if percent is not None else ""
+        self.progress_bar.setFormat(f"{name} | {record.summary()}{pct}")
 
     def update_progress_percent(self, percent: int):
         percent = max(0, min(100, percent))
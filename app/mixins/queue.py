@@ -1,13 +1,15 @@
 # -*- coding: utf-8 -*-
 """Mixin: zarządzanie kolejką pobierania (dodawanie, usuwanie, zapis, odczyt, przeglądanie ścieżek)."""
 
-import json
 import logging
 import os
 import platform
+import hashlib
 import subprocess
+import time
+from glob import escape as glob_escape
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 from PyQt6.QtGui import QIcon, QPixmap
 from PyQt6.QtWidgets import (
@@ -15,12 +17,15 @@ from PyQt6.QtWidgets import (
     QFileDialog,
     QInputDialog,
     QLineEdit,
-    QListWidgetItem,
     QMessageBox,
 )
 
-from ..config import FFMPEG_BIN_DIR, LIBS_DIR, STRICT_URL_REGEX, get_icon_path
+from ..config import FFMPEG_BIN_DIR, LIBS_DIR, PARTIAL_STATE_DIR, STRICT_URL_REGEX, get_icon_path
+from ..progress_protocol import parse_resume_state
+from ..queue_store import QUEUE_FILE_VERSION, STATUS_FAILED, STATUS_QUEUED
+from ..scheduler import PRIORITY_BULK, PRIORITY_INTERACTIVE, PRIORITY_LABELS
 from ..threads import CDAStatusCheckThread
+from ..utils import human_size
 
 logger = logging.getLogger(__name__)
 
@@ -31,7 +36,7 @@ class QueueMixin:
     # =========================================================
 
     def update_remove_btn_state(self):
-        has = bool(self.queue_list.selectedItems())
+        has = self.queue_list.selectionModel().hasSelection()
         self.remove_btn.setEnabled(has)
         self.edit_btn.setEnabled(has)
 
@@ -104,10 +109,7 @@ class QueueMixin:
                 QMessageBox.warning(self, "Schowek pusty", "Schowek jest pusty.")
                 return
             self.url_input.setText(text)
-            existing = {self.queue_list.item(i).text().strip()
-                        for i in range(self.queue_list.count())}
-            existing |= set(self.download_queue + self.failed_queue)
-            if text in existing:
+            if text in self.queue_store:
                 QMessageBox.information(self, "Duplikat URL", f"URL już w kolejce:\n{text}")
                 return
             self.add_to_queue()
@@ -205,6 +207,25 @@ class QueueMixin:
             if files:
                 self.ffmpeg_path.setText(files[0])
 
+    def browse_aria2c_path(self):
+        fd = QFileDialog(self)
+        fd.setFileMode(QFileDialog.FileMode.ExistingFile)
+        fd.setWindowTitle("Wybierz plik aria2c")
+        cur = self.aria2c_path.text().strip()
+        if cur and Path(cur).is_absolute():
+            start = str(Path(cur).parent)
+        elif LIBS_DIR.exists():
+            start = str(LIBS_DIR)
+        else:
+            start = str(Path.home())
+        fd.setDirectory(start)
+        if os.name == "nt":
+            fd.setNameFilter("Wykonywalne (*.exe);;Wszystkie pliki (*)")
+        if fd.exec():
+            files = fd.selectedFiles()
+            if files:
+                self.aria2c_path.setText(files[0])
+
     def browse_default_output_path(self):
         start = self.default_output_path.text().strip() or self.get_user_downloads_path()
         d = QFileDialog.getExistingDirectory(self, "Wybierz domyślny katalog wyjściowy", start)
@@ -216,24 +237,22 @@ class QueueMixin:
     # =========================================================
 
     def _add_urls_list(self, urls: List[str]):
-        existing = set(self.download_queue + self.failed_queue)
-        existing |= {self.queue_list.item(i).text().strip()
-                     for i in range(self.queue_list.count())}
         added = []
+        # Wiele URL-i naraz (lista, przeciągnięty tekst) to pobieranie masowe — jedno źródło
+        bulk = len(urls) > 1
+        source = f"lista:{int(time.time())}" if bulk else None
         for url in urls:
             if not url.lower().startswith(("http://", "https://")):
                 url = "https://" + url
-            if not STRICT_URL_REGEX.match(url) or url in existing:
+            if not STRICT_URL_REGEX.match(url):
                 continue
-            self.download_queue.append(url)
-            item = QListWidgetItem(url)
-            item.setData(self.queue_list.ROLE_STATUS, self.queue_list.STATUS_NORMAL)
-            self.queue_list.addItem(item)
-            existing.add(url)
-            added.append(url)
+            if self.queue_store.add(url, PRIORITY_BULK if bulk else PRIORITY_INTERACTIVE, source):
+                added.append(url)
         if added:
+            self.queue_model.add_urls(added)
             self.save_queue()
             self.output_text.append(f"Dodano {len(added)} URL do kolejki.")
+            self._note_already_downloaded(added)
             self._start_batch_preview(added)
 
     def add_to_queue(self):
@@ -241,28 +260,16 @@ class QueueMixin:
         if not url:
             QMessageBox.warning(self, "Błąd", "Wpisz URL aby dodać do kolejki.")
             return
-        existing = set(self.download_queue + self.failed_queue)
-        existing |= {self.queue_list.item(i).text().strip()
-                     for i in range(self.queue_list.count())}
 
-        if url in existing:
-            if url in self.failed_queue:
+        if url in self.queue_store:
+            if self.queue_store.is_failed(url):
                 reply = QMessageBox.question(
                     self, "URL w nieudanych",
                     f"URL już jest w nieudanych.\nPrzenieść do kolejki?\n\n{url}",
                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
                 )
                 if reply == QMessageBox.StandardButton.Yes:
-                    self.failed_queue.remove(url)
-                    for i in range(self.queue_list.count()):
-                        it = self.queue_list.item(i)
-                        if it and it.text().strip() == url:
-                            self.queue_list.mark_status(
-                                it, self.queue_list.STATUS_NORMAL, self.is_dark_theme()
-                            )
-                            break
-                    if url not in self.download_queue:
-                        self.download_queue.append(url)
+                    self._set_item_status(url, STATUS_QUEUED)
                     self.save_queue()
                     self.url_input.clear()
             else:
@@ -283,74 +290,71 @@ class QueueMixin:
                 "URL zostanie dodany do kolejki, ale oczekuj błędu 404."
             )
 
-        self.download_queue.append(url)
-        item = QListWidgetItem(url)
-        item.setData(self.queue_list.ROLE_STATUS, self.queue_list.STATUS_NORMAL)
-        self.queue_list.addItem(item)
+        if not self.queue_store.add(url):
+            QMessageBox.information(self, "Duplikat URL", f"URL już w kolejce:\n{url}")
+            return
+        self._add_queue_row(url)
         self.url_input.clear()
         self.save_queue()
+        self._note_already_downloaded([url])
         self._start_batch_preview([url])
 
     def remove_from_queue(self):
-        sel = self.queue_list.selectedItems()
+        sel = self.queue_list.selected_urls()
         if not sel:
             QMessageBox.warning(self, "Błąd", "Wybierz element do usunięcia.")
             return
-        for idx in sorted([self.queue_list.row(it) for it in sel], reverse=True):
-            if 0 <= idx < self.queue_list.count():
-                text = self.queue_list.item(idx).text().strip()
-                if text in self.download_queue:
-                    self.download_queue.remove(text)
-                self.queue_list.takeItem(idx)
+        self._remove_queue_items(sel)
         self.save_queue()
 
-    def move_queue_item_up(self):
-        sel = self.queue_list.selectedItems()
-        if not sel:
+    def remove_failed_items(self):
+        failed = self.queue_store.urls(STATUS_FAILED)
+        self._remove_queue_items(failed)
+        self.save_queue()
+        return len(failed)
+
+    def _move_selected(self, delta: int):
+        rows = self.queue_list.selected_rows()
+        if not rows:
             return
-        item = sel[0]; idx = self.queue_list.row(item)
-        if idx > 0:
-            if idx < len(self.download_queue):
-                url = self.download_queue.pop(idx)
-                self.download_queue.insert(idx - 1, url)
-            self.queue_list.takeItem(idx)
-            self.queue_list.insertItem(idx - 1, item)
-            self.queue_list.setCurrentItem(item)
+        idx = rows[0]
+        new_idx = idx + delta
+        url = self.queue_model.url_at(idx)
+        if self.queue_model.move_row(idx, new_idx):
+            self.queue_store.move(url, new_idx)
+            self.queue_list.select_url(url)
             self.save_queue()
 
+    def move_queue_item_up(self):
+        self._move_selected(-1)
+
     def move_queue_item_down(self):
-        sel = self.queue_list.selectedItems()
-        if not sel:
-            return
-        item = sel[0]; idx = self.queue_list.row(item)
-        if idx < self.queue_list.count() - 1:
-            if idx < len(self.download_queue):
-                url = self.download_queue.pop(idx)
-                self.download_queue.insert(idx + 1, url)
-            self.queue_list.takeItem(idx)
-            self.queue_list.insertItem(idx + 1, item)
-            self.queue_list.setCurrentItem(item)
-            self.save_queue()
+        self._move_selected(1)
 
     def edit_queue_item(self):
-        sel = self.queue_list.selectedItems()
+        sel = self.queue_list.selected_urls()
         if not sel:
             QMessageBox.warning(self, "Błąd", "Wybierz element do edycji.")
             return
-        item = sel[0]; idx = self.queue_list.row(item)
+        old_url = sel[0]
         dlg = QInputDialog(self)
         dlg.setWindowTitle("Edytuj URL")
         dlg.setLabelText("Wprowadź nowy URL:")
-        dlg.setTextValue(item.text())
+        dlg.setTextValue(old_url)
         dlg.resize(500, dlg.height())
         if dlg.exec():
             new_url = dlg.textValue().strip()
             if new_url and STRICT_URL_REGEX.match(new_url):
                 if not new_url.lower().startswith(("http://", "https://")):
                     new_url = "https://" + new_url
-                item.setText(new_url)
-                if 0 <= idx < len(self.download_queue):
-                    self.download_queue[idx] = new_url
+                if new_url == old_url:
+                    return
+                if not self.queue_store.rename(old_url, new_url):
+                    QMessageBox.information(self, "Duplikat URL", f"URL już w kolejce:\n{new_url}")
+                    return
+                self.retry_schedule.cancel(old_url)
+                self._space_held.discard(old_url)
+                self.queue_model.rename_url(old_url, new_url)
                 self.save_queue()
                 self._start_batch_preview([new_url])
             else:
@@ -366,88 +370,205 @@ class QueueMixin:
         box.setDefaultButton(no)
         box.exec()
         if box.clickedButton() == yes:
-            self.queue_list.clear()
-            self.download_queue.clear()
-            self.failed_queue.clear()
-            self.item_retry_counts.clear()
+            self.queue_model.clear()
+            self.queue_store.clear()
+            self._space_held.clear()
+            self.retry_schedule.clear()
+            self.retry_timer.stop()
             self.failed_dialog_shown = False
             self.save_queue()
 
-    def _sync_download_queue_from_widget(self):
-        new_order = [self.queue_list.item(i).text().strip()
-                     for i in range(self.queue_list.count())
-                     if self.queue_list.item(i)]
-        self.download_queue = [u for u in new_order if u in self.download_queue or u not in self.failed_queue]
+    def _sync_queue_order_from_widget(self):
+        self.queue_store.reorder(self.queue_model.urls())
         self.save_queue()
 
     # =========================================================
-    # Zapis / odczyt kolejki
+    # Elementy kolejki (magazyn + widok)
     # =========================================================
 
+    def _add_queue_row(self, url: str, row: Optional[int] = None):
+        """Dodaje wiersz widoku dla elementu z `queue_store` (status i czcionkę model czyta z magazynu)."""
+        self.queue_model.add_url(url, row)
+
+    def _set_item_status(self, url: str, status: str):
+        self._set_items_status([url], status)
+
+    def _set_items_status(self, urls: List[str], status: str):
+        for url in urls:
+            self.queue_store.set_status(url, status)
+        self.queue_model.refresh_urls(urls)
+
+    def _remove_queue_item(self, url: str):
+        self._remove_queue_items([url])
+
+    def _remove_queue_items(self, urls: List[str]):
+        for url in urls:
+            self.queue_store.remove(url)
+            self._space_held.discard(url)
+            self.retry_schedule.cancel(url)
+        self.queue_model.remove_urls(urls)
+
     def save_queue(self):
-        queue_file = self.appdata_dir / "queue.json"
-        try:
-            queue_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(queue_file, "w", encoding="utf-8") as f:
-                json.dump({
-                    "download_queue": self.download_queue,
-                    "failed_queue": self.failed_queue,
-                    "retry_counts": self.item_retry_counts,
-                }, f, indent=2)
-        except Exception as e:
-            logger.error(f"Błąd zapisu kolejki: {e}", exc_info=True)
+        """Zgłasza zmiany kolejki do zapisu w tle (dziennik + okresowa migawka)."""
+        self._checkpoint_queue()
+        self._update_disk_projection()
+
+    def _checkpoint_queue(self):
+        """Sam zapis zmian do dziennika (bez odświeżania etykiet) — także w trakcie pobierania."""
+        self.queue_journal.submit(self.queue_store.drain_changes(), self.retry_schedule.to_dict())
 
     def load_queue(self) -> bool:
-        queue_file = self.appdata_dir / "queue.json"
-        if not queue_file.exists():
-            return False
         try:
-            with open(queue_file, "r", encoding="utf-8") as f:
-                content = f.read().strip()
-                data = json.loads(content) if content else {}
-
-            if isinstance(data, dict):
-                self.download_queue    = [u.strip() for u in data.get("download_queue", []) if u and u.strip()]
-                self.failed_queue      = [u.strip() for u in data.get("failed_queue", []) if u and u.strip()]
-                self.item_retry_counts = data.get("retry_counts", {})
-            elif isinstance(data, list):
-                self.download_queue    = [u.strip() for u in data if u and u.strip()]
-                self.failed_queue      = []
-                self.item_retry_counts = {}
-            else:
-                self.download_queue, self.failed_queue, self.item_retry_counts = [], [], {}
+            data = self.queue_journal.load()
+            if data is None or not self.queue_store.load(data):
                 return False
+            if not (isinstance(data, dict) and data.get("version") == QUEUE_FILE_VERSION):
+                # stary queue.json — przepisujemy go w nowym formacie
+                self.queue_journal.rebase(
+                    self.queue_store.to_list(),
+                    data.get("retry_at", {}) if isinstance(data, dict) else {},
+                )
+            self._recover_resume_states()
+            self.retry_schedule.load(
+                data.get("retry_at", {}) if isinstance(data, dict) else {},
+                self.queue_store.urls(STATUS_QUEUED),
+            )
+
+            self.queue_model.clear()
+            self.queue_model.add_urls(self.queue_store.urls())
 
-            self.queue_list.clear()
-            all_urls = list(self.download_queue)
-            for u in self.failed_queue:
-                if u not in all_urls:
-                    all_urls.append(u)
-
-            for url in all_urls:
-                item = QListWidgetItem(url)
-                if url in self.failed_queue:
-                    self.queue_list.mark_status(item, self.queue_list.STATUS_FAILED, self.is_dark_theme())
-                else:
-                    item.setData(self.queue_list.ROLE_STATUS, self.queue_list.STATUS_NORMAL)
-                self.queue_list.addItem(item)
-
-            if all_urls:
-                self._start_batch_preview(all_urls)
+            if len(self.queue_store):
+                self._start_batch_preview(self.queue_store.urls())
             return True
         except Exception as e:
             logger.error(f"Błąd wczytywania kolejki: {e}", exc_info=True)
             QMessageBox.warning(self, "Błąd wczytywania", f"Nie udało się wczytać kolejki:\n{e}")
             return False
 
+    # =========================================================
+    # Stan wznawiania (format, plik .part, pobrane bajty)
+    # =========================================================
+
+    def _resume_state_file(self, url: str) -> Path:
+        return PARTIAL_STATE_DIR / f"{hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]}.tsv"
+
+    def _collect_resume_state(self, path: Path):
+        """Wczytuje plik stanu zapisany przez yt-dlp (before_dl) do stanu elementów i go usuwa."""
+        try:
+            text = path.read_text(encoding="utf-8", errors="ignore")
+        except OSError:
+            return
+        for url, st in parse_resume_state(text).items():
+            qi = self.queue_store.get(url)
+            if qi:
+                qi.state.update(st)
+                self.queue_store.touch(url)
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+    def _recover_resume_states(self):
+        """Po starcie: zbiera pliki stanu z przerwanej sesji i odświeża rozmiary plików .part."""
+        if PARTIAL_STATE_DIR.is_dir():
+            for path in PARTIAL_STATE_DIR.glob("*.tsv"):
+                self._collect_resume_state(path)
+        for qi in self.queue_store:
+            st = qi.state
+            part = st.get("part_file")
+            if not part and st.get("filename"):
+                # awaria przed pierwszym zapisem postępu: plik stanu zna tylko docelową nazwę
+                part = self._guess_part_file(st["filename"])
+                if part:
+                    st["part_file"] = part
+            if part and Path(part).is_file():
+                st["downloaded_bytes"] = Path(part).stat().st_size
+                self.queue_store.touch(qi.url)
+
+    @staticmethod
+    def _guess_part_file(filename: str) -> Optional[str]:
+        """Plik .part dla docelowej nazwy: `nazwa.ext.part`, a dla formatów łączonych największy `nazwa.fID.ext.part`."""
+        target = Path(filename)
+        direct = Path(f"{filename}.part")
+        if direct.is_file():
+            return str(direct)
+        try:
+            parts = list(target.parent.glob(f"{glob_escape(target.stem)}.f*.part"))
+        except OSError:
+            return None
+        if not parts:
+            return None
+        return str(max(parts, key=lambda p: p.stat().st_size))
+
+    def _resume_format(self, url: str) -> Optional[str]:
+        """Format do ponownego wybrania, jeśli element ma już częściowo pobrane dane."""
+        qi = self.queue_store.get(url)
+        st = qi.state if qi else {}
+        fid = st.get("format_id")
+        if not fid:
+            return None
+        part = st.get("part_file")
+        if st.get("downloaded_bytes") or (part and Path(part).is_file()):
+            return fid
+        return None
+
+    def _item_tooltip(self, url: str) -> str:
+        lines = [url]
+        qi = self.queue_store.get(url)
+        if qi and qi.priority != PRIORITY_INTERACTIVE:
+            lines.append(f"Priorytet: {PRIORITY_LABELS[qi.priority]}")
+        if qi and qi.estimated_bytes:
+            lines.append(f"Szacowany rozmiar: ≈ {human_size(qi.estimated_bytes)}")
+        st = qi.state if qi else {}
+        done = st.get("downloaded_bytes") or 0
+        if done:
+            total = st.get("total_bytes")
+            amount = f"{human_size(done)} / {human_size(total)}" if total else human_size(done)
+            fmt = f" (format {st['format_id']})" if st.get("format_id") else ""
+            lines.append(f"Pobrano już: {amount}{fmt}")
+        due = self.retry_schedule.due_at(url)
+        if due and due > time.time():
+            lines.append(f"Ponowienie o {time.strftime('%H:%M:%S', time.localtime(due))}")
+        return "\n".join(lines)
+
+    def _refresh_queue_row(self, url: str):
+        self.queue_model.refresh(url)
+
+    def _is_waiting_for_retry(self, url: str) -> bool:
+        return self.retry_schedule.due_at(url) is not None
+
+    def _item_percent(self, url: str) -> Optional[float]:
+        """Postęp aktywnego pobierania (dla paska w wierszu kolejki)."""
+        rec = self.item_progress.get(url)
+        return rec.percent if rec else None
+
+    # =========================================================
+    # Priorytety
+    # =========================================================
+
+    def set_queue_priority(self, priority: int):
+        sel = self.queue_list.selected_urls()
+        if not sel:
+            return
+        for url in sel:
+            qi = self.queue_store.get(url)
+            if qi:
+                qi.priority = priority
+                self.queue_store.touch(url)
+        self.queue_model.refresh_urls(sel)
+        self.save_queue()
+        self.statusBar().showMessage(
+            f"Priorytet „{PRIORITY_LABELS[priority]}” dla {len(sel)} element(ów).", 3000
+        )
+
     def ask_resume_queue(self):
         self.load_queue()
-        total = len(self.download_queue) + len(self.failed_queue)
-        if total > 0:
-            failed_info = f" ({len(self.failed_queue)} nieudanych)" if self.failed_queue else ""
+        if len(self.queue_store) > 0:
+            n_failed = self.queue_store.count(STATUS_FAILED)
+            failed_info = f" ({n_failed} nieudanych)" if n_failed else ""
             box = QMessageBox(
                 QMessageBox.Icon.Question, "Kontynuuj kolejkę",
-                f"Wykryto zapisaną kolejkę ({len(self.download_queue)} normalnych{failed_info}).\n"
+                f"Wykryto zapisaną kolejkę ({self.queue_store.count(STATUS_QUEUED)} normalnych{failed_info}).\n"
                 "Czy chcesz kontynuować pobieranie?",
                 parent=self,
             )
@@ -456,7 +577,6 @@ class QueueMixin:
             box.setDefaultButton(yes)
             box.exec()
             if box.clickedButton() == yes:
-                if self.download_queue or self.failed_queue:
-                    self.start_download(add_current_url=False)
+                self.start_download(add_current_url=False)
             else:
                 self.clear_queue()
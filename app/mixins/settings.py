@@ -5,6 +5,17 @@ import logging
 
 from PyQt6.QtWidgets import QMessageBox
 
+from ..config import (
+    DEFAULT_DOWNLOADER_PROFILES,
+    DEFAULT_HOST_LIMITS,
+    EXTERNAL_DOWNLOADER_NONE,
+    METADATA_CACHE_TTL_H,
+    THUMB_STORE_MAX_MB,
+)
+from ..console_widget import DEFAULT_MAX_LINES
+from ..scheduler import POLICY_FIFO
+from ..ytdlp_engine import ENGINE_PROCESS
+
 logger = logging.getLogger(__name__)
 
 
@@ -13,6 +24,14 @@ class SettingsMixin:
         s = self.settings
         s.setValue("ytdlp_path",  self.ytdlp_path_input.text().strip().replace("\\", "/"))
         s.setValue("ffmpeg_path", self.ffmpeg_path.text().strip().replace("\\", "/"))
+        s.setValue("ytdlp_engine", self.ytdlp_engine.currentData())
+        s.setValue("aria2c_path", self.aria2c_path.text().strip().replace("\\", "/"))
+        s.setValue("external_downloader", self.external_downloader.currentData())
+        s.setValue("aria2_connections", self.aria2_connections.value())
+        s.setValue("aria2_split", self.aria2_split.value())
+        s.setValue("downloader_protocols",
+                   ",".join(p for p, cb in self.downloader_protocols.items() if cb.isChecked()))
+        s.setValue("downloader_host_profiles", self.downloader_host_profiles.text().strip())
         s.setValue("check_ytdlp_updates",  self.check_ytdlp_updates.isChecked())
         s.setValue("auto_download_ffmpeg", self.auto_download_ffmpeg.isChecked())
         s.setValue("cda_email",    self.cda_email.text().strip())
@@ -22,6 +41,7 @@ class SettingsMixin:
         s.setValue("auto_add_to_queue",   self.auto_add_to_queue.isChecked())
         s.setValue("theme", self.theme_combo.currentText())
         s.setValue("advanced_mode", self.advanced_mode.isChecked())
+        s.setValue("console_max_lines", self.console_max_lines.value())
         s.setValue("check_app_updates_on_start", self.check_app_updates_on_start.isChecked())
 
         # wideo
@@ -33,6 +53,7 @@ class SettingsMixin:
         s.setValue("output_template",  self.output_template.text().strip())
         s.setValue("output_path",      self.output_path.text().strip())
         s.setValue("limit_rate",       self.limit_rate.text().strip())
+        s.setValue("global_rate_limit", self.global_rate_limit.text().strip())
         s.setValue("retries",          self.retries.value())
         s.setValue("extract_audio",    self.extract_audio.isChecked())
         s.setValue("keep_video",       self.keep_video.isChecked())
@@ -82,7 +103,15 @@ class SettingsMixin:
         s.setValue("no_color",           self.no_color.isChecked())
         s.setValue("simulate",           self.simulate.isChecked())
         s.setValue("skip_download",      self.skip_download.isChecked())
+        s.setValue("structured_progress", self.structured_progress.isChecked())
         s.setValue("max_retry_per_item", self.max_retry_per_item.value())
+        s.setValue("max_parallel_downloads", self.max_parallel_downloads.value())
+        s.setValue("host_concurrency_limits", self.host_concurrency_limits.text().strip())
+        s.setValue("batch_size", self.batch_size.value())
+        s.setValue("disk_space_check", self.disk_space_check.isChecked())
+        s.setValue("metadata_cache_ttl_h", self.metadata_cache_ttl.value())
+        s.setValue("thumb_store_max_mb", self.thumb_store_max.value())
+        s.setValue("queue_policy", self.queue_policy.currentData())
         s.setValue("enable_clipboard_monitor", self.enable_clipboard_monitor.isChecked())
 
         s.sync()
@@ -97,6 +126,8 @@ class SettingsMixin:
         s = self.settings
         logger.info("Wczytuję ustawienia...")
 
+        engine_idx = self.ytdlp_engine.findData(s.value("ytdlp_engine", ENGINE_PROCESS, type=str))
+        self.ytdlp_engine.setCurrentIndex(engine_idx if engine_idx != -1 else 0)
         self.check_ytdlp_updates.setChecked(s.value("check_ytdlp_updates", True, type=bool))
         self.auto_download_ffmpeg.setChecked(s.value("auto_download_ffmpeg", True, type=bool))
 
@@ -123,9 +154,23 @@ class SettingsMixin:
         self.check_app_updates_on_start.setChecked(
             s.value("check_app_updates_on_start", True, type=bool)
         )
+        self.console_max_lines.setValue(s.value("console_max_lines", DEFAULT_MAX_LINES, type=int))
 
         self.ytdlp_path_input.setText(self.get_ytdlp_path())
         self.ffmpeg_path.setText(self.get_ffmpeg_path())
+        self.aria2c_path.setText(self.get_aria2c_path())
+        dl_idx = self.external_downloader.findData(
+            s.value("external_downloader", EXTERNAL_DOWNLOADER_NONE, type=str)
+        )
+        self.external_downloader.setCurrentIndex(dl_idx if dl_idx != -1 else 0)
+        self.aria2_connections.setValue(s.value("aria2_connections", 8, type=int))
+        self.aria2_split.setValue(s.value("aria2_split", 8, type=int))
+        protos = s.value("downloader_protocols", "http,dash,m3u8", type=str).split(",")
+        for p, cb in self.downloader_protocols.items():
+            cb.setChecked(p in protos)
+        self.downloader_host_profiles.setText(
+            s.value("downloader_host_profiles", DEFAULT_DOWNLOADER_PROFILES, type=str).strip()
+        )
         self.cda_email.setText(s.value("cda_email", "", type=str).strip())
         self.cda_password.setText(s.value("cda_password", "", type=str))
 
@@ -140,6 +185,7 @@ class SettingsMixin:
         out_p = s.value("output_path", "", type=str).strip()
         self.output_path.setText(out_p or self.default_output_path.text())
         self.limit_rate.setText(s.value("limit_rate", "", type=str).strip())
+        self.global_rate_limit.setText(s.value("global_rate_limit", "", type=str).strip())
         self.retries.setValue(s.value("retries", 10, type=int))
         self.extract_audio.setChecked(s.value("extract_audio", False, type=bool))
         self.keep_video.setChecked(s.value("keep_video", False, type=bool))
@@ -195,7 +241,18 @@ class SettingsMixin:
         self.no_color.setChecked(s.value("no_color", False, type=bool))
         self.simulate.setChecked(s.value("simulate", False, type=bool))
         self.skip_download.setChecked(s.value("skip_download", False, type=bool))
+        self.structured_progress.setChecked(s.value("structured_progress", True, type=bool))
         self.max_retry_per_item.setValue(s.value("max_retry_per_item", 2, type=int))
+        self.max_parallel_downloads.setValue(s.value("max_parallel_downloads", 3, type=int))
+        self.host_concurrency_limits.setText(
+            s.value("host_concurrency_limits", DEFAULT_HOST_LIMITS, type=str).strip()
+        )
+        self.batch_size.setValue(s.value("batch_size", 1, type=int))
+        self.disk_space_check.setChecked(s.value("disk_space_check", True, type=bool))
+        self.metadata_cache_ttl.setValue(s.value("metadata_cache_ttl_h", METADATA_CACHE_TTL_H, type=int))
+        self.thumb_store_max.setValue(s.value("thumb_store_max_mb", THUMB_STORE_MAX_MB, type=int))
+        idx = self.queue_policy.findData(s.value("queue_policy", POLICY_FIFO, type=str))
+        self.queue_policy.setCurrentIndex(max(0, idx))
         self.enable_clipboard_monitor.setChecked(s.value("enable_clipboard_monitor", False, type=bool))
 
         if self.enable_clipboard_monitor.isChecked():
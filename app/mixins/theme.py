@@ -18,6 +18,8 @@ class ThemeMixin:
             self.apply_dark_style()
         else:
             self.apply_white_style()
+        # kolory statusów liczy model — jeden sygnał, przerysowane tylko widoczne wiersze
+        self.queue_model.set_dark(self.is_dark_theme())
 
     def apply_dark_style(self):
         palette = build_dark_palette()
@@ -33,7 +35,3 @@ class ThemeMixin:
         theme = self.theme_combo.currentText()
         self.settings.setValue("theme", theme)
         self.apply_style()
-        for i in range(self.queue_list.count()):
-            it = self.queue_list.item(i)
-            st = it.data(self.queue_list.ROLE_STATUS) or self.queue_list.STATUS_NORMAL
-            self.queue_list.mark_status(it, st, self.is_dark_theme())
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Czytnik wyjścia procesu sterowany zdarzeniami.
+
+Zamiast pętli readline() + poll() wątek czeka w selektorze (POSIX) lub na
+kolejce zasilanej przez wątek czytający (Windows). Budzi się tylko, gdy przyjdą
+dane, proces zamknie potok albo minie limit czasu – w ciszy nie zużywa CPU.
+"""
+
+import codecs
+import os
+import queue
+import selectors
+import threading
+from typing import IO, Optional
+
+_CHUNK = 65536
+
+
+class PipeReader:
+    """Czyta strumień binarny i zwraca tekst ucięty na granicy linii (\\n lub \\r)."""
+
+    def __init__(self, stream: IO[bytes], encoding: str = "utf-8"):
+        self._stream = stream
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors="ignore")
+        self._tail = ""
+        self.eof = False
+        self._selector: Optional[selectors.BaseSelector] = None
+        self._queue: Optional[queue.Queue] = None
+        if os.name == "nt":
+            self._queue = queue.Queue()
+            threading.Thread(target=self._pump, daemon=True).start()
+        else:
+            self._fd = stream.fileno()
+            self._selector = selectors.DefaultSelector()
+            self._selector.register(self._fd, selectors.EVENT_READ)
+
+    def read(self, timeout: Optional[float]) -> Optional[str]:
+        """
+        Czeka na dane maks. `timeout` sekund.
+        Zwraca pełne linie (może być pusty string), None przy upływie czasu.
+        Po końcu strumienia ustawia `eof` i zwraca resztę bufora.
+        """
+        if self.eof:
+            return ""
+        data = self._read_raw(timeout)
+        if data is None:
+            return None
+        if not data:
+            self.eof = True
+            text, self._tail = self._tail + self._decoder.decode(b"", final=True), ""
+            return text
+        text = self._tail + self._decoder.decode(data)
+        cut = max(text.rfind("\n"), text.rfind("\r")) + 1
+        self._tail = text[cut:]
+        return text[:cut]
+
+    def close(self):
+        if self._selector is not None:
+            try:
+                self._selector.close()
+            except OSError:
+                pass
+            self._selector = None
+
+    def _read_raw(self, timeout: Optional[float]) -> Optional[bytes]:
+        if self._queue is not None:
+            try:
+                return self._queue.get(timeout=timeout)
+            except queue.Empty:
+                return None
+        if not self._selector.select(timeout):
+            return None
+        try:
+            return os.read(self._fd, _CHUNK)
+        except OSError:
+            return b""
+
+    def _pump(self):
+        """Windows: potoki nie działają z select(), więc czytamy w osobnym wątku."""
+        try:
+            while True:
+                data = self._stream.read(_CHUNK)
+                if not data:
+                    break
+                self._queue.put(data)
+        except (OSError, ValueError):
+            pass
+        self._queue.put(b"")
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+Strukturalny protokół postępu yt-dlp.
+
+Zamiast parsować regexem tekstowy pasek postępu, yt-dlp uruchamiany jest z
+`--newline` i `--progress-template`, który wypisuje jedną linię JSON (z
+prefiksem-znacznikiem) na każdą aktualizację. Linie są zamieniane na
+`ProgressRecord` z surowymi licznikami bajtów.
+
+Linia pobierania niesie też, po tabulatorze, kilka pól pobieranego elementu
+(id, tytuł, ekstraktor) ze słownika `info` szablonu — tytuł znamy od
+pierwszej aktualizacji bez osobnej ekstrakcji. Nie używamy do tego
+`--print before_dl:`, bo `--print` włącza tryb cichy i wycisza log w konsoli.
+"""
+
+import json
+import logging
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from .utils import human_duration, human_size
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_MARKER = "[ytdlp-gui:progress]"
+POSTPROCESS_MARKER = "[ytdlp-gui:postprocess]"
+
+_PROGRESS_FIELDS = (
+    "status,downloaded_bytes,total_bytes,total_bytes_estimate,speed,eta,elapsed,"
+    "fragment_index,fragment_count,filename,tmpfilename"
+)
+
+# Pola elementu dołączane do rekordów postępu (szablon, hooki, proces roboczy puli)
+ITEM_INFO_FIELDS = ("id", "title", "extractor_key", "webpage_url")
+
+PROGRESS_ARGS = [
+    "--newline",
+    "--progress-template",
+    f"download:{PROGRESS_MARKER}%(progress.{{{_PROGRESS_FIELDS}}})j\t%(info.{{{','.join(ITEM_INFO_FIELDS)}}})j",
+    "--progress-template", f"postprocess:{POSTPROCESS_MARKER}%(progress.{{status,postprocessor}})j",
+]
+
+_LINE_SPLIT_RE = re.compile(r"\r\n|\r|\n")
+
+
+@dataclass
+class ProgressRecord:
+    status: str = "downloading"
+    downloaded_bytes: int = 0
+    total_bytes: Optional[int] = None
+    total_is_estimate: bool = False
+    speed: Optional[float] = None          # bajty/s
+    eta: Optional[int] = None              # sekundy
+    elapsed: Optional[float] = None
+    fragment_index: Optional[int] = None
+    fragment_count: Optional[int] = None
+    filename: str = ""
+    tmpfilename: str = ""
+    postprocessor: str = ""
+    item: Optional[dict] = None            # ITEM_INFO_FIELDS pobieranego elementu
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "ProgressRecord":
+        """Buduje rekord ze słownika postępu yt-dlp (hook lub szablon JSON)."""
+        info = d.get("info") or d.get("info_dict")
+        item = {k: info[k] for k in ITEM_INFO_FIELDS if info.get(k)} if isinstance(info, dict) else None
+        total = d.get("total_bytes")
+        estimate = d.get("total_bytes_estimate")
+
+        def _int(v):
+            try:
+                return int(v) if v is not None else None
+            except (TypeError, ValueError):
+                return None
+
+        def _float(v):
+            try:
+                return float(v) if v is not None else None
+            except (TypeError, ValueError):
+                return None
+
+        return cls(
+            status=str(d.get("status") or "downloading"),
+            downloaded_bytes=_int(d.get("downloaded_bytes")) or 0,
+            total_bytes=_int(total) or _int(estimate),
+            total_is_estimate=not total and bool(estimate),
+            speed=_float(d.get("speed")),
+            eta=_int(d.get("eta")),
+            elapsed=_float(d.get("elapsed")),
+            fragment_index=_int(d.get("fragment_index")),
+            fragment_count=_int(d.get("fragment_count")),
+            filename=str(d.get("filename") or ""),
+            tmpfilename=str(d.get("tmpfilename") or ""),
+            postprocessor=str(d.get("postprocessor") or ""),
+            item=item or None,
+        )
+
+    @property
+    def title(self) -> str:
+        return str((self.item or {}).get("title") or "")
+
+    @property
+    def percent(self) -> Optional[float]:
+        if self.status == "finished":
+            return 100.0
+        if self.total_bytes:
+            return max(0.0, min(100.0, self.downloaded_bytes * 100.0 / self.total_bytes))
+        if self.fragment_index and self.fragment_count:
+            return max(0.0, min(100.0, self.fragment_index * 100.0 / self.fragment_count))
+        return None
+
+    def summary(self) -> str:
+        """Krótki opis do paska postępu, np. '12.3 MB / 1.0 GB | 4.5 MB/s | ETA 3:20'."""
+        if self.postprocessor:
+            return f"{self.postprocessor}..."
+        parts = [human_size(self.downloaded_bytes) if self.downloaded_bytes else "0 B"]
+        if self.total_bytes:
+            parts[0] += f" / {'~' if self.total_is_estimate else ''}{human_size(self.total_bytes)}"
+        if self.speed:
+            parts.append(f"{human_size(int(self.speed))}/s")
+        if self.eta is not None and self.status == "downloading":
+            parts.append(f"ETA {human_duration(self.eta)}")
+        if self.fragment_index and self.fragment_count:
+            parts.append(f"frag. {self.fragment_index}/{self.fragment_count}")
+        return " | ".join(parts)
+
+
+def split_lines(chunk: str) -> List[str]:
+    """Dzieli wyjście na linie, traktując `\\r` (nadpisywanie paska) jak koniec linii."""
+    return [ln.strip() for ln in _LINE_SPLIT_RE.split(chunk) if ln.strip()]
+
+
+def parse_line(line: str) -> Optional[ProgressRecord]:
+    """Zwraca rekord dla linii ze znacznikiem postępu, None dla zwykłych linii."""
+    if line.startswith(PROGRESS_MARKER):
+        payload = line[len(PROGRESS_MARKER):]
+    elif line.startswith(POSTPROCESS_MARKER):
+        payload = line[len(POSTPROCESS_MARKER):]
+    else:
+        return None
+    payload, _, item = payload.partition("\t")
+    try:
+        data = json.loads(payload)
+    except ValueError:
+        logger.debug(f"Niepoprawny JSON postępu: {payload!r}")
+        return None
+    if not isinstance(data, dict):
+        return None
+    if item:
+        try:
+            data["info"] = json.loads(item)
+        except ValueError:
+            logger.debug(f"Niepoprawny JSON elementu: {item!r}")
+    return ProgressRecord.from_dict(data)
+
+
+# ---------------------------------------------------------------------------
+# Wyniki uruchomienia wsadowego (--batch-file)
+# ---------------------------------------------------------------------------
+
+# Po przeniesieniu gotowego pliku yt-dlp dopisuje do pliku wyników linię z
+# adresami elementu (`--print-to-file` nie wycisza normalnego wyjścia, w
+# przeciwieństwie do `--print`). Dla wpisów playlisty pasuje adres playlisty.
+BATCH_DONE_TEMPLATE = "after_move:%(original_url)s\t%(webpage_url)s\t%(playlist_webpage_url|)s"
+
+
+def _norm_url(url: str) -> str:
+    return url.strip().rstrip("/")
+
+
+def batch_done_urls(text: str, urls: List[str]) -> set:
+    """Zwraca te z `urls`, które występują w pliku wyników uruchomienia wsadowego."""
+    seen = {_norm_url(tok) for line in text.splitlines() for tok in line.split("\t") if tok.strip()}
+    return {u for u in urls if _norm_url(u) in seen}
+
+
+# ---------------------------------------------------------------------------
+# Stan wznawiania (--print-to-file before_dl)
+# ---------------------------------------------------------------------------
+
+# Przed pobraniem yt-dlp zapisuje wybrany format i docelową nazwę pliku —
+# po przerwaniu ten sam format pozwala dokończyć istniejący plik .part.
+RESUME_STATE_TEMPLATE = "before_dl:%(original_url)s\t%(format_id)s\t%(filename)s"
+
+
+def parse_resume_state(text: str) -> Dict[str, dict]:
+    """Zamienia linie pliku stanu na {url: {"format_id", "filename"}} (ostatni wpis wygrywa)."""
+    states: Dict[str, dict] = {}
+    for line in text.splitlines():
+        parts = line.split("\t")
+        if len(parts) != 3 or not parts[0].strip():
+            continue
+        url, format_id, filename = (p.strip() for p in parts)
+        state = {}
+        if format_id and format_id != "NA":
+            state["format_id"] = format_id
+        if filename and filename != "NA":
+            state["filename"] = filename
+        if state:
+            states[url] = state
+    return states
+
+
+# ---------------------------------------------------------------------------
+# Wpis historii (--print-to-file after_move)
+# ---------------------------------------------------------------------------
+
+# Po przeniesieniu gotowego pliku yt-dlp dopisuje linię JSON z danymi
+# elementu — dla playlisty jedną na każdy pobrany plik.
+HISTORY_FIELDS = (
+    "original_url", "webpage_url", "extractor_key", "id", "title", "filepath",
+    "duration", "filesize", "filesize_approx",
+)
+HISTORY_TEMPLATE = f"after_move:%(.{{{','.join(HISTORY_FIELDS)}}})j"
+
+
+def parse_history_lines(text: str) -> List[dict]:
+    """Zwraca wpisy z pliku historii (pomija linie, które nie są obiektem JSON)."""
+    entries = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(data, dict):
+            entries.append(data)
+    return entries
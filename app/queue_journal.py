@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+Trwały zapis kolejki: migawka + dziennik zmian (bez zależności od Qt).
+
+  - queue.json     — migawka całej kolejki (zapisywana atomowo: plik
+                     tymczasowy, fsync, os.replace)
+  - queue.journal  — dopisywane rekordy zmian z `QueueStore.drain_changes`
+                     (JSON w liniach), po jednej partii na zapis
+
+Zapis odbywa się w wątku w tle: zmiany zgłoszone w ciągu `debounce_s` są
+łączone w jedną partię, a po `compact_every` rekordach dziennik jest
+scalany do nowej migawki. Migawka i dziennik niosą numer generacji —
+dziennik z inną generacją niż migawka jest już w niej zawarty i przy
+odczycie jest pomijany, więc awaria w trakcie scalania niczego nie dubluje.
+Urwana ostatnia linia dziennika (awaria w trakcie zapisu) jest ignorowana.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .queue_store import QUEUE_FILE_VERSION
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_NAME = "queue.json"
+JOURNAL_NAME = "queue.journal"
+
+
+def _fsync_write(path: Path, text: str):
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class QueueJournal:
+    def __init__(self, directory: Path, debounce_s: float = 0.5, compact_every: int = 5000):
+        self.directory = Path(directory)
+        self.snapshot_path = self.directory / SNAPSHOT_NAME
+        self.journal_path = self.directory / JOURNAL_NAME
+        self.debounce_s = debounce_s
+        self.compact_every = compact_every
+
+        # Kopia stanu kolejki należąca do wątku zapisu (z niej powstaje migawka)
+        self._items: "OrderedDict[str, dict]" = OrderedDict()
+        self._retry_at: Dict[str, float] = {}
+        self._generation = 0
+        self._journal_records = 0
+
+        self._cond = threading.Condition()
+        self._pending: List[dict] = []
+        self._busy = False
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    # Odczyt (wątek GUI, przed pierwszym zapisem)
+    # ------------------------------------------------------------------
+
+    def load(self) -> Optional[dict]:
+        """
+        Odtwarza zapisany stan: migawka + rekordy dziennika tej samej generacji.
+        Zwraca dane dla `QueueStore.load` (z kluczem "retry_at") albo None, gdy
+        nic nie zapisano. Starsze formaty queue.json są zwracane bez zmian.
+        """
+        data = None
+        if self.snapshot_path.exists():
+            content = self.snapshot_path.read_text(encoding="utf-8").strip()
+            data = json.loads(content) if content else {}
+        if isinstance(data, dict) and data.get("version") == QUEUE_FILE_VERSION:
+            self._generation = int(data.get("generation") or 0)
+            self._items = OrderedDict(
+                (d["url"], d) for d in data.get("items", []) if isinstance(d, dict) and d.get("url")
+            )
+            self._retry_at = dict(data.get("retry_at") or {})
+        elif data is not None:
+            return data   # stary format — wywołujący robi `rebase`
+        replayed = self._replay_journal()
+        if data is None and not replayed:
+            return None
+        return self._snapshot_data()
+
+    def _replay_journal(self) -> int:
+        if not self.journal_path.exists():
+            return 0
+        count = 0
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            header = f.readline()
+            try:
+                gen = json.loads(header).get("generation")
+            except (ValueError, AttributeError):
+                gen = None
+            if gen != self._generation:
+                # dziennik sprzed ostatniego scalenia — jego zmiany są już w migawce
+                return 0
+            for line in f:
+                try:
+                    batch = json.loads(line)
+                except ValueError:
+                    logger.warning("Pominięto uszkodzoną linię dziennika kolejki.")
+                    break
+                self._apply(batch)
+                count += len(batch)
+        self._journal_records = count
+        return count
+
+    def _snapshot_data(self) -> dict:
+        return {
+            "version": QUEUE_FILE_VERSION,
+            "generation": self._generation,
+            "items": list(self._items.values()),
+            "retry_at": self._retry_at,
+        }
+
+    def _apply(self, records: List[dict]):
+        for rec in records:
+            op = rec.get("op")
+            if op == "put":
+                item = rec["item"]
+                self._items[item["url"]] = item
+            elif op == "del":
+                self._items.pop(rec["url"], None)
+            elif op == "move_end":
+                if rec["url"] in self._items:
+                    self._items.move_to_end(rec["url"])
+            elif op == "order":
+                for url in rec["urls"]:
+                    if url in self._items:
+                        self._items.move_to_end(url)
+            elif op == "clear":
+                self._items.clear()
+            elif op == "retry_at":
+                self._retry_at = dict(rec["data"])
+
+    # ------------------------------------------------------------------
+    # Zapis (dowolny wątek -> wątek w tle)
+    # ------------------------------------------------------------------
+
+    def submit(self, records: List[dict], retry_at: Optional[Dict[str, float]] = None):
+        """Zgłasza zmiany do zapisu; wraca od razu."""
+        with self._cond:
+            if self._closed:
+                return
+            self._pending.extend(records)
+            if retry_at is not None:
+                self._pending.append({"op": "retry_at", "data": dict(retry_at)})
+            if not self._pending:
+                return
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="queue-journal", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def rebase(self, items: List[dict], retry_at: Dict[str, float]):
+        """Zastępuje zapisany stan pełną listą elementów (np. po migracji starego formatu)."""
+        self.submit([{"op": "clear"}] + [{"op": "put", "item": d} for d in items], retry_at)
+        with self._cond:
+            self._pending.append({"op": "compact"})
+            self._cond.notify()
+
+    def flush(self, timeout: float = 10.0):
+        """Czeka, aż wszystkie zgłoszone zmiany trafią na dysk."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._cond.notify_all()
+            while (self._pending or self._busy) and self._thread is not None:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    logger.warning("Zapis kolejki nie zakończył się w wyznaczonym czasie.")
+                    return
+                self._cond.wait(left)
+
+    def close(self, timeout: float = 10.0):
+        """Zapisuje zaległe zmiany, scala dziennik do migawki i kończy wątek."""
+        with self._cond:
+            self._pending.append({"op": "compact"})
+            self._closed = True
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="queue-journal", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+        self.flush(timeout)
+        self._thread.join(timeout=1.0)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending and self._closed:
+                    return
+                # debounce: zbieramy zmiany jeszcze przez chwilę (chyba że zamykamy)
+                deadline = time.monotonic() + self.debounce_s
+                while not self._closed:
+                    left = deadline - time.monotonic()
+                    if left <= 0:
+                        break
+                    self._cond.wait(left)
+                batch, self._pending = self._pending, []
+                self._busy = True
+            try:
+                self._write(batch)
+            except Exception as e:
+                logger.error(f"Błąd zapisu kolejki: {e}", exc_info=True)
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+
+    def _write(self, batch: List[dict]):
+        compact = any(r.get("op") == "compact" for r in batch)
+        records = [r for r in batch if r.get("op") != "compact"]
+        records = self._coalesce(records)
+        self._apply(records)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if ((compact and (records or self._journal_records))
+                or self._journal_records + len(records) >= self.compact_every):
+            self._compact()
+        elif records:
+            new_file = not self.journal_path.exists() or self.journal_path.stat().st_size == 0
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                if new_file:
+                    f.write(json.dumps({"generation": self._generation}) + "\n")
+                f.write(json.dumps(records, ensure_ascii=False, separators=(",", ":")) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._journal_records += len(records)
+
+    def _coalesce(self, records: List[dict]) -> List[dict]:
+        """
+        Łączy rekordy partii: kolejne "put" tego samego URL-a nadpisują treść
+        pierwszego (pozycja nowego elementu zostaje), zostaje tylko ostatni
+        "retry_at" i to tylko wtedy, gdy coś zmienia.
+        """
+        out: List[dict] = []
+        put_at: Dict[str, int] = {}
+        retry = None
+        for r in records:
+            op = r["op"]
+            if op == "put":
+                url = r["item"]["url"]
+                if url in put_at:
+                    out[put_at[url]] = r
+                    continue
+                put_at[url] = len(out)
+            elif op == "del":
+                put_at.pop(r["url"], None)
+            elif op == "clear":
+                put_at.clear()
+            elif op == "retry_at":
+                retry = r
+                continue
+            out.append(r)
+        if retry is not None and retry["data"] != self._retry_at:
+            out.append(retry)
+        return out
+
+    def _compact(self):
+        self._generation += 1
+        _fsync_write(
+            self.snapshot_path,
+            json.dumps(self._snapshot_data(), ensure_ascii=False, separators=(",", ":")),
+        )
+        # po podmianie migawki stary dziennik jest już nieaktualny (inna generacja)
+        _fsync_write(self.journal_path, json.dumps({"generation": self._generation}) + "\n")
+        self._journal_records = 0
@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""
+Stan kolejki pobierania (bez zależności od Qt).
+
+`QueueStore` jest jedynym źródłem prawdy o kolejce: elementy trzymane są
+w OrderedDict kluczowanym URL-em (duplikaty URL-i nie są dopuszczane),
+więc wyszukiwanie, zmiana statusu i usuwanie są O(1), a iteracja zachowuje
+kolejność z listy. Liczniki statusów są utrzymywane na bieżąco.
+Widget kolejki jest tylko widokiem tego stanu.
+
+Magazyn zapamiętuje też, co zmieniło się od ostatniego zapisu
+(`drain_changes`), żeby dziennik kolejki (queue_journal) dopisywał tylko
+zmienione elementy zamiast przepisywać całą kolejkę.
+"""
+
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+
+from .scheduler import PRIORITY_INTERACTIVE, PRIORITY_LABELS, source_key
+
+STATUS_QUEUED = "queued"
+STATUS_FAILED = "failed"
+
+QUEUE_FILE_VERSION = 2
+
+# stany w rejestrze zmian (od ostatniego drain_changes)
+_ADDED, _UPDATED, _REMOVED, _READDED = "add", "put", "del", "readd"
+
+
+@dataclass
+class QueueItem:
+    url: str
+    status: str = STATUS_QUEUED
+    retries: int = 0
+    priority: int = PRIORITY_INTERACTIVE
+    source: str = ""          # jawne źródło (np. lista URL-i); puste = wg URL-a
+    added_at: float = 0.0
+    estimated_bytes: int = 0
+    # stan wznawiania: format_id, filename, part_file, downloaded_bytes, total_bytes
+    state: Dict = field(default_factory=dict)
+
+    @property
+    def failed(self) -> bool:
+        return self.status == STATUS_FAILED
+
+    @property
+    def source_group(self) -> str:
+        """Źródło dla polityki "po równo" (liczone dopiero przy planowaniu)."""
+        return self.source or source_key(self.url)
+
+    def to_dict(self) -> dict:
+        d = {"url": self.url, "status": self.status, "added_at": self.added_at}
+        if self.retries:
+            d["retries"] = self.retries
+        if self.priority != PRIORITY_INTERACTIVE:
+            d["priority"] = self.priority
+        if self.source:
+            d["source"] = self.source
+        if self.estimated_bytes:
+            d["estimated_bytes"] = self.estimated_bytes
+        if self.state:
+            d["state"] = dict(self.state)
+        return d
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "QueueItem":
+        url = str(d["url"]).strip()
+        priority = d.get("priority", PRIORITY_INTERACTIVE)
+        return cls(
+            url=url,
+            status=STATUS_FAILED if d.get("status") == STATUS_FAILED else STATUS_QUEUED,
+            retries=int(d.get("retries") or 0),
+            priority=priority if priority in PRIORITY_LABELS else PRIORITY_INTERACTIVE,
+            source=d.get("source") or "",
+            added_at=float(d.get("added_at") or time.time()),
+            estimated_bytes=int(d.get("estimated_bytes") or 0),
+            state=dict(d.get("state") or {}),
+        )
+
+
+class QueueStore:
+    """Uporządkowany, indeksowany zbiór elementów kolejki."""
+
+    def __init__(self):
+        self._items: "OrderedDict[str, QueueItem]" = OrderedDict()
+        self._counts: Counter = Counter()
+        self._changed: "OrderedDict[str, str]" = OrderedDict()
+        self._moved_to_end: List[str] = []
+        self._order_changed = False
+        self._cleared = False
+
+    # ------------------------------------------------------------------
+    # Odczyt
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._items
+
+    def __iter__(self) -> Iterator[QueueItem]:
+        return iter(list(self._items.values()))
+
+    def get(self, url: str) -> Optional[QueueItem]:
+        return self._items.get(url)
+
+    def urls(self, status: Optional[str] = None) -> List[str]:
+        if status is None:
+            return list(self._items)
+        return [u for u, it in self._items.items() if it.status == status]
+
+    def count(self, status: str) -> int:
+        return self._counts[status]
+
+    def is_failed(self, url: str) -> bool:
+        it = self._items.get(url)
+        return bool(it and it.failed)
+
+    def index(self, url: str) -> int:
+        """Pozycja elementu (O(n) — tylko dla operacji wywoływanych przez użytkownika)."""
+        for i, u in enumerate(self._items):
+            if u == url:
+                return i
+        return -1
+
+    # ------------------------------------------------------------------
+    # Zmiany
+    # ------------------------------------------------------------------
+
+    def add(self, url: str, priority: int = PRIORITY_INTERACTIVE,
+            source: Optional[str] = None) -> Optional[QueueItem]:
+        """Dodaje URL na koniec kolejki. Zwraca None, jeśli już w niej jest."""
+        if url in self._items:
+            return None
+        item = QueueItem(url=url, priority=priority, source=source or "", added_at=time.time())
+        self._items[url] = item
+        self._counts[item.status] += 1
+        self._mark(url, _ADDED)
+        return item
+
+    def remove(self, url: str) -> Optional[QueueItem]:
+        item = self._items.pop(url, None)
+        if item:
+            self._counts[item.status] -= 1
+            self._mark(url, _REMOVED)
+        return item
+
+    def clear(self):
+        self._items.clear()
+        self._counts.clear()
+        self._reset_changes()
+        self._cleared = True
+
+    def touch(self, url: str):
+        """Oznacza element jako zmieniony (po bezpośredniej zmianie pól QueueItem)."""
+        if url in self._items:
+            self._mark(url, _UPDATED)
+
+    def set_status(self, url: str, status: str):
+        item = self._items.get(url)
+        if item and item.status != status:
+            self._counts[item.status] -= 1
+            self._counts[status] += 1
+            item.status = status
+            self._mark(url, _UPDATED)
+
+    def requeue_failed(self) -> List[str]:
+        """Przenosi wszystkie nieudane z powrotem do kolejki (z wyzerowanymi ponowieniami)."""
+        moved = []
+        for url, item in self._items.items():
+            if item.failed:
+                moved.append(url)
+            if item.retries:
+                item.retries = 0
+                self._mark(url, _UPDATED)
+        for url in moved:
+            self.set_status(url, STATUS_QUEUED)
+        return moved
+
+    def move_to_end(self, url: str):
+        if url in self._items:
+            self._items.move_to_end(url)
+            self._moved_to_end.append(url)
+
+    def move(self, url: str, new_index: int):
+        """Przenosi element na pozycję `new_index`."""
+        if url not in self._items:
+            return
+        order = [u for u in self._items if u != url]
+        order.insert(max(0, min(new_index, len(order))), url)
+        self.reorder(order)
+
+    def reorder(self, urls: List[str]):
+        """Ustawia kolejność wg `urls`; elementy spoza listy trafiają za nimi."""
+        listed = [u for u in urls if u in self._items]
+        seen = set(listed)
+        for url in listed + [u for u in self._items if u not in seen]:
+            self._items.move_to_end(url)
+        self._order_changed = True
+
+    def rename(self, old: str, new: str) -> bool:
+        """Zmienia URL elementu, zachowując jego pozycję i metadane."""
+        if old not in self._items or (new != old and new in self._items):
+            return False
+        order = list(self._items)
+        item = self._items.pop(old)
+        item.url = new
+        item.state = {}
+        self._items[new] = item
+        self._mark(old, _REMOVED)
+        self._mark(new, _ADDED)
+        self.reorder([new if u == old else u for u in order])
+        return True
+
+    # ------------------------------------------------------------------
+    # Rejestr zmian
+    # ------------------------------------------------------------------
+
+    def _mark(self, url: str, change: str):
+        prev = self._changed.get(url)
+        if change == _UPDATED and prev in (_ADDED, _READDED):
+            return
+        if change == _ADDED and prev == _REMOVED:
+            change = _READDED
+        self._changed[url] = change
+
+    def drain_changes(self) -> List[dict]:
+        """
+        Zwraca rekordy zmian od poprzedniego wywołania i czyści rejestr:
+        {"op": "clear"}, {"op": "put", "item": {...}}, {"op": "del", "url": ...},
+        {"op": "move_end", "url": ...}, {"op": "order", "urls": [...]}.
+        """
+        records: List[dict] = []
+        if self._cleared:
+            records.append({"op": "clear"})
+        for url, change in self._changed.items():
+            item = self._items.get(url)
+            if change in (_REMOVED, _READDED) or item is None:
+                records.append({"op": "del", "url": url})
+            if item is not None and change != _REMOVED:
+                records.append({"op": "put", "item": item.to_dict()})
+        if self._order_changed:
+            records.append({"op": "order", "urls": list(self._items)})
+        else:
+            records.extend({"op": "move_end", "url": u} for u in self._moved_to_end)
+        self._reset_changes()
+        return records
+
+    def _reset_changes(self):
+        self._changed.clear()
+        self._moved_to_end.clear()
+        self._order_changed = False
+        self._cleared = False
+
+    # ------------------------------------------------------------------
+    # Zapis / odczyt
+    # ------------------------------------------------------------------
+
+    def to_list(self) -> List[dict]:
+        return [it.to_dict() for it in self._items.values()]
+
+    def load(self, data) -> bool:
+        """
+        Wczytuje kolejkę z queue.json. Obsługuje bieżący format ("items" jako lista)
+        oraz starsze: słownik z download_queue/failed_queue/... i gołą listę URL-i.
+        Wczytany stan traktowany jest jako zapisany (rejestr zmian jest pusty).
+        """
+        ok = self._load(data)
+        self._reset_changes()
+        return ok
+
+    def _load(self, data) -> bool:
+        self.clear()
+        if isinstance(data, list):
+            for u in data:
+                if isinstance(u, str) and u.strip():
+                    self.add(u.strip())
+            return True
+        if not isinstance(data, dict):
+            return False
+        items = data.get("items")
+        if isinstance(items, list):
+            for d in items:
+                if not isinstance(d, dict) or not str(d.get("url", "")).strip():
+                    continue
+                item = QueueItem.from_dict(d)
+                if item.url not in self._items:
+                    self._items[item.url] = item
+                    self._counts[item.status] += 1
+            return True
+        # format sprzed QueueStore
+        states = items if isinstance(items, dict) else {}
+        priority = data.get("priority") or {}
+        sources = data.get("sources") or {}
+        added = data.get("added_at") or {}
+        retries = data.get("retry_counts") or {}
+        queued = [u.strip() for u in data.get("download_queue", []) if u and u.strip()]
+        failed = [u.strip() for u in data.get("failed_queue", []) if u and u.strip()]
+        for u in queued + failed:
+            src = sources.get(u)
+            item = self.add(u, source=src if src != source_key(u) else None)
+            if not item:
+                continue
+            if priority.get(u) in PRIORITY_LABELS:
+                item.priority = priority[u]
+            item.added_at = float(added.get(u) or item.added_at)
+            item.retries = int(retries.get(u) or 0)
+            if isinstance(states.get(u), dict):
+                item.state = dict(states[u])
+            if u in failed:
+                self.set_status(u, STATUS_FAILED)
+        return True
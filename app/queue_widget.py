@@ -1,56 +1,399 @@
 # -*- coding: utf-8 -*-
 """
-Niestandardowy widget listy kolejki pobierania.
+Panel kolejki pobierania: model + widok + delegat.
 
 Obsługuje:
+  - model listy nad `QueueStore` (wiersze to URL-e, reszta czytana na żądanie)
+  - zbiorcze wstawianie / usuwanie / odświeżanie jako zakresy wierszy
+    (jeden sygnał na ciągły blok, a nie na każdy element)
+  - delegat rysujący miniaturę (z pamięci podręcznej dekodowanej w tle)
+    i pasek postępu tylko dla widocznych wierszy
   - drag & drop (wewnętrzne porządkowanie i zewnętrzne URL-e)
-  - menu kontekstowe
+  - menu kontekstowe (w tym priorytet elementów)
   - kolorowanie statusu elementów (normalny / ponowienie / błąd)
 """
 
 import webbrowser
+from typing import Callable, Dict, Iterable, List, Optional
 
-from PyQt6.QtCore import Qt, pyqtSignal, QSize
-from PyQt6.QtGui import QAction, QColor
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, QRect, QSize, Qt, pyqtSignal
+from PyQt6.QtGui import QAction, QColor, QDrag, QFont, QIcon
 from PyQt6.QtWidgets import (
     QAbstractItemView,
     QApplication,
-    QListWidget,
-    QListWidgetItem,
+    QListView,
     QMenu,
+    QStyledItemDelegate,
+    QStyleOptionViewItem,
 )
 
 from .config import STRICT_URL_REGEX, URL_SIMPLE_REGEX
+from .queue_store import QueueStore
+from .scheduler import PRIORITY_BULK, PRIORITY_HIGH, PRIORITY_LABELS
+from .thumbnail_cache import ThumbnailCache
 
+THUMB_SIZE = QSize(64, 36)
 
-class QueueListWidget(QListWidget):
-    dropped_reordered     = pyqtSignal()
-    dropped_external_urls = pyqtSignal(list)
 
-    ROLE_STATUS    = Qt.ItemDataRole.UserRole + 1
-    STATUS_NORMAL  = "normal"
+def _runs(rows: Iterable[int]) -> List[tuple]:
+    """Grupuje numery wierszy w ciągłe zakresy (first, last), rosnąco."""
+    runs: List[list] = []
+    for r in sorted(set(rows)):
+        if runs and r == runs[-1][1] + 1:
+            runs[-1][1] = r
+        else:
+            runs.append([r, r])
+    return [tuple(r) for r in runs]
+
+
+class QueueListModel(QAbstractListModel):
+    ROLE_STATUS   = Qt.ItemDataRole.UserRole + 1
+    ROLE_THUMB    = Qt.ItemDataRole.UserRole + 2
+    ROLE_PROGRESS = Qt.ItemDataRole.UserRole + 3
+
+    STATUS_NORMAL   = "normal"
     STATUS_RETRYING = "retrying"
-    STATUS_FAILED  = "failed"
+    STATUS_FAILED   = "failed"
 
-    def __init__(self, parent=None):
+    def __init__(self, store: QueueStore, parent=None):
         super().__init__(parent)
+        self.store = store
+        self._rows: List[str] = []
+        self._row_of: Dict[str, int] = {}
+        self._index_dirty = False
+        self._thumbs: Dict[str, str] = {}
+        self._titles: Dict[str, str] = {}
+        self._dark = False
+        # dostarczane przez okno: podpowiedź, czy czeka na ponowienie, postęp (0–100 albo None)
+        self.tooltip_provider: Optional[Callable[[str], str]] = None
+        self.retry_provider: Optional[Callable[[str], bool]] = None
+        self.progress_provider: Optional[Callable[[str], Optional[float]]] = None
+
+    # ------------------------------------------------------------------
+    # Indeks URL -> wiersz
+    # ------------------------------------------------------------------
+
+    def row_of(self, url: str) -> int:
+        if self._index_dirty:
+            self._row_of = {u: i for i, u in enumerate(self._rows)}
+            self._index_dirty = False
+        return self._row_of.get(url, -1)
+
+    def url_at(self, row: int) -> Optional[str]:
+        return self._rows[row] if 0 <= row < len(self._rows) else None
+
+    def urls(self) -> List[str]:
+        """URL-e w kolejności wyświetlania."""
+        return list(self._rows)
+
+    def __contains__(self, url: str) -> bool:
+        return self.row_of(url) >= 0
+
+    # ------------------------------------------------------------------
+    # Zmiany struktury
+    # ------------------------------------------------------------------
+
+    def add_url(self, url: str, row: Optional[int] = None):
+        self.add_urls([url], row)
+
+    def add_urls(self, urls: List[str], row: Optional[int] = None):
+        """Wstawia URL-e jednym blokiem (jeden sygnał rowsInserted)."""
+        urls = [u for u in dict.fromkeys(urls) if u not in self]
+        if not urls:
+            return
+        end = len(self._rows)
+        row = end if row is None else max(0, min(row, end))
+        self.beginInsertRows(QModelIndex(), row, row + len(urls) - 1)
+        self._rows[row:row] = urls
+        if row == end and not self._index_dirty:
+            self._row_of.update((u, end + i) for i, u in enumerate(urls))
+        else:
+            self._index_dirty = True
+        self.endInsertRows()
+
+    def take_url(self, url: str) -> int:
+        """Usuwa wiersz URL-a; zwraca jego numer lub -1."""
+        row = self.row_of(url)
+        if row >= 0:
+            self.remove_urls([url])
+        return row
+
+    def remove_urls(self, urls: Iterable[str]):
+        """Usuwa wiersze — po jednym sygnale na każdy ciągły zakres."""
+        rows = [r for r in (self.row_of(u) for u in urls) if r >= 0]
+        for first, last in reversed(_runs(rows)):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            for u in self._rows[first:last + 1]:
+                self._thumbs.pop(u, None)
+                self._titles.pop(u, None)
+            del self._rows[first:last + 1]
+            self.endRemoveRows()
+        if rows:
+            self._index_dirty = True
+
+    def move_row(self, src: int, dst: int) -> bool:
+        """Przenosi wiersz `src` tak, by znalazł się na pozycji `dst` (po przeniesieniu)."""
+        n = len(self._rows)
+        if not (0 <= src < n) or not (0 <= dst < n) or src == dst:
+            return False
+        # beginMoveRows oczekuje pozycji docelowej sprzed usunięcia wiersza
+        self.beginMoveRows(QModelIndex(), src, src, QModelIndex(), dst + 1 if dst > src else dst)
+        self._rows.insert(dst, self._rows.pop(src))
+        self._index_dirty = True
+        self.endMoveRows()
+        return True
+
+    def move_to_end(self, url: str):
+        row = self.row_of(url)
+        if row >= 0:
+            self.move_row(row, len(self._rows) - 1)
+
+    def move_rows(self, rows: List[int], dst: int):
+        """Przenosi (niekoniecznie sąsiednie) wiersze przed wiersz `dst` — dla drag & drop."""
+        picked = set(r for r in rows if 0 <= r < len(self._rows))
+        if not picked:
+            return
+        moving = [self._rows[r] for r in sorted(picked)]
+        dst -= sum(1 for r in picked if r < dst)
+        rest = [u for i, u in enumerate(self._rows) if i not in picked]
+        rest[dst:dst] = moving
+        # zmiana układu (nie reset): zaznaczenie i przewinięcie zostają
+        self.layoutAboutToBeChanged.emit()
+        old_rows = self._rows
+        self._rows = rest
+        self._index_dirty = True
+        persistent = self.persistentIndexList()
+        self.changePersistentIndexList(
+            persistent, [self.index(self.row_of(old_rows[i.row()])) for i in persistent]
+        )
+        self.layoutChanged.emit()
+
+    def rename_url(self, old: str, new: str):
+        row = self.row_of(old)
+        if row < 0:
+            return
+        self._rows[row] = new
+        self._thumbs.pop(old, None)
+        self._titles.pop(old, None)
+        self._index_dirty = True
+        self.refresh_rows([row])
+
+    def clear(self):
+        self.beginResetModel()
+        self._rows = []
+        self._row_of = {}
+        self._index_dirty = False
+        self._thumbs.clear()
+        self._titles.clear()
+        self.endResetModel()
+
+    # ------------------------------------------------------------------
+    # Odświeżanie danych wierszy
+    # ------------------------------------------------------------------
+
+    def refresh(self, url: str):
+        self.refresh_urls([url])
+
+    def refresh_urls(self, urls: Iterable[str]):
+        self.refresh_rows(r for r in (self.row_of(u) for u in urls) if r >= 0)
+
+    def refresh_rows(self, rows: Iterable[int]):
+        for first, last in _runs(rows):
+            self.dataChanged.emit(self.index(first), self.index(last))
+
+    def refresh_all(self):
+        if self._rows:
+            self.dataChanged.emit(self.index(0), self.index(len(self._rows) - 1))
+
+    def set_dark(self, dark: bool):
+        if dark != self._dark:
+            self._dark = dark
+            self.refresh_all()
+
+    def set_preview(self, url: str, title: Optional[str] = None, thumb_key: Optional[str] = None):
+        """Zapamiętuje tytuł i miniaturę z podglądu (rysowane dopiero, gdy wiersz jest widoczny)."""
+        if url not in self:
+            return
+        if title:
+            self._titles[url] = title
+        if thumb_key:
+            self._thumbs[url] = thumb_key
+        self.refresh(url)
+
+    def title_of(self, url: str) -> str:
+        return self._titles.get(url, "")
+
+    # ------------------------------------------------------------------
+    # QAbstractListModel
+    # ------------------------------------------------------------------
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def flags(self, index: QModelIndex):
+        base = Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled
+        if index.isValid():
+            return base | Qt.ItemFlag.ItemIsDragEnabled
+        return base | Qt.ItemFlag.ItemIsDropEnabled
+
+    def supportedDropActions(self):
+        return Qt.DropAction.MoveAction
+
+    def mimeData(self, indexes):
+        mime = super().mimeData(indexes)
+        urls = [self._rows[i.row()] for i in sorted(indexes, key=lambda i: i.row())]
+        mime.setText("\n".join(urls))
+        return mime
+
+    def status_of(self, url: str) -> str:
+        qi = self.store.get(url)
+        if qi and qi.failed:
+            return self.STATUS_FAILED
+        if self.retry_provider and self.retry_provider(url):
+            return self.STATUS_RETRYING
+        return self.STATUS_NORMAL
+
+    def data(self, index: QModelIndex, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._rows):
+            return None
+        url = self._rows[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return url
+        if role == Qt.ItemDataRole.ToolTipRole:
+            tip = self.tooltip_provider(url) if self.tooltip_provider else url
+            title = self._titles.get(url)
+            return f"{title}\n{tip}" if title else tip
+        if role == self.ROLE_STATUS:
+            return self.status_of(url)
+        if role == self.ROLE_THUMB:
+            return self._thumbs.get(url)
+        if role == self.ROLE_PROGRESS:
+            return self.progress_provider(url) if self.progress_provider else None
+        if role == Qt.ItemDataRole.FontRole:
+            qi = self.store.get(url)
+            if qi and qi.priority in (PRIORITY_HIGH, PRIORITY_BULK):
+                # pilne — pogrubione, masowe — kursywa
+                font = QFont()
+                font.setBold(qi.priority == PRIORITY_HIGH)
+                font.setItalic(qi.priority == PRIORITY_BULK)
+                return font
+            return None
+        if role in (Qt.ItemDataRole.BackgroundRole, Qt.ItemDataRole.ForegroundRole):
+            colors = self._status_colors(self.status_of(url))
+            if colors:
+                return colors[0] if role == Qt.ItemDataRole.BackgroundRole else colors[1]
+        return None
+
+    def _status_colors(self, status: str):
+        if status == self.STATUS_FAILED:
+            if self._dark:
+                return QColor(120, 50, 50), QColor(255, 200, 200)
+            return QColor(255, 200, 200), QColor(150, 0, 0)
+        if status == self.STATUS_RETRYING:
+            if self._dark:
+                return QColor(120, 80, 30), QColor(255, 230, 200)
+            return QColor(255, 230, 200), QColor(120, 60, 0)
+        return None
+
+
+class QueueItemDelegate(QStyledItemDelegate):
+    """
+    Miniatura po lewej i cienki pasek postępu u dołu wiersza (tylko dla rysowanych
+    wierszy). Miniatury dekoduje w tle `ThumbnailCache` — do tego czasu wiersz jest bez ikony.
+    """
+
+    def __init__(self, thumbnails: ThumbnailCache, parent=None):
+        super().__init__(parent)
+        self.thumbnails = thumbnails
+
+    def initStyleOption(self, option, index):
+        super().initStyleOption(option, index)
+        thumb = index.data(QueueListModel.ROLE_THUMB)
+        if thumb:
+            pix = self.thumbnails.pixmap(thumb, THUMB_SIZE)
+            if pix is not None:
+                option.icon = QIcon(pix)
+                option.features |= QStyleOptionViewItem.ViewItemFeature.HasDecoration
+                option.decorationSize = THUMB_SIZE
+
+    def paint(self, painter, option, index):
+        super().paint(painter, option, index)
+        progress = index.data(QueueListModel.ROLE_PROGRESS)
+        if progress is None:
+            return
+        r = option.rect
+        width = int(r.width() * max(0.0, min(100.0, progress)) / 100)
+        painter.fillRect(QRect(r.left(), r.bottom() - 2, width, 3), option.palette.highlight())
+
+    def sizeHint(self, option, index):
+        size = super().sizeHint(option, index)
+        # stała wysokość (z miejscem na miniaturę) — widok liczy rozmiar tylko raz
+        return QSize(size.width(), max(size.height(), THUMB_SIZE.height() + 4))
+
+
+class QueueListView(QListView):
+    dropped_reordered     = pyqtSignal()
+    dropped_external_urls = pyqtSignal(list)
+
+    def __init__(self, model: QueueListModel, thumbnails: ThumbnailCache, parent=None):
+        super().__init__(parent)
+        self.setModel(model)
+        self.setItemDelegate(QueueItemDelegate(thumbnails, self))
+        thumbnails.ready.connect(lambda _vid: self.viewport().update())
+        # jednakowa wysokość wierszy: widok nie pyta o rozmiar każdego z 100k elementów
+        self.setUniformItemSizes(True)
         self.setAcceptDrops(True)
         self.setDragEnabled(True)
         self.setDragDropMode(QAbstractItemView.DragDropMode.InternalMove)
         self.setDefaultDropAction(Qt.DropAction.MoveAction)
+        self.setDropIndicatorShown(True)
         self.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
         self.setAlternatingRowColors(True)
         self.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.customContextMenuRequested.connect(self._open_context_menu)
-        self.setIconSize(QSize(64, 36))
+        self.setIconSize(THUMB_SIZE)
+
+    # ------------------------------------------------------------------
+    # Zaznaczenie
+    # ------------------------------------------------------------------
+
+    def selected_rows(self) -> List[int]:
+        return sorted(i.row() for i in self.selectionModel().selectedRows())
+
+    def selected_urls(self) -> List[str]:
+        model = self.model()
+        return [model.url_at(r) for r in self.selected_rows()]
+
+    def select_url(self, url: str):
+        row = self.model().row_of(url)
+        if row >= 0:
+            self.setCurrentIndex(self.model().index(row))
 
     # ------------------------------------------------------------------
     # Drag & drop
     # ------------------------------------------------------------------
 
+    def startDrag(self, supported_actions):
+        # własny start: po upuszczeniu wiersze przenosi dropEvent, widok niczego nie usuwa
+        indexes = self.selectionModel().selectedRows()
+        if not indexes:
+            return
+        drag = QDrag(self)
+        drag.setMimeData(self.model().mimeData(indexes))
+        drag.exec(Qt.DropAction.MoveAction)
+
     def dropEvent(self, event):
-        if event.source() is self and event.dropAction() == Qt.DropAction.MoveAction:
-            super().dropEvent(event)
+        if event.source() is self:
+            pos = event.position().toPoint()
+            idx = self.indexAt(pos)
+            if not idx.isValid():
+                dst = self.model().rowCount()
+            else:
+                rect = self.visualRect(idx)
+                dst = idx.row() + (1 if pos.y() > rect.center().y() else 0)
+            self.model().move_rows(self.selected_rows(), dst)
+            event.setDropAction(Qt.DropAction.MoveAction)
+            event.accept()
             self.dropped_reordered.emit()
             return
         if event.mimeData().hasText():
@@ -59,7 +402,7 @@ class QueueListWidget(QListWidget):
                 self.dropped_external_urls.emit(urls)
                 event.acceptProposedAction()
                 return
-        super().dropEvent(event)
+        event.ignore()
 
     def dragEnterEvent(self, event):
         if event.mimeData().hasText():
@@ -68,7 +411,9 @@ class QueueListWidget(QListWidget):
             super().dragEnterEvent(event)
 
     def dragMoveEvent(self, event):
-        if event.mimeData().hasText():
+        if event.source() is self:
+            super().dragMoveEvent(event)
+        elif event.mimeData().hasText():
             event.acceptProposedAction()
         else:
             super().dragMoveEvent(event)
@@ -97,6 +442,7 @@ class QueueListWidget(QListWidget):
     def _open_context_menu(self, pos):
         menu = QMenu(self)
         act_preview      = QAction("Pokaż podgląd", self)
+        act_refresh_meta = QAction("Odśwież metadane", self)
         act_edit         = QAction("Edytuj", self)
         act_copy         = QAction("Kopiuj URL", self)
         act_open         = QAction("Otwórz w przeglądarce", self)
@@ -104,21 +450,31 @@ class QueueListWidget(QListWidget):
         act_clear_failed = QAction("Usuń oznaczone jako nieudane", self)
 
         act_preview.triggered.connect(self._action_preview)
+        act_refresh_meta.triggered.connect(self._action_refresh_metadata)
         act_edit.triggered.connect(self._action_edit)
         act_copy.triggered.connect(self._action_copy)
         act_open.triggered.connect(self._action_open)
         act_remove.triggered.connect(self._action_remove)
         act_clear_failed.triggered.connect(self._action_clear_failed)
 
-        if not self.selectedItems():
-            for a in (act_preview, act_edit, act_copy, act_open, act_remove):
+        prio_menu = QMenu("Priorytet", menu)
+        for level, label in PRIORITY_LABELS.items():
+            act = QAction(label, self)
+            act.triggered.connect(lambda _=False, lv=level: self._action_priority(lv))
+            prio_menu.addAction(act)
+
+        if not self.selectionModel().hasSelection():
+            for a in (act_preview, act_refresh_meta, act_edit, act_copy, act_open, act_remove):
                 a.setEnabled(False)
+            prio_menu.setEnabled(False)
 
         menu.addAction(act_preview)
+        menu.addAction(act_refresh_meta)
         menu.addSeparator()
         menu.addAction(act_edit)
         menu.addAction(act_copy)
         menu.addAction(act_open)
+        menu.addMenu(prio_menu)
         menu.addSeparator()
         menu.addAction(act_remove)
         menu.addAction(act_clear_failed)
@@ -132,30 +488,40 @@ class QueueListWidget(QListWidget):
         return self.window()
 
     def _action_preview(self):
-        if not self.selectedItems():
+        if not self.selectionModel().hasSelection():
             return
         owner = self._owner()
         if hasattr(owner, "preview_selected_from_queue"):
             owner.preview_selected_from_queue()
 
+    def _action_refresh_metadata(self):
+        owner = self._owner()
+        if hasattr(owner, "refresh_queue_metadata"):
+            owner.refresh_queue_metadata()
+
     def _action_edit(self):
-        if not self.selectedItems():
+        if not self.selectionModel().hasSelection():
             return
         owner = self._owner()
         if hasattr(owner, "edit_queue_item"):
             owner.edit_queue_item()
 
     def _action_copy(self):
-        items = self.selectedItems()
-        if items:
-            QApplication.clipboard().setText("\n".join(i.text() for i in items))
+        urls = self.selected_urls()
+        if urls:
+            QApplication.clipboard().setText("\n".join(urls))
 
     def _action_open(self):
-        for it in self.selectedItems():
-            webbrowser.open(it.text())
+        for url in self.selected_urls():
+            webbrowser.open(url)
+
+    def _action_priority(self, level: int):
+        owner = self._owner()
+        if hasattr(owner, "set_queue_priority"):
+            owner.set_queue_priority(level)
 
     def _action_remove(self):
-        if not self.selectedItems():
+        if not self.selectionModel().hasSelection():
             return
         owner = self._owner()
         if hasattr(owner, "remove_from_queue"):
@@ -163,46 +529,5 @@ class QueueListWidget(QListWidget):
 
     def _action_clear_failed(self):
         owner = self._owner()
-        to_remove = []
-        for i in range(self.count()):
-            item = self.item(i)
-            if item and item.data(self.ROLE_STATUS) == self.STATUS_FAILED:
-                to_remove.append((i, item.text()))
-        for idx, url in reversed(to_remove):
-            self.takeItem(idx)
-            if hasattr(owner, "download_queue") and url in owner.download_queue:
-                owner.download_queue.remove(url)
-        if hasattr(owner, "failed_queue"):
-            owner.failed_queue = []
-        if hasattr(owner, "save_queue"):
-            owner.save_queue()
-
-    # ------------------------------------------------------------------
-    # Kolorowanie statusu
-    # ------------------------------------------------------------------
-
-    def mark_status(self, item: QListWidgetItem, status: str, is_dark: bool):
-        item.setData(self.ROLE_STATUS, status)
-        if status == self.STATUS_FAILED:
-            if is_dark:
-                item.setBackground(QColor(120, 50, 50))
-                item.setForeground(QColor(255, 200, 200))
-            else:
-                item.setBackground(QColor(255, 200, 200))
-                item.setForeground(QColor(150, 0, 0))
-        elif status == self.STATUS_RETRYING:
-            if is_dark:
-                item.setBackground(QColor(120, 80, 30))
-                item.setForeground(QColor(255, 230, 200))
-            else:
-                item.setBackground(QColor(255, 230, 200))
-                item.setForeground(QColor(120, 60, 0))
-        else:
-            item.setBackground(QColor())
-            item.setForeground(QColor())
-
-    def is_failed_item(self, item: QListWidgetItem) -> bool:
-        return item.data(self.ROLE_STATUS) == self.STATUS_FAILED
-
-    def is_retry_item(self, item: QListWidgetItem) -> bool:
-        return item.data(self.ROLE_STATUS) == self.STATUS_RETRYING
+        if hasattr(owner, "remove_failed_items"):
+            owner.remove_failed_items()
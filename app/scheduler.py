@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+"""
+Logika planowania kolejki pobierania (bez zależności od Qt):
+  - rozpoznawanie hosta URL-a
+  - limity równoległych pobierań na serwis
+  - wybór następnego elementu z przeplataniem hostów
+  - priorytety i polityki kolejności (FIFO, najkrótsze najpierw, po równo między źródłami)
+  - podział globalnego limitu przepustowości między pobierania
+  - harmonogram ponowień z wykładniczym opóźnieniem
+"""
+
+import heapq
+import logging
+import random
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST_KEY = "*"
+
+# Priorytety (tory) elementów kolejki — mniejsza liczba = wcześniej
+PRIORITY_HIGH = 0
+PRIORITY_INTERACTIVE = 1
+PRIORITY_BULK = 2
+PRIORITY_LABELS = {
+    PRIORITY_HIGH: "Pilne",
+    PRIORITY_INTERACTIVE: "Normalne",
+    PRIORITY_BULK: "Masowe",
+}
+
+# Kolejność w obrębie jednego priorytetu
+POLICY_FIFO = "fifo"
+POLICY_SJF = "sjf"
+POLICY_FAIR = "fair"
+QUEUE_POLICIES = (
+    (POLICY_FIFO, "Kolejność dodania"),
+    (POLICY_SJF, "Najmniejsze najpierw"),
+    (POLICY_FAIR, "Po równo między źródłami"),
+)
+
+
+def host_key(url: str) -> str:
+    """Zwraca klucz hosta używany do limitów (cda.pl, youtube.com, lub domena)."""
+    low = (url or "").lower()
+    if "cda.pl" in low:
+        return "cda.pl"
+    if "youtube.com" in low or "youtu.be" in low:
+        return "youtube.com"
+    if "://" not in low:
+        low = "https://" + low
+    netloc = urlparse(low).hostname or ""
+    if netloc.startswith("www."):
+        netloc = netloc[4:]
+    return netloc or "inne"
+
+
+def source_key(url: str) -> str:
+    """Źródło elementu dla polityki "po równo": playlista YouTube (list=) lub host."""
+    parsed = urlparse(url if "://" in (url or "") else "https://" + (url or ""))
+    playlist = parse_qs(parsed.query).get("list")
+    if playlist and playlist[0]:
+        return f"list:{playlist[0]}"
+    return host_key(url)
+
+
+def parse_host_limits(text: str, minimum: int = 1) -> Dict[str, int]:
+    """Parsuje wpis w stylu 'cda.pl=2, youtube.com=4, *=3' do słownika (wartości < minimum pomijane)."""
+    limits: Dict[str, int] = {}
+    for part in (text or "").replace(";", ",").split(","):
+        if "=" not in part:
+            continue
+        host, _, value = part.partition("=")
+        host = host.strip().lower()
+        if host.startswith("www."):
+            host = host[4:]
+        try:
+            n = int(value.strip())
+        except ValueError:
+            logger.warning(f"Niepoprawny limit hosta: {part.strip()!r}")
+            continue
+        if host and n >= minimum:
+            limits[host] = n
+    return limits
+
+
+def host_limit(host: str, limits: Dict[str, int]) -> Optional[int]:
+    """Zwraca limit dla hosta (dopasowanie dokładne lub subdomena), None = bez limitu."""
+    if host in limits:
+        return limits[host]
+    for key, n in limits.items():
+        if key != DEFAULT_HOST_KEY and host.endswith("." + key):
+            return n
+    return limits.get(DEFAULT_HOST_KEY)
+
+
+def pick_next(candidates: Iterable[str], active: Iterable[str],
+              limits: Dict[str, int]) -> Optional[str]:
+    """
+    Wybiera następny URL do pobrania.
+
+    Pomija hosty, które osiągnęły swój limit, a spośród pozostałych wybiera
+    host z najmniejszą liczbą aktywnych pobierań (przy remisie – wcześniejszy
+    w kolejce). Dzięki temu elementy różnych serwisów się przeplatają i limit
+    jednego hosta nie blokuje całej puli.
+    """
+    running = Counter(host_key(u) for u in active)
+    best_url, best_load = None, None
+    seen = set()
+    for url in candidates:
+        host = host_key(url)
+        if host in seen:
+            continue
+        seen.add(host)
+        load = running[host]
+        cap = host_limit(host, limits)
+        if cap is not None and load >= cap:
+            continue
+        if best_load is None or load < best_load:
+            best_url, best_load = url, load
+            if load == 0:
+                break
+    return best_url
+
+
+def effective_priority(priority: int, waited_s: float, aging_s: float) -> int:
+    """Priorytet po uwzględnieniu czasu oczekiwania: co `aging_s` sekund o jeden tor wyżej."""
+    if aging_s > 0 and waited_s > 0:
+        priority -= int(waited_s // aging_s)
+    return max(PRIORITY_HIGH, priority)
+
+
+def order_queue(urls: List[str], policy: str, lanes: Dict[str, int],
+                sizes: Dict[str, int], sources: Dict[str, str],
+                running_sources: Iterable[str]) -> List[str]:
+    """
+    Porządkuje oczekujące elementy: najpierw wg toru (`lanes`, mniejszy = wcześniej),
+    a w obrębie toru wg polityki:
+      - POLICY_FIFO  — kolejność na liście,
+      - POLICY_SJF   — najmniejszy szacowany rozmiar najpierw; elementy bez
+                       szacunku dostają medianę znanych rozmiarów,
+      - POLICY_FAIR  — źródła na zmianę (round-robin), zaczynając od tych,
+                       które mają najmniej aktywnych pobierań.
+    Sortowanie jest stabilne, więc przy remisie decyduje kolejność na liście.
+    """
+    index = {u: i for i, u in enumerate(urls)}
+    if policy == POLICY_SJF:
+        known = sorted(sizes[u] for u in urls if sizes.get(u))
+        fallback = known[len(known) // 2] if known else 0
+        def key(u):
+            return (lanes.get(u, PRIORITY_INTERACTIVE), sizes.get(u) or fallback, index[u])
+    elif policy == POLICY_FAIR:
+        running = Counter(running_sources)
+        rank: Dict[str, int] = {}
+        seen: Counter = Counter()
+        for u in urls:
+            src = sources.get(u) or source_key(u)
+            lane = lanes.get(u, PRIORITY_INTERACTIVE)
+            rank[u] = seen[(lane, src)] + running[src]
+            seen[(lane, src)] += 1
+        def key(u):
+            return (lanes.get(u, PRIORITY_INTERACTIVE), rank[u], index[u])
+    else:
+        def key(u):
+            return (lanes.get(u, PRIORITY_INTERACTIVE), index[u])
+    return sorted(urls, key=key)
+
+
+def pick_next_by_lane(ordered: List[str], lanes: Dict[str, int], active: Iterable[str],
+                      limits: Dict[str, int]) -> Optional[str]:
+    """
+    `pick_next` tor po torze: niższy tor jest brany tylko wtedy, gdy żaden element
+    wyższego nie może wystartować (np. przez limit hosta). Wewnątrz toru zachowane
+    jest przeplatanie hostów z `pick_next`.
+    """
+    active = list(active)
+    for lane in sorted({lanes.get(u, PRIORITY_INTERACTIVE) for u in ordered}):
+        url = pick_next([u for u in ordered if lanes.get(u, PRIORITY_INTERACTIVE) == lane],
+                        active, limits)
+        if url:
+            return url
+    return None
+
+
+class BandwidthAllocator:
+    """
+    Dzieli globalny budżet przepustowości (bajty/s) między aktywne pobierania.
+
+    Proces yt-dlp dostaje swój limit (-r) w chwili uruchomienia i nie da się
+    go później zmienić, dlatego jego udział liczony jest z przewidywanej liczby
+    równoległych pobierań i nigdy nie przekracza niewykorzystanej części
+    budżetu. Pobierania "na żywo" (wbudowany silnik yt_dlp) dzielą resztę
+    budżetu po równo i są przeliczane przy każdym starcie i zakończeniu —
+    suma wszystkich udziałów nigdy nie przekracza budżetu. Nowe pobieranie na
+    żywo czeka (0), gdy jego udział spadłby poniżej MIN_LIVE_SHARE, a budżet
+    zajmują już inne pobierania. Zakończone pobieranie zwalnia swój udział —
+    pojedyncze pobieranie bez kolejki dostaje cały budżet.
+    """
+
+    MIN_LIVE_SHARE = 64 * 1024
+
+    def __init__(self, budget: Optional[int] = None):
+        self.budget = budget
+        self._shares: Dict[str, int] = {}
+        self._live: set = set()
+
+    def set_budget(self, budget: Optional[int]):
+        self.budget = budget if budget and budget > 0 else None
+        self._rebalance()
+
+    def available(self) -> Optional[int]:
+        if self.budget is None:
+            return None
+        return max(0, self.budget - sum(self._shares.values()))
+
+    def acquire(self, key: str, expected_active: int, live: bool = False) -> Optional[int]:
+        """
+        Rezerwuje udział dla `key`. Zwraca limit w bajtach/s, None gdy budżet
+        nie jest ustawiony, lub 0 gdy cały budżet jest zajęty (trzeba poczekać).
+        """
+        self.release(key)
+        if self.budget is None:
+            return None
+        if live:
+            per_live = self._live_remainder() // (len(self._live) + 1)
+            if self._shares and per_live < self.MIN_LIVE_SHARE:
+                return 0
+            self._live.add(key)
+            self._rebalance()
+            return self._shares[key]
+        fair = self.budget // max(1, expected_active)
+        share = min(fair, self.available())
+        if share > 0:
+            self._shares[key] = share
+        return share
+
+    def release(self, key: str):
+        self._shares.pop(key, None)
+        if key in self._live:
+            self._live.discard(key)
+            self._rebalance()
+
+    def clear(self):
+        self._shares.clear()
+        self._live.clear()
+
+    def shares(self) -> Dict[str, int]:
+        return dict(self._shares)
+
+    def live_shares(self) -> Dict[str, int]:
+        return {k: v for k, v in self._shares.items() if k in self._live}
+
+    def _rebalance(self):
+        if not self._live:
+            return
+        if self.budget is None:
+            for k in self._live:
+                self._shares.pop(k, None)
+            return
+        share = self._live_remainder() // len(self._live)
+        for k in self._live:
+            self._shares[k] = share
+
+    def _live_remainder(self) -> int:
+        """Część budżetu, której nie zajmują udziały procesów (ustalone przy starcie)."""
+        fixed = sum(v for k, v in self._shares.items() if k not in self._live)
+        return max(0, self.budget - fixed)
+
+
+def retry_delay(attempt: int, base: float, cap: float, rng: random.Random = random) -> float:
+    """
+    Opóźnienie przed ponowieniem: wykładniczo rosnące (base * 2^(n-1), maks. cap)
+    z losowym rozrzutem ("equal jitter") — połowa stała, połowa losowa, żeby
+    elementy, które padły razem, nie wracały w tej samej sekundzie.
+    """
+    delay = min(cap, base * (2 ** max(0, attempt - 1)))
+    return delay / 2 + rng.uniform(0, delay / 2)
+
+
+class RetrySchedule:
+    """Elementy czekające na ponowienie, uporządkowane wg czasu, od którego wolno je pobrać."""
+
+    def __init__(self):
+        self._due: Dict[str, float] = {}
+        self._heap: List[Tuple[float, str]] = []
+
+    def schedule(self, url: str, due: float):
+        self._due[url] = due
+        heapq.heappush(self._heap, (due, url))
+
+    def cancel(self, url: str):
+        # wpis w kopcu zostaje i jest pomijany przy odczycie
+        self._due.pop(url, None)
+
+    def clear(self):
+        self._due.clear()
+        self._heap.clear()
+
+    def is_waiting(self, url: str, now: float) -> bool:
+        due = self._due.get(url)
+        return due is not None and due > now
+
+    def due_at(self, url: str) -> Optional[float]:
+        return self._due.get(url)
+
+    def waiting(self, now: float) -> List[str]:
+        return [u for u, due in self._due.items() if due > now]
+
+    def pop_due(self, now: float) -> List[str]:
+        """Zdejmuje i zwraca elementy, których czas oczekiwania minął."""
+        ready = []
+        while self._heap and self._heap[0][0] <= now:
+            due, url = heapq.heappop(self._heap)
+            if self._due.get(url) == due:
+                del self._due[url]
+                ready.append(url)
+        return ready
+
+    def next_due(self) -> Optional[float]:
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def to_dict(self) -> Dict[str, float]:
+        return dict(self._due)
+
+    def load(self, data: Dict[str, float], keep: Iterable[str]):
+        self.clear()
+        keep = set(keep)
+        for url, due in (data or {}).items():
+            try:
+                due = float(due)
+            except (TypeError, ValueError):
+                continue
+            if url in keep:
+                self.schedule(url, due)
@@ -2,12 +2,13 @@
 """
 Wątki robocze Qt:
   - YTDLPThread           – uruchamia yt-dlp i parsuje postęp
+  - BatchYTDLPThread      – jedno uruchomienie yt-dlp dla paczki URL-i (--batch-file)
+  - InProcessYTDLPThread  – pobiera przez wbudowany moduł yt_dlp (YoutubeDL)
+  - PooledYTDLPThread     – pobiera w procesie roboczym z puli (worker_pool)
   - UpdateYTDLPThread     – sprawdza / pobiera aktualizację yt-dlp
   - DownloadFFmpegThread  – sprawdza / pobiera FFmpeg
   - CDAStatusCheckThread  – weryfikuje login CDA Premium
-  - PreviewFetchThread    – pobiera metadane jednego URL
-  - BatchPreviewThread    – pobiera metadane wielu URL w tle
-  - TitleFetchThread      – pobiera tytuł jednego URL
+  - fetch_metadata        – metadane URL-a (wywoływane przez MetadataService)
 """
 
 import json
@@ -16,12 +17,26 @@ import os
 import re
 import shutil
 import subprocess
+import tempfile
+import threading
+import time
 from pathlib import Path
 from typing import TYPE_CHECKING, List
 
 import requests
 from PyQt6.QtCore import QThread, pyqtSignal
 
+from . import http_client, worker_pool, ytdlp_engine
+from .pipe_reader import PipeReader
+from .thumb_store import ThumbStore, store_key
+from .thumbnail_cache import encode_thumbnail
+from .progress_protocol import (
+    BATCH_DONE_TEMPLATE,
+    ProgressRecord,
+    batch_done_urls,
+    parse_line,
+    split_lines,
+)
 from .config import (
     DEFAULT_SOCKET_TIMEOUT,
     DETAILED_PROGRESS_REGEX,
@@ -31,7 +46,10 @@ from .config import (
     FFMPEG_PATH_LINUX,
     FFMPEG_PATH_WINDOWS,
     LIBS_DIR,
-    THUMBS_CACHE_DIR,
+    OUTPUT_STALL_WARN_S,
+    THUMB_DOWNLOAD_MAX_BYTES,
+    THUMB_STORE_QUALITY,
+    THUMB_STORE_SIZE,
     TOOLS_DIR,
     YTDLP_PATH_LINUX,
     YTDLP_PATH_WINDOWS,
@@ -43,6 +61,28 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 
 
+# ---------------------------------------------------------------------------
+# Pomocnik – postęp pobierania plików przez http_client
+# ---------------------------------------------------------------------------
+
+def _progress_emitter(thread: QThread, label: str):
+    """Callback postępu dla http_client.download_to -> sygnały procentu i szczegółów wątku."""
+    last = [-1]
+
+    def on_progress(done: int, total: int):
+        if total <= 0:
+            return
+        pct = int(done / total * 100)
+        if pct == last[0]:
+            return
+        last[0] = pct
+        thread.progress_percent_signal.emit(pct)
+        thread.progress_detailed_signal.emit(
+            label, pct, f"{done / 1048576:.1f} MB", f"{total / 1048576:.1f} MB",
+        )
+    return on_progress
+
+
 # ---------------------------------------------------------------------------
 # Pomocnik – uruchamianie podprocesu bez okna konsoli
 # ---------------------------------------------------------------------------
@@ -66,21 +106,54 @@ def _run_cmd(command, timeout: int = 30):
     return process.returncode, stdout + stderr, stdout, stderr
 
 
+def _fetch_json(ytdlp: str, args: list, url: str, timeout: int,
+                engine: str = ytdlp_engine.ENGINE_PROCESS) -> dict:
+    """Zwraca metadane URL-a: przez wbudowany yt_dlp, pulę procesów albo `yt-dlp -s --dump-json`."""
+    if engine == ytdlp_engine.ENGINE_INPROCESS:
+        return ytdlp_engine.extract_info(args, url)
+    if engine == ytdlp_engine.ENGINE_POOL:
+        return worker_pool.shared_pool().extract_info(args, url, timeout=timeout)
+    cmd = [ytdlp, "-s", "--dump-json", *args, url]
+    logger.info(f"[Metadane] cmd: {' '.join(cmd)}")
+    p = subprocess.run(
+        cmd, capture_output=True, text=True, encoding="utf-8",
+        errors="ignore", timeout=timeout, creationflags=_creationflags(),
+    )
+    if p.returncode != 0:
+        raise RuntimeError(p.stderr.strip() or p.stdout.strip() or "Nie udało się pobrać metadanych")
+    lines = [ln for ln in p.stdout.splitlines() if ln.strip().startswith("{")]
+    if not lines:
+        raise RuntimeError("Brak metadanych JSON.")
+    return json.loads(lines[-1])
+
+
 # ===========================================================================
 # YTDLPThread
 # ===========================================================================
 
 class YTDLPThread(QThread):
-    progress_signal         = pyqtSignal(str)
-    finished_signal         = pyqtSignal(bool)
-    progress_percent_signal = pyqtSignal(int)
-    progress_detailed_signal = pyqtSignal(str, int, str, str)
+    """
+    Uruchamia yt-dlp dla jednego elementu kolejki.
+
+    Wyjście nie jest emitowane linia po linii: wątek zbiera linie i ostatni
+    stan postępu w buforze, a wątek GUI odbiera je zbiorczo przez `drain()`
+    kilkanaście razy na sekundę. Dzięki temu gadatliwe wyjście lub wiele
+    równoległych pobierań nie zalewa pętli zdarzeń Qt.
+    """
+    finished_signal = pyqtSignal(bool)
+
+    _TITLE_RE = re.compile(r"\[info\]\s+Title:\s+(.+)")
 
     def __init__(self, command, parent=None):
         super().__init__(parent)
         self.command = command
         self.is_running = True
         self.process = None
+        self.title = None
+        self._buf_lock = threading.Lock()
+        self._pending_lines: List[str] = []
+        self._pending_record = None
+        self._pending_detailed = None
 
     # Wzorzec wykrywający błąd Cloudflare 403 w wyjściu yt-dlp
     _CF_ERROR_RE = re.compile(
@@ -89,11 +162,14 @@ class YTDLPThread(QThread):
         re.IGNORECASE,
     )
 
+    def _executable_missing(self) -> bool:
+        return not Path(self.command[0]).exists() and self.command[0] != "yt-dlp"
+
     def run(self):
         try:
-            if not Path(self.command[0]).exists() and self.command[0] != "yt-dlp":
+            if self._executable_missing():
                 msg = f"Błąd: Nie znaleziono pliku wykonawczego: {self.command[0]}"
-                self.progress_signal.emit(msg)
+                self._emit_line(msg)
                 logger.error(msg)
                 self.finished_signal.emit(False)
                 return
@@ -102,7 +178,7 @@ class YTDLPThread(QThread):
 
             # Fallback: jeśli Cloudflare zablokował, ponawiamy z --extractor-args "generic:impersonate=chrome"
             if not success and cloudflare_hit and self.is_running:
-                self.progress_signal.emit(
+                self._emit_line(
                     "\nUWAGA: Wykryto blokadę Cloudflare (HTTP 403). "
                     "Ponawiam z --extractor-args \"generic:impersonate=chrome\"..."
                 )
@@ -118,11 +194,11 @@ class YTDLPThread(QThread):
         except FileNotFoundError:
             msg = f"Plik wykonawczy nie znaleziono: {self.command[0]}"
             logger.error(msg)
-            self.progress_signal.emit(f"Błąd: {msg}\nUpewnij się, że ścieżka w ustawieniach jest poprawna.")
+            self._emit_line(f"Błąd: {msg}\nUpewnij się, że ścieżka w ustawieniach jest poprawna.")
             self.finished_signal.emit(False)
         except Exception as e:
             logger.error(f"Błąd w wątku pobierania: {e}", exc_info=True)
-            self.progress_signal.emit(f"Błąd: {e}")
+            self._emit_line(f"Błąd: {e}")
             self.finished_signal.emit(False)
 
     def _run_process(self, command: list) -> tuple:
@@ -134,35 +210,84 @@ class YTDLPThread(QThread):
             quoted,
             stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
-            universal_newlines=True,
-            encoding="utf-8",
-            errors="ignore",
             creationflags=_creationflags(),
-            bufsize=1,
+            bufsize=0,
         )
         if not self.process or not self.process.stdout:
             return False, False
 
-        while True:
-            output = self.process.stdout.readline()
-            if output == "" and self.process.poll() is not None:
-                break
-            if output:
-                line = output.strip()
-                self.progress_signal.emit(line)
-                self._parse_progress(line)
-                if self._CF_ERROR_RE.search(line):
-                    cloudflare_hit = True
-            if not self.is_running and self.process.poll() is not None:
-                break
+        # Wątek śpi w selektorze do czasu nowych danych lub zamknięcia potoku
+        # (stop() zabija proces, co kończy strumień). Limit czasu służy tylko
+        # do wykrywania zawieszeń, np. długiego, cichego scalania w ffmpeg.
+        reader = PipeReader(self.process.stdout)
+        last_output = time.monotonic()
+        try:
+            while not reader.eof:
+                chunk = reader.read(OUTPUT_STALL_WARN_S)
+                if chunk is None:
+                    if self.process.poll() is not None:
+                        # Proces skończył, ale potok trzyma otwarty proces potomny
+                        break
+                    silent = int(time.monotonic() - last_output)
+                    logger.warning(f"Brak wyjścia yt-dlp od {silent} s")
+                    self._emit_line(
+                        f"Uwaga: brak wyjścia yt-dlp od {silent} s "
+                        "(proces nadal działa – możliwe scalanie lub zawieszenie połączenia)."
+                    )
+                    continue
+                if chunk:
+                    last_output = time.monotonic()
+                for line in split_lines(chunk):
+                    record = parse_line(line)
+                    if record is not None:
+                        self._emit_record(record)
+                        continue
+                    self._emit_line(line)
+                    self._parse_progress(line)
+                    if self._CF_ERROR_RE.search(line):
+                        cloudflare_hit = True
+        finally:
+            reader.close()
 
         returncode = self.process.wait()
         logger.info(f"Proces zakończony z kodem: {returncode}")
         if returncode == 0:
-            self.progress_detailed_signal.emit("wideo", 100, "Ukończono", "Ukończono")
+            self._emit_detailed("wideo", 100, "Ukończono", "Ukończono")
         return returncode == 0, cloudflare_hit
 
+    # ------------------------------------------------------------------
+    # Bufor wyjścia odbierany przez GUI
+    # ------------------------------------------------------------------
+
+    def _emit_line(self, line: str):
+        m = self._TITLE_RE.search(line)
+        if m:
+            self.title = m.group(1).strip()
+        with self._buf_lock:
+            self._pending_lines.append(line)
+
+    def _emit_record(self, record: ProgressRecord):
+        if record.title:
+            self.title = record.title
+        with self._buf_lock:
+            self._pending_record = record
+            self._pending_detailed = None
+
+    def _emit_detailed(self, name: str, percent: int, downloaded: str, total: str):
+        with self._buf_lock:
+            self._pending_detailed = (name, percent, downloaded, total)
+            self._pending_record = None
+
+    def drain(self) -> tuple:
+        """Zwraca i czyści (linie, ostatni ProgressRecord, ostatni postęp tekstowy)."""
+        with self._buf_lock:
+            lines, self._pending_lines = self._pending_lines, []
+            record, self._pending_record = self._pending_record, None
+            detailed, self._pending_detailed = self._pending_detailed, None
+        return lines, record, detailed
+
     def _parse_progress(self, line: str):
+        """Tryb zgodności: postęp z tekstowego paska yt-dlp (bez --progress-template)."""
         match = DETAILED_PROGRESS_REGEX.search(line)
         if not match:
             return
@@ -182,7 +307,7 @@ class YTDLPThread(QThread):
                 downloaded_mb = (percent / 100.0) * total_mb
                 downloaded_str = f"{downloaded_mb:.1f} MB"
                 total_size_str = f"{total_mb:.1f} MB"
-            self.progress_detailed_signal.emit("wideo", percent, downloaded_str, total_size_str)
+            self._emit_detailed("wideo", percent, downloaded_str, total_size_str)
         except Exception as e:
             logger.debug(f"Parse progress failed: {e}")
 
@@ -211,6 +336,229 @@ class YTDLPThread(QThread):
         # (is_running=False + martwy proces) i sam wyemituje finished_signal.
 
 
+# ===========================================================================
+# BatchYTDLPThread
+# ===========================================================================
+
+class BatchYTDLPThread(YTDLPThread):
+    """
+    Jedno uruchomienie yt-dlp dla kilku zgodnych URL-i (`--batch-file`).
+
+    Start procesu, inicjalizacja ekstraktora i logowanie odbywają się raz na
+    całą paczkę. Po zakończeniu `succeeded` zawiera URL-e, dla których yt-dlp
+    zapisał gotowy plik — pozostałe kolejka traktuje jak nieudane.
+    """
+
+    def __init__(self, command, urls: List[str], parent=None):
+        super().__init__(command, parent)
+        self.urls = list(urls)
+        self.succeeded: set = set()
+        fd, self._batch_path = tempfile.mkstemp(prefix="ytdlp-gui-batch-", suffix=".txt")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write("\n".join(self.urls) + "\n")
+        fd, self._done_path = tempfile.mkstemp(prefix="ytdlp-gui-done-", suffix=".txt")
+        os.close(fd)
+        # command kończy się URL-em z build_command — zastępujemy go plikiem wsadowym
+        self.command = list(command[:-1]) + [
+            "--no-abort-on-error",
+            "--print-to-file", BATCH_DONE_TEMPLATE, self._done_path,
+            "--batch-file", self._batch_path,
+        ]
+
+    def run(self):
+        try:
+            super().run()
+        finally:
+            for p in (self._batch_path, self._done_path):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+
+    def _run_process(self, command: list) -> tuple:
+        try:
+            ok, _ = super()._run_process(command)
+        finally:
+            try:
+                with open(self._done_path, encoding="utf-8", errors="ignore") as f:
+                    self.succeeded = batch_done_urls(f.read(), self.urls)
+            except OSError as e:
+                logger.warning(f"Brak pliku wyników paczki: {e}")
+        logger.info(f"Paczka zakończona: {len(self.succeeded)}/{len(self.urls)} OK")
+        # Bez fallbacku Cloudflare dla całej paczki — nieudane elementy
+        # wracają do kolejki i są ponawiane pojedynczo.
+        return ok, False
+
+
+# ===========================================================================
+# InProcessYTDLPThread
+# ===========================================================================
+
+class InProcessYTDLPThread(YTDLPThread):
+    """
+    Pobieranie przez wbudowany moduł `yt_dlp` zamiast osobnego procesu.
+
+    Komenda z `build_command` jest parsowana tym samym parserem co w yt-dlp CLI,
+    a postęp przychodzi z `progress_hooks` / `postprocessor_hooks` jako
+    `ProgressRecord` — ten sam typ co w protokole JSON procesu yt-dlp.
+    Zatrzymanie działa kooperacyjnie: najbliższy hook lub komunikat loggera
+    przerywa pobieranie wyjątkiem `DownloadCancelled`.
+    """
+
+    def __init__(self, command, parent=None):
+        super().__init__(command, parent)
+        self._ydl = None
+        self._rate_limit = None
+        self._cloudflare_hit = False
+
+    def _executable_missing(self) -> bool:
+        return False
+
+    def set_rate_limit(self, rate: int):
+        """Zmienia limit prędkości w trakcie pobierania (bajty/s)."""
+        self._rate_limit = rate
+        if self._ydl is not None:
+            self._ydl.params["ratelimit"] = rate
+
+    def _check_cancel(self):
+        if not self.is_running:
+            raise ytdlp_engine.load_yt_dlp().utils.DownloadCancelled("Zatrzymano przez użytkownika")
+
+    def _on_log(self, msg: str):
+        for line in msg.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            self._emit_line(line)
+            if self._CF_ERROR_RE.search(line):
+                self._cloudflare_hit = True
+
+    def _run_process(self, command: list) -> tuple:
+        yt_dlp = ytdlp_engine.load_yt_dlp()
+        if yt_dlp is None:
+            self._emit_line("Błąd: moduł yt_dlp nie jest zainstalowany.")
+            return False, False
+        self._cloudflare_hit = False
+        opts, urls = ytdlp_engine.options_from_args(command[1:])
+        opts.update(
+            logger=ytdlp_engine.CallbackLogger(self._on_log, self._check_cancel),
+            noprogress=True,
+            progress_hooks=[self._progress_hook],
+            postprocessor_hooks=[self._postprocessor_hook],
+        )
+        if self._rate_limit:
+            opts["ratelimit"] = self._rate_limit
+        logger.info(f"Uruchamiam (yt_dlp w procesie): {urls}")
+        try:
+            with yt_dlp.YoutubeDL(opts) as ydl:
+                self._ydl = ydl
+                returncode = ydl.download(urls)
+        except yt_dlp.utils.DownloadCancelled:
+            self._emit_line("Pobieranie przerwane.")
+            return False, False
+        except yt_dlp.utils.DownloadError as e:
+            logger.info(f"yt_dlp DownloadError: {e}")
+            return False, self._cloudflare_hit
+        finally:
+            self._ydl = None
+        logger.info(f"yt_dlp zakończył z kodem: {returncode}")
+        if returncode == 0:
+            self._emit_detailed("wideo", 100, "Ukończono", "Ukończono")
+        return returncode == 0, self._cloudflare_hit
+
+    def _progress_hook(self, d: dict):
+        self._check_cancel()
+        self._emit_record(ProgressRecord.from_dict(d))
+
+    def _postprocessor_hook(self, d: dict):
+        self._check_cancel()
+        if d.get("status") == "started":
+            name = d.get("postprocessor") or "postprocessing"
+            self._emit_line(f"[{name}] Przetwarzanie...")
+            self._emit_record(ProgressRecord.from_dict(d))
+
+    def stop(self):
+        self.is_running = False
+        # Wątek sam zakończy pobieranie przy najbliższym hooku i wyemituje finished_signal.
+
+
+# ===========================================================================
+# PooledYTDLPThread
+# ===========================================================================
+
+class PooledYTDLPThread(YTDLPThread):
+    """
+    Pobieranie w procesie roboczym z puli (`worker_pool`).
+
+    Działa jak `InProcessYTDLPThread` (hooki postępu, zmiana limitu w locie),
+    ale yt-dlp pracuje w osobnym, długo żyjącym procesie — awaria nie zabija
+    GUI, a zatrzymanie wysyła do procesu polecenie anulowania zadania.
+    """
+
+    def __init__(self, command, parent=None):
+        super().__init__(command, parent)
+        self._job = None
+        self._rate_limit = None
+
+    def _executable_missing(self) -> bool:
+        return False
+
+    def set_rate_limit(self, rate: int):
+        self._rate_limit = rate
+        job = self._job
+        if job is not None:
+            job.set_rate_limit(rate)
+
+    def _run_process(self, command: list) -> tuple:
+        cloudflare_hit = False
+
+        def on_event(ev: dict):
+            nonlocal cloudflare_hit
+            kind = ev.get("event")
+            if kind == "progress":
+                self._emit_record(ProgressRecord.from_dict(ev.get("data") or {}))
+            elif kind == "postprocess":
+                data = ev.get("data") or {}
+                self._emit_line(f"[{data.get('postprocessor') or 'postprocessing'}] Przetwarzanie...")
+                self._emit_record(ProgressRecord.from_dict(data))
+            elif kind == "log":
+                for line in str(ev.get("msg", "")).splitlines():
+                    line = line.strip()
+                    if not line:
+                        continue
+                    self._emit_line(line)
+                    if self._CF_ERROR_RE.search(line):
+                        cloudflare_hit = True
+
+        job = worker_pool.shared_pool().job("download", command[1:], rate=self._rate_limit)
+        self._job = job
+        if not self.is_running:
+            job.cancel()
+        logger.info(f"Uruchamiam (pula procesów yt-dlp, zadanie {job.id}): {command[-1]}")
+        try:
+            result = job.run(on_event)
+        finally:
+            self._job = None
+        if result.get("cancelled"):
+            self._emit_line("Pobieranie przerwane.")
+            return False, False
+        error = result.get("error")
+        if error and not str(error).startswith("ERROR"):
+            # Błędy yt-dlp ("ERROR: ...") przyszły już przez log
+            self._emit_line(f"Błąd: {error}")
+        ok = bool(result.get("ok"))
+        logger.info(f"Zadanie {job.id} w puli zakończone: ok={ok}")
+        if ok:
+            self._emit_detailed("wideo", 100, "Ukończono", "Ukończono")
+        return ok, cloudflare_hit
+
+    def stop(self):
+        self.is_running = False
+        job = self._job
+        if job is not None:
+            job.cancel()
+
+
 # ===========================================================================
 # UpdateYTDLPThread
 # ===========================================================================
@@ -236,9 +584,7 @@ class UpdateYTDLPThread(QThread):
         try:
             self.progress_signal.emit("Sprawdzam aktualizacje yt-dlp...")
             api_url = "https://api.github.com/repos/yt-dlp/yt-dlp/releases/latest"
-            response = requests.get(api_url, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            data = http_client.get_json(api_url, timeout=10)
             latest_version = data.get("tag_name", "")
             assets = data.get("assets", [])
 
@@ -305,24 +651,9 @@ class UpdateYTDLPThread(QThread):
             return "brak"
 
     def _download_ytdlp(self, url: str, target: Path, version: str):
-        resp = requests.get(url, timeout=60, stream=True)
-        resp.raise_for_status()
         tmp = target.with_suffix(".tmp")
-        total = int(resp.headers.get("content-length", 0))
-        downloaded = 0
-        with open(tmp, "wb") as f:
-            for chunk in resp.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
-                    downloaded += len(chunk)
-                    if total > 0:
-                        pct = int((downloaded / total) * 100)
-                        self.progress_percent_signal.emit(pct)
-                        self.progress_detailed_signal.emit(
-                            "yt-dlp", pct,
-                            f"{downloaded / 1048576:.1f} MB",
-                            f"{total / 1048576:.1f} MB",
-                        )
+        http_client.download_to(url, tmp, timeout=60,
+                                on_progress=_progress_emitter(self, "yt-dlp"))
         if os.name != "nt":
             os.chmod(tmp, 0o755)
         os.replace(tmp, target)
@@ -401,23 +732,8 @@ class DownloadFFmpegThread(QThread):
                         pass
 
     def _stream_download(self, url: str, dest: Path, label: str):
-        resp = requests.get(url, stream=True, timeout=180)
-        resp.raise_for_status()
-        total = int(resp.headers.get("content-length", 0))
-        downloaded = 0
-        with open(dest, "wb") as f:
-            for chunk in resp.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
-                    downloaded += len(chunk)
-                    if total > 0:
-                        pct = int((downloaded / total) * 100)
-                        self.progress_percent_signal.emit(pct)
-                        self.progress_detailed_signal.emit(
-                            label, pct,
-                            f"{downloaded / 1048576:.1f} MB",
-                            f"{total / 1048576:.1f} MB",
-                        )
+        http_client.download_to(url, dest, timeout=180,
+                                on_progress=_progress_emitter(self, label))
 
     def _download_windows(self, target: Path):
         import zipfile
@@ -576,177 +892,44 @@ class CDAStatusCheckThread(QThread):
 
 
 # ===========================================================================
-# PreviewFetchThread
-# ===========================================================================
-
-class PreviewFetchThread(QThread):
-    result_signal = pyqtSignal(dict)
-    error_signal  = pyqtSignal(str)
-
-    def __init__(self, main_window: "YTDLPGUI", url: str, parent=None):
-        super().__init__(parent)
-        self.mw = main_window
-        self.url = url
-
-    def run(self):
-        try:
-            ytdlp = self.mw.get_ytdlp_path()
-            fmt, mode = self.mw._build_format_string_for_preview()
-            cmd = [ytdlp, "-s", "--dump-json", "--socket-timeout", str(DEFAULT_SOCKET_TIMEOUT)]
-            if fmt:
-                cmd += ["-f", fmt]
-            cmd += self._auth_args()
-            cmd.append(self.url)
-
-            logger.info(f"[Preview] cmd: {' '.join(cmd)}")
-            p = subprocess.run(
-                cmd, capture_output=True, text=True, encoding="utf-8",
-                errors="ignore", timeout=30, creationflags=_creationflags(),
-            )
-            if p.returncode != 0:
-                raise RuntimeError(p.stderr.strip() or p.stdout.strip() or "Nie udało się pobrać metadanych")
-
-            lines = [ln for ln in p.stdout.splitlines() if ln.strip().startswith("{")]
-            if not lines:
-                raise RuntimeError("Brak metadanych JSON.")
-            data = json.loads(lines[-1])
-            result = self._extract_info(data)
-            self.result_signal.emit(result)
-        except Exception as e:
-            self.error_signal.emit(str(e))
-
-    def _auth_args(self) -> list:
-        args = []
-        cda_email = self.mw.cda_email.text().strip()
-        cda_pass  = self.mw.cda_password.text()
-        username  = self.mw.username.text().strip()
-        password  = self.mw.password.text()
-        if self.url and "cda.pl" in self.url:
-            args += ["--no-check-certificate"]
-            if "/vfilm" in self.url and cda_email and cda_pass:
-                # Tylko premium (/vfilm) wymaga credentials.
-                # Zwykłe filmy CDA działają anonimowo; podanie credentials powoduje HTTP 403.
-                args += ["--username", cda_email, "--password", cda_pass]
-        else:
-            if cda_email and cda_pass:
-                args += ["--username", cda_email, "--password", cda_pass]
-            elif username and password:
-                args += ["--username", username, "--password", password]
-        return args
-
-    def _extract_info(self, data: dict) -> dict:
-        thumb_url = None
-        if isinstance(data.get("thumbnails"), list) and data["thumbnails"]:
-            thumb_url = data["thumbnails"][-1].get("url")
-        if not thumb_url:
-            thumb_url = data.get("thumbnail")
-
-        est_bytes = _estimate_bytes(data)
-        thumb_path = _download_thumbnail(data.get("id"), thumb_url)
-
-        return {
-            "title": data.get("title") or "Unknown",
-            "uploader": data.get("uploader") or data.get("channel") or "",
-            "duration": int(data.get("duration") or 0),
-            "estimated_bytes": int(est_bytes) if est_bytes else None,
-            "thumb_path": str(thumb_path) if thumb_path else "",
-            "mode": "",
-            "webpage_url": data.get("webpage_url") or self.url,
-        }
-
-
-# ===========================================================================
-# BatchPreviewThread
+# Metadane (wykonywane przez MetadataService poza wątkiem GUI)
 # ===========================================================================
 
-class BatchPreviewThread(QThread):
-    progress_signal   = pyqtSignal(str)
-    item_result_signal = pyqtSignal(str, dict)   # url, info
-    finished_signal   = pyqtSignal(int, int)     # updated, total
-
-    def __init__(self, main_window: "YTDLPGUI", urls: List[str], parent=None):
-        super().__init__(parent)
-        self.mw = main_window
-        self.urls = urls
+def fetch_metadata(ytdlp: str, args: list, url: str, engine: str, store: ThumbStore,
+                   timeout: int = 30) -> dict:
+    """Metadane URL-a do podglądu i kolejki (tytuł, kanał, czas, szacowany rozmiar, miniatura)."""
+    data = _fetch_json(ytdlp, args, url, timeout, engine)
+    thumb_url = None
+    if isinstance(data.get("thumbnails"), list) and data["thumbnails"]:
+        thumb_url = data["thumbnails"][-1].get("url")
+    if not thumb_url:
+        thumb_url = data.get("thumbnail")
 
-    def run(self):
-        updated = 0
-        for u in self.urls:
-            try:
-                ytdlp = self.mw.get_ytdlp_path()
-                fmt, _ = self.mw._build_format_string_for_preview()
-                cmd = [ytdlp, "-s", "--dump-json", "--socket-timeout", str(DEFAULT_SOCKET_TIMEOUT)]
-                if fmt:
-                    cmd += ["-f", fmt]
-                if "cda.pl" in u:
-                    cmd += ["--no-check-certificate"]
-                    if "/vfilm" in u:
-                        cda_email = self.mw.cda_email.text().strip()
-                        cda_pass  = self.mw.cda_password.text()
-                        if cda_email and cda_pass:
-                            cmd += ["--username", cda_email, "--password", cda_pass]
-                cmd.append(u)
-                p = subprocess.run(
-                    cmd, capture_output=True, text=True, encoding="utf-8",
-                    errors="ignore", timeout=25, creationflags=_creationflags(),
-                )
-                if p.returncode != 0:
-                    continue
-                lines = [ln for ln in p.stdout.splitlines() if ln.strip().startswith("{")]
-                if not lines:
-                    continue
-                data = json.loads(lines[-1])
-                est_bytes = _estimate_bytes(data)
-                thumb_url = data.get("thumbnail")
-                if not thumb_url and isinstance(data.get("thumbnails"), list) and data["thumbnails"]:
-                    thumb_url = data["thumbnails"][-1].get("url")
-                thumb_path = _download_thumbnail(data.get("id"), thumb_url)
-                info = {
-                    "title": data.get("title") or "",
-                    "estimated_bytes": int(est_bytes) if est_bytes else None,
-                    "thumb_path": str(thumb_path) if thumb_path else "",
-                }
-                self.item_result_signal.emit(u, info)
-                updated += 1
-            except Exception as e:
-                logger.debug(f"Batch preview failed for {u}: {e}")
-        self.finished_signal.emit(updated, len(self.urls))
+    est_bytes = _estimate_bytes(data)
+    thumb_key = _download_thumbnail(store, data, thumb_url)
 
+    return {
+        "title": data.get("title") or "Unknown",
+        "uploader": data.get("uploader") or data.get("channel") or "",
+        "duration": int(data.get("duration") or 0),
+        "estimated_bytes": int(est_bytes) if est_bytes else None,
+        "thumb_key": thumb_key or "",
+        "webpage_url": data.get("webpage_url") or url,
+        "formats": _format_summary(data),
+    }
 
-# ===========================================================================
-# TitleFetchThread
-# ===========================================================================
 
-class TitleFetchThread(QThread):
-    title_signal = pyqtSignal(str, str)   # url, title
-    error_signal = pyqtSignal(str, str)   # url, error
+_FORMAT_FIELDS = ("format_id", "ext", "height", "fps", "vcodec", "acodec", "tbr", "filesize", "filesize_approx")
 
-    def __init__(self, ytdlp_path: str, url: str, parent=None):
-        super().__init__(parent)
-        self.ytdlp_path = ytdlp_path
-        self.url = url
 
-    def run(self):
-        try:
-            cmd = [
-                self.ytdlp_path, "--get-title", "--simulate",
-                "--socket-timeout", str(DEFAULT_SOCKET_TIMEOUT),
-            ]
-            if "cda.pl" in self.url:
-                cmd += ["--no-check-certificate"]
-            cmd.append(self.url)
-            r = subprocess.run(
-                cmd, capture_output=True, text=True, encoding="utf-8",
-                errors="ignore", timeout=20, creationflags=_creationflags(),
-            )
-            if r.returncode == 0 and r.stdout.strip():
-                self.title_signal.emit(self.url, r.stdout.strip())
-            else:
-                self.error_signal.emit(self.url, "Brak tytułu")
-        except subprocess.TimeoutExpired:
-            self.error_signal.emit(self.url, "Timeout")
-        except Exception as e:
-            self.error_signal.emit(self.url, str(e))
+def _format_summary(data: dict) -> list:
+    """Lista formatów w skrócie (bez storyboardów) — do zapisu w pamięci metadanych."""
+    out = []
+    for f in data.get("formats") or []:
+        if not isinstance(f, dict) or (f.get("vcodec") == "none" and f.get("acodec") == "none"):
+            continue
+        out.append({k: f[k] for k in _FORMAT_FIELDS if f.get(k) is not None})
+    return out
 
 
 # ===========================================================================
@@ -804,18 +987,19 @@ def _estimate_bytes(data: dict):
     return None
 
 
-def _download_thumbnail(video_id: str, thumb_url: str):
-    if not thumb_url:
+def _download_thumbnail(store: ThumbStore, data: dict, thumb_url: str):
+    """Pobiera miniaturę do magazynu (przekodowaną do małego rozmiaru); zwraca jej klucz."""
+    key = store_key(data.get("extractor_key") or data.get("extractor"), data.get("id"))
+    if not thumb_url or not key:
         return None
     try:
-        safe = re.sub(r"[^a-zA-Z0-9_.-]", "_", video_id or "thumb") + ".jpg"
-        path = THUMBS_CACHE_DIR / safe
-        if not path.exists():
-            r = requests.get(thumb_url, timeout=15)
-            r.raise_for_status()
-            with open(path, "wb") as f:
-                f.write(r.content)
-        return path
+        if not store.has(key):
+            raw = http_client.get_bytes(thumb_url, timeout=15, max_bytes=THUMB_DOWNLOAD_MAX_BYTES)
+            encoded = encode_thumbnail(raw, THUMB_STORE_SIZE, THUMB_STORE_QUALITY)
+            if not encoded:
+                return None
+            store.put(key, encoded)
+        return key
     except Exception as e:
         logger.debug(f"Nie udało się pobrać miniatury: {e}")
         return None
@@ -833,9 +1017,7 @@ class CheckAppUpdateThread(QThread):
     def run(self):
         try:
             api_url = "https://api.github.com/repos/PaffcioStudio/YTDLP-GUI/releases/latest"
-            response = requests.get(api_url, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            data = http_client.get_json(api_url, timeout=10)
             tag = (data.get("tag_name") or "").strip().lstrip("v")
             url = data.get("html_url") or "https://github.com/PaffcioStudio/YTDLP-GUI/releases"
             if not tag:
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Magazyn miniatur w jednym pliku SQLite (bez zależności od Qt).
+
+Miniatury są kluczowane "ekstraktor:id" (ten sam id na dwóch serwisach to dwa
+różne wpisy) i trzymane jako małe, przekodowane JPEG/WebP w kolumnie BLOB,
+zamiast dziesiątek tysięcy plików w katalogu. Łączny rozmiar jest
+ograniczony: po przekroczeniu limitu usuwane są wpisy najdawniej używane
+(czas ostatniego dostępu aktualizowany najwyżej raz na ACCESS_RESOLUTION_S,
+żeby odczyty nie zamieniały się w ciągłe zapisy).
+
+Z magazynu korzystają wątki podglądu i wątek dekodujący miniatury, więc
+połączenie jest współdzielone i chronione blokadą.
+"""
+
+import logging
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+ACCESS_RESOLUTION_S = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS thumbs (
+    key       TEXT PRIMARY KEY,
+    data      BLOB NOT NULL,
+    size      INTEGER NOT NULL,
+    accessed  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_thumbs_accessed ON thumbs(accessed);
+"""
+
+
+def store_key(extractor: Optional[str], video_id: Optional[str]) -> Optional[str]:
+    """Klucz miniatury: "ekstraktor:id" (małe litery w nazwie ekstraktora)."""
+    if not video_id:
+        return None
+    ns = re.sub(r"[^a-z0-9_]", "", (extractor or "generic").lower()) or "generic"
+    return f"{ns}:{video_id}"
+
+
+class ThumbStore:
+    def __init__(self, path: Path, max_bytes: int):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self.conn.commit()
+        self._total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM thumbs").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            try:
+                self.conn.close()
+            except sqlite3.Error:
+                pass
+
+    def set_max_bytes(self, max_bytes: int):
+        """Zmienia limit; po zmniejszeniu od razu usuwa nadmiar."""
+        with self._lock:
+            self.max_bytes = max_bytes
+            if self._total > self.max_bytes:
+                self._evict()
+                self.conn.commit()
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total
+
+    def has(self, key: str) -> bool:
+        with self._lock:
+            return self.conn.execute("SELECT 1 FROM thumbs WHERE key = ?", (key,)).fetchone() is not None
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute("SELECT data, accessed FROM thumbs WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > ACCESS_RESOLUTION_S:
+                self.conn.execute("UPDATE thumbs SET accessed = ? WHERE key = ?", (now, key))
+                self.conn.commit()
+            return bytes(row[0])
+
+    def put(self, key: str, data: bytes):
+        with self._lock:
+            old = self.conn.execute("SELECT size FROM thumbs WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO thumbs (key, data, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, sqlite3.Binary(data), len(data), time.time()),
+            )
+            self._total += len(data) - (old[0] if old else 0)
+            if self._total > self.max_bytes:
+                self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        """Usuwa najdawniej używane wpisy do 90% limitu (zapas, żeby nie czyścić przy każdym zapisie)."""
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        for key, size in self.conn.execute("SELECT key, size FROM thumbs ORDER BY accessed").fetchall():
+            if self._total <= target:
+                break
+            self.conn.execute("DELETE FROM thumbs WHERE key = ?", (key,))
+            self._total -= size
+            removed += 1
+        logger.debug(f"Usunięto {removed} miniatur z magazynu (limit {self.max_bytes} B).")
+
+    @staticmethod
+    def remove_legacy_dir(directory: Path):
+        """Usuwa stary katalog z plikiem .jpg na każdą miniaturę (klucze bez serwisu — nie do przeniesienia)."""
+        if directory.is_dir():
+            shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+Miniatury: przekodowanie do magazynu, dekodowanie w tle i pamięć podręczna
+przeskalowanych obrazów.
+
+`encode_thumbnail` zmniejsza pobraną miniaturę (często 1280×720 i więcej) do
+rozmiaru magazynu i zapisuje ją jako WebP (gdy Qt ma wtyczkę) albo JPEG.
+Wyświetlamy ją jako ikonę kolejki (64×36) albo podgląd (200×112): wątek
+dekodujący czyta obraz z `ThumbStore` od razu w docelowym rozmiarze
+(QImageReader.setScaledSize — dla JPEG skalowanie już przy dekodowaniu)
+i oddaje QImage; w wątku GUI trafia on do LRU ograniczonego liczbą bajtów,
+kluczowanego (klucz miniatury, rozmiar). QPixmap powstaje dopiero przy
+rysowaniu, w wątku GUI.
+
+Żądania obsługiwane są od najnowszego (przy przewijaniu najpierw dekodują się
+widoczne wiersze), a najstarsze ponad limit są porzucane.
+"""
+
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Optional, Tuple
+
+from PyQt6.QtCore import QBuffer, QByteArray, QIODevice, QObject, QSize, Qt, QThread, pyqtSignal
+from PyQt6.QtGui import QImage, QImageReader, QImageWriter, QPixmap
+
+from .thumb_store import ThumbStore
+
+logger = logging.getLogger(__name__)
+
+MAX_PENDING = 256
+
+Key = Tuple[str, int, int]   # (klucz miniatury w ThumbStore, szerokość, wysokość)
+
+
+def _read_image(data: bytes, size: QSize) -> Tuple[QImage, str]:
+    """Dekoduje obraz z bajtów, od razu zmniejszony do `size` (z zachowaniem proporcji)."""
+    buf = QBuffer()
+    buf.setData(QByteArray(data))
+    buf.open(QIODevice.OpenModeFlag.ReadOnly)
+    reader = QImageReader(buf)
+    reader.setAutoTransform(True)
+    src = reader.size()
+    if src.isValid() and (src.width() > size.width() or src.height() > size.height()):
+        reader.setScaledSize(src.scaled(size, Qt.AspectRatioMode.KeepAspectRatio))
+    img = reader.read()
+    if not img.isNull() and (img.width() > size.width() or img.height() > size.height()):
+        # format bez skalowania przy odczycie
+        img = img.scaled(size, Qt.AspectRatioMode.KeepAspectRatio,
+                         Qt.TransformationMode.SmoothTransformation)
+    return img, reader.errorString()
+
+
+def encode_thumbnail(data: bytes, max_size: Tuple[int, int], quality: int) -> Optional[bytes]:
+    """Przekodowuje pobraną miniaturę do małego WebP/JPEG (bezpieczne poza wątkiem GUI)."""
+    img, err = _read_image(data, QSize(*max_size))
+    if img.isNull():
+        logger.debug(f"Nieczytelna miniatura: {err}")
+        return None
+    fmt = "WEBP" if b"webp" in [bytes(f) for f in QImageWriter.supportedImageFormats()] else "JPEG"
+    out = QBuffer()
+    out.open(QIODevice.OpenModeFlag.WriteOnly)
+    if not img.save(out, fmt, quality):
+        return None
+    return bytes(out.data())
+
+
+class _DecodeThread(QThread):
+    decoded = pyqtSignal(object, QImage)   # klucz, obraz (pusty przy błędzie)
+
+    def __init__(self, store: ThumbStore, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self._jobs: deque = deque()
+        self._cond = threading.Condition()
+        self._stopping = False
+
+    def submit(self, key: Key) -> Optional[Key]:
+        """Dodaje zadanie; zwraca klucz porzuconego najstarszego zadania (ponad limit)."""
+        dropped = None
+        with self._cond:
+            self._jobs.append(key)
+            if len(self._jobs) > MAX_PENDING:
+                dropped = self._jobs.popleft()
+            self._cond.notify()
+        return dropped
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._jobs.clear()
+            self._cond.notify()
+
+    def run(self):
+        while True:
+            with self._cond:
+                while not self._jobs and not self._stopping:
+                    self._cond.wait()
+                if self._stopping:
+                    return
+                key = self._jobs.pop()
+            self.decoded.emit(key, self._decode(key))
+
+    def _decode(self, key: Key) -> QImage:
+        try:
+            data = self.store.get(key[0])
+        except Exception as e:
+            logger.debug(f"Błąd odczytu miniatury {key[0]}: {e}")
+            data = None
+        if not data:
+            return QImage()
+        img, err = _read_image(data, QSize(key[1], key[2]))
+        if img.isNull():
+            logger.debug(f"Nie udało się zdekodować miniatury {key[0]}: {err}")
+        return img
+
+
+class ThumbnailCache(QObject):
+    """LRU zdekodowanych miniatur (wątek GUI) + wątek dekodujący."""
+
+    ready = pyqtSignal(str)   # klucz miniatury, która jest już w pamięci
+
+    def __init__(self, store: ThumbStore, max_bytes: int, parent=None):
+        super().__init__(parent)
+        self.max_bytes = max_bytes
+        self._images: "OrderedDict[Key, QImage]" = OrderedDict()
+        self._bytes = 0
+        self._pending = set()
+        self._failed = set()
+        self._thread = _DecodeThread(store, self)
+        self._thread.decoded.connect(self._on_decoded)
+        self._thread.start(QThread.Priority.LowPriority)
+
+    def pixmap(self, thumb: str, size: QSize) -> Optional[QPixmap]:
+        """Miniatura w rozmiarze `size`, jeśli jest w pamięci; inaczej zleca dekodowanie i zwraca None."""
+        key = (thumb, size.width(), size.height())
+        img = self._images.get(key)
+        if img is not None:
+            self._images.move_to_end(key)
+            return QPixmap.fromImage(img)
+        self.request(thumb, size)
+        return None
+
+    def request(self, thumb: str, size: QSize):
+        key = (thumb, size.width(), size.height())
+        if key in self._images or key in self._pending or key in self._failed:
+            return
+        self._pending.add(key)
+        dropped = self._thread.submit(key)
+        if dropped is not None:
+            self._pending.discard(dropped)
+
+    def close(self):
+        self._thread.stop()
+        self._thread.wait(2000)
+
+    def _on_decoded(self, key: Key, img: QImage):
+        self._pending.discard(key)
+        if img.isNull():
+            self._failed.add(key)
+            return
+        old = self._images.pop(key, None)
+        if old is not None:
+            self._bytes -= old.sizeInBytes()
+        self._images[key] = img
+        self._bytes += img.sizeInBytes()
+        while self._bytes > self.max_bytes and len(self._images) > 1:
+            _, evicted = self._images.popitem(last=False)
+            self._bytes -= evicted.sizeInBytes()
+        self.ready.emit(key[0])
@@ -15,8 +15,22 @@ from PyQt6.QtWidgets import (
     QVBoxLayout, QWidget,
 )
 
-from ..config import FFMPEG_PATH_WINDOWS, LIBS_DIR, YTDLP_PATH_WINDOWS, get_icon_path
-from ..queue_widget import QueueListWidget
+from .. import ytdlp_engine
+from ..config import (
+    ARIA2C_PATH_WINDOWS,
+    EXTERNAL_DOWNLOADER_ARIA2C,
+    EXTERNAL_DOWNLOADER_FFMPEG,
+    EXTERNAL_DOWNLOADER_NONE,
+    EXTERNAL_DOWNLOADER_PROTOCOLS,
+    FFMPEG_PATH_WINDOWS,
+    LIBS_DIR,
+    METADATA_CACHE_TTL_H,
+    THUMB_STORE_MAX_MB,
+    YTDLP_PATH_WINDOWS,
+    get_icon_path,
+)
+from ..queue_widget import QueueListModel, QueueListView
+from ..scheduler import QUEUE_POLICIES
 
 def _read_version() -> str:
     import pathlib, sys, os
@@ -61,10 +75,14 @@ def init_queue_panel(win, parent: QWidget):
     q_group = QGroupBox("Kolejka pobierania")
     q_lay = QVBoxLayout()
 
-    win.queue_list = QueueListWidget(win)
+    win.queue_model = QueueListModel(win.queue_store, win)
+    win.queue_model.tooltip_provider = win._item_tooltip
+    win.queue_model.retry_provider = win._is_waiting_for_retry
+    win.queue_model.progress_provider = win._item_percent
+    win.queue_list = QueueListView(win.queue_model, win.thumbnails, win)
     win.queue_list.setToolTip("Lista URL-i w kolejce. Obsługuje drag&drop i menu kontekstowe.")
-    win.queue_list.itemSelectionChanged.connect(win.update_remove_btn_state)
-    win.queue_list.dropped_reordered.connect(win._sync_download_queue_from_widget)
+    win.queue_list.selectionModel().selectionChanged.connect(lambda *_: win.update_remove_btn_state())
+    win.queue_list.dropped_reordered.connect(win._sync_queue_order_from_widget)
     win.queue_list.dropped_external_urls.connect(win._add_urls_list)
     q_lay.addWidget(win.queue_list)
 
@@ -107,6 +125,10 @@ def init_queue_panel(win, parent: QWidget):
     btns.addWidget(clear_q_btn)
 
     q_lay.addLayout(btns)
+
+    win.disk_usage_label = QLabel("")
+    win.disk_usage_label.setWordWrap(True)
+    q_lay.addWidget(win.disk_usage_label)
     q_group.setLayout(q_lay)
     layout.addWidget(q_group)
 
@@ -317,6 +339,14 @@ def _init_format_tab(win, tab_widget: QWidget):
     win.limit_rate.setPlaceholderText("np. 50K lub 4.2M  (puste = bez limitu)")
     file_lay.addRow("Limit predkosci:", win.limit_rate)
 
+    win.global_rate_limit = QLineEdit()
+    win.global_rate_limit.setPlaceholderText("np. 80M  (wspolny dla wszystkich pobieran, puste = bez limitu)")
+    win.global_rate_limit.setToolTip(
+        "Laczny limit predkosci dzielony miedzy rownolegle pobierania.\n"
+        "Pojedyncze pobieranie dostaje caly budzet, przy kilku - rowny podzial."
+    )
+    file_lay.addRow("Globalny limit:", win.global_rate_limit)
+
     file_group.setLayout(file_lay)
     cl.addWidget(file_group)
 
@@ -485,9 +515,83 @@ def _init_advanced_tab(win, tab_widget: QWidget):
     win.no_color      = QCheckBox("Wyłącz kolory w wyjściu");         other_lay.addRow(win.no_color)
     win.simulate      = QCheckBox("Symuluj (nie pobieraj plików)");   other_lay.addRow(win.simulate)
     win.skip_download = QCheckBox("Pomiń pobieranie (tylko info)");   other_lay.addRow(win.skip_download)
+    win.structured_progress = QCheckBox("Strukturalny postęp (JSON zamiast parsowania tekstu)")
+    win.structured_progress.setChecked(True)
+    win.structured_progress.setToolTip(
+        "yt-dlp wypisuje postęp jako JSON (--newline --progress-template):\n"
+        "dokładne bajty, prędkość, ETA i numer fragmentu."
+    )
+    other_lay.addRow(win.structured_progress)
     win.max_retry_per_item = QSpinBox(); win.max_retry_per_item.setRange(0, 10)
     win.max_retry_per_item.setValue(win.settings.value("max_retry_per_item", 2, type=int))
     other_lay.addRow("Maks. ponowień na URL:", win.max_retry_per_item)
+    win.max_parallel_downloads = QSpinBox(); win.max_parallel_downloads.setRange(1, 16)
+    win.max_parallel_downloads.setValue(win.settings.value("max_parallel_downloads", 3, type=int))
+    win.max_parallel_downloads.setToolTip("Ile elementów kolejki pobierać jednocześnie.")
+    other_lay.addRow("Równoległe pobierania:", win.max_parallel_downloads)
+    win.host_concurrency_limits = QLineEdit()
+    win.host_concurrency_limits.setPlaceholderText("np. cda.pl=2, youtube.com=4, *=3")
+    win.host_concurrency_limits.setToolTip(
+        "Maksymalna liczba jednoczesnych pobierań z danego serwisu.\n"
+        "'*' oznacza wszystkie pozostałe serwisy; brak wpisu = bez limitu."
+    )
+    other_lay.addRow("Limity na serwis:", win.host_concurrency_limits)
+    win.batch_size = QSpinBox(); win.batch_size.setRange(1, 100)
+    win.batch_size.setValue(1)
+    win.batch_size.setToolTip(
+        "Ile krótkich elementów z tego samego serwisu pobierać jednym uruchomieniem\n"
+        "yt-dlp (--batch-file). 1 = każdy URL osobno. Działa z zewnętrznym plikiem\n"
+        "yt-dlp i bez archiwum pobranych; ponowienia zawsze idą pojedynczo."
+    )
+    other_lay.addRow("URL-i na uruchomienie:", win.batch_size)
+    win.queue_policy = QComboBox()
+    for key, label in QUEUE_POLICIES:
+        win.queue_policy.addItem(label, key)
+    win.queue_policy.setToolTip(
+        "Kolejnosc pobierania w obrebie jednego priorytetu (Pilne > Normalne > Masowe).\n"
+        "Najmniejsze najpierw: wg szacowanego rozmiaru z podgladu/skanu.\n"
+        "Po rowno miedzy zrodlami: playlisty / listy URL-i / serwisy na zmiane.\n"
+        "Priorytet ustawisz w menu kontekstowym kolejki; wiele URL-i dodanych naraz\n"
+        "trafia do 'Masowe'. Element czekajacy dluzej niz 2 h awansuje o jeden priorytet."
+    )
+    other_lay.addRow("Kolejnosc kolejki:", win.queue_policy)
+    win.disk_space_check = QCheckBox("Wstrzymuj elementy, ktore nie zmieszcza sie na dysku")
+    win.disk_space_check.setChecked(True)
+    win.disk_space_check.setToolTip(
+        "Przed startem porownuje szacowany rozmiar (z podgladu / skanu kolejki)\n"
+        "z wolnym miejscem w katalogu wyjsciowym, z zapasem 512 MB.\n"
+        "Elementy bez szacunku nie sa wstrzymywane."
+    )
+    other_lay.addRow(win.disk_space_check)
+    win.metadata_cache_ttl = QSpinBox(); win.metadata_cache_ttl.setRange(0, 24 * 365)
+    win.metadata_cache_ttl.setSuffix(" h")
+    win.metadata_cache_ttl.setSpecialValueText("wyłączona")
+    win.metadata_cache_ttl.setValue(METADATA_CACHE_TTL_H)
+    win.metadata_cache_ttl.setToolTip(
+        "Jak długo pamiętać pobrane metadane (tytuł, rozmiar, miniatura, formaty)\n"
+        "dla danego URL-a i wybranego formatu. Podgląd, skan kolejki i start programu\n"
+        "korzystają z nich bez ponownego uruchamiania yt-dlp. 0 = zawsze pobieraj.\n"
+        "Pojedyncze elementy odświeżysz w menu kontekstowym kolejki."
+    )
+    clear_meta_btn = QPushButton("Wyczyść")
+    clear_meta_btn.setToolTip("Usuwa wszystkie zapisane metadane.")
+    clear_meta_btn.clicked.connect(win.clear_metadata_cache)
+    meta_row = QHBoxLayout()
+    meta_row.addWidget(win.metadata_cache_ttl)
+    meta_row.addWidget(clear_meta_btn)
+    meta_row.addStretch()
+    other_lay.addRow("Pamięć metadanych:", meta_row)
+    win.thumb_store_max = QSpinBox(); win.thumb_store_max.setRange(8, 4096)
+    win.thumb_store_max.setSingleStep(16)
+    win.thumb_store_max.setSuffix(" MB")
+    win.thumb_store_max.setValue(THUMB_STORE_MAX_MB)
+    win.thumb_store_max.setKeyboardTracking(False)
+    win.thumb_store_max.setToolTip(
+        "Maksymalny rozmiar magazynu miniatur na dysku (thumbs.sqlite3).\n"
+        "Po przekroczeniu usuwane są najdawniej oglądane miniatury."
+    )
+    win.thumb_store_max.valueChanged.connect(win._apply_thumb_store_limit)
+    other_lay.addRow("Magazyn miniatur:", win.thumb_store_max)
     win.enable_clipboard_monitor = QCheckBox("Monitoruj schowek i auto-dodawaj URL")
     other_lay.addRow(win.enable_clipboard_monitor)
     other_group.setLayout(other_lay)
@@ -571,6 +675,17 @@ def _init_settings_tab(win, tab_widget: QWidget):
     win.advanced_mode.toggled.connect(lambda checked: _apply_advanced_mode(win, checked))
     win.advanced_mode.toggled.connect(lambda checked: win._adv_mode_btn.setChecked(checked))
     ui_lay.addRow(win.advanced_mode)
+
+    win.console_max_lines = QSpinBox()
+    win.console_max_lines.setRange(500, 200000)
+    win.console_max_lines.setSingleStep(1000)
+    win.console_max_lines.setValue(5000)
+    win.console_max_lines.setToolTip(
+        "Ile ostatnich linii trzymac w konsoli. Pelna historia sesji\n"
+        "jest zapisywana w pliku console-*.log w katalogu logow."
+    )
+    win.console_max_lines.valueChanged.connect(lambda n: win.output_text.set_max_lines(n))
+    ui_lay.addRow("Maks. linii konsoli:", win.console_max_lines)
     ui_group.setLayout(ui_lay)
     gl.addWidget(ui_group)
     gl.addStretch()
@@ -605,6 +720,19 @@ def _init_settings_tab(win, tab_widget: QWidget):
     ffmpeg_row.addWidget(win.ffmpeg_path); ffmpeg_row.addWidget(browse_ffmpeg)
     ytdlp_lay.addRow("Sciezka do FFmpeg:", ffmpeg_row)
 
+    win.ytdlp_engine = QComboBox()
+    win.ytdlp_engine.addItem("Zewnetrzny plik yt-dlp", ytdlp_engine.ENGINE_PROCESS)
+    win.ytdlp_engine.addItem("Wbudowany modul yt_dlp (szybszy start)", ytdlp_engine.ENGINE_INPROCESS)
+    win.ytdlp_engine.addItem("Pula procesow yt_dlp (szybki start, izolacja)", ytdlp_engine.ENGINE_POOL)
+    win.ytdlp_engine.setToolTip(
+        "Wbudowany modul laduje yt_dlp raz i pobiera bez uruchamiania osobnego procesu\n"
+        "dla kazdego elementu. Pula procesow robi to samo w kilku stalych procesach\n"
+        "pomocniczych (awaria yt-dlp nie zamyka programu).\n"
+        "Wymaga zainstalowanego pakietu Python 'yt-dlp'."
+    )
+    win.ytdlp_engine.currentIndexChanged.connect(win._on_engine_changed)
+    ytdlp_lay.addRow("Silnik yt-dlp:", win.ytdlp_engine)
+
     win.check_ytdlp_updates = QCheckBox("Sprawdzaj aktualizacje YT-DLP przy starcie")
     ytdlp_lay.addRow(win.check_ytdlp_updates)
 
@@ -614,7 +742,71 @@ def _init_settings_tab(win, tab_widget: QWidget):
     ytdlp_lay.addRow(win.auto_download_ffmpeg)
 
     ytdlp_group.setLayout(ytdlp_lay)
-    tl.addWidget(ytdlp_group); tl.addStretch()
+    tl.addWidget(ytdlp_group)
+
+    dl_group = QGroupBox("Zewnetrzny downloader")
+    dl_lay = QFormLayout(); dl_lay.setSpacing(6)
+
+    win.external_downloader = QComboBox()
+    win.external_downloader.addItem("Brak (wbudowany w yt-dlp)", EXTERNAL_DOWNLOADER_NONE)
+    win.external_downloader.addItem("aria2c (wiele polaczen)", EXTERNAL_DOWNLOADER_ARIA2C)
+    win.external_downloader.addItem("FFmpeg", EXTERNAL_DOWNLOADER_FFMPEG)
+    win.external_downloader.setToolTip(
+        "yt-dlp przekazuje transfer wybranych protokolow zewnetrznemu programowi.\n"
+        "aria2c pobiera jeden plik wieloma polaczeniami - duzo szybciej na serwisach,\n"
+        "ktore dlawia pojedyncze polaczenie."
+    )
+    dl_lay.addRow("Downloader:", win.external_downloader)
+
+    win.aria2c_path = QLineEdit(win.get_aria2c_path())
+    win.aria2c_path.setPlaceholderText(f"Domyslnie: {ARIA2C_PATH_WINDOWS} (Win) lub 'aria2c' (PATH)")
+    browse_aria2c = QPushButton(" Przegladaj...")
+    browse_aria2c.setIcon(style.standardIcon(QStyle.StandardPixmap.SP_DirOpenIcon))
+    browse_aria2c.clicked.connect(win.browse_aria2c_path)
+    aria2c_row = QHBoxLayout()
+    aria2c_row.addWidget(win.aria2c_path); aria2c_row.addWidget(browse_aria2c)
+    dl_lay.addRow("Sciezka do aria2c:", aria2c_row)
+
+    win.aria2_connections = QSpinBox(); win.aria2_connections.setRange(1, 16)
+    win.aria2_connections.setValue(8)
+    win.aria2_connections.setToolTip("aria2c -x: maks. liczba polaczen do jednego serwera.")
+    dl_lay.addRow("Polaczenia na serwer:", win.aria2_connections)
+
+    win.aria2_split = QSpinBox(); win.aria2_split.setRange(1, 64)
+    win.aria2_split.setValue(8)
+    win.aria2_split.setToolTip("aria2c -s: na ile czesci dzielic plik.")
+    dl_lay.addRow("Podzial pliku:", win.aria2_split)
+
+    proto_row = QHBoxLayout()
+    win.downloader_protocols = {}
+    for proto, label in EXTERNAL_DOWNLOADER_PROTOCOLS:
+        cb = QCheckBox(label)
+        cb.setChecked(True)
+        win.downloader_protocols[proto] = cb
+        proto_row.addWidget(cb)
+    proto_row.addStretch()
+    dl_lay.addRow("Protokoly:", proto_row)
+
+    win.downloader_host_profiles = QLineEdit()
+    win.downloader_host_profiles.setPlaceholderText("np. cda.pl=4, youtube.com=8, *=16")
+    win.downloader_host_profiles.setToolTip(
+        "Liczba polaczen aria2c dla serwisu (nadpisuje 'Polaczenia na serwer').\n"
+        "0 = nie uzywaj zewnetrznego downloadera dla tego serwisu."
+    )
+    dl_lay.addRow("Profile serwisow:", win.downloader_host_profiles)
+
+    def _sync_downloader_widgets():
+        name = win.external_downloader.currentData()
+        for w in (win.aria2c_path, browse_aria2c, win.aria2_connections,
+                  win.aria2_split, win.downloader_host_profiles):
+            w.setEnabled(name == EXTERNAL_DOWNLOADER_ARIA2C)
+        for cb in win.downloader_protocols.values():
+            cb.setEnabled(name != EXTERNAL_DOWNLOADER_NONE)
+    win.external_downloader.currentIndexChanged.connect(lambda _i: _sync_downloader_widgets())
+    _sync_downloader_widgets()
+
+    dl_group.setLayout(dl_lay)
+    tl.addWidget(dl_group); tl.addStretch()
 
     tools_w_lay = QVBoxLayout(tools_w); tools_w_lay.setContentsMargins(0, 0, 0, 0)
     tools_w_lay.addWidget(tools_scroll)
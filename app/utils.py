@@ -1,11 +1,20 @@
 # -*- coding: utf-8 -*-
 """
-Funkcje pomocnicze (formatowanie rozmiaru, czasu, ścieżka zasobów).
+Funkcje pomocnicze (formatowanie rozmiaru, czasu, ścieżka zasobów, normalizacja URL-i).
 """
 
 import os
+import re
+import shutil
 import sys
+from pathlib import Path
 from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+_RATE_RE = re.compile(r"^\s*([\d.]+)\s*([KMGT]?)(?:i?B)?(?:/s)?\s*$", re.IGNORECASE)
+
+# Parametry, które nie zmieniają treści pod adresem (śledzenie, miejsce startu odtwarzania)
+_IGNORED_QUERY = {"si", "feature", "pp", "t", "start", "fbclid", "gclid", "igshid", "ref"}
 
 
 def resource_path(relative_path: str) -> str:
@@ -29,6 +38,35 @@ def human_size(num_bytes: Optional[int]) -> str:
     return f"{n:.1f} {units[i]}"
 
 
+def free_space(path) -> Optional[int]:
+    """Wolne miejsce (bajty) na woluminie ścieżki; dla nieistniejącej — najbliższego rodzica."""
+    p = Path(path).expanduser()
+    try:
+        p = p.resolve()
+    except OSError:
+        pass
+    while not p.exists() and p != p.parent:
+        p = p.parent
+    try:
+        return shutil.disk_usage(p).free
+    except OSError:
+        return None
+
+
+def parse_rate(text: str) -> Optional[int]:
+    """Parsuje limit prędkości w stylu yt-dlp ('50K', '4.2M', '80MB/s') na bajty/s."""
+    m = _RATE_RE.match(text or "")
+    if not m:
+        return None
+    try:
+        value = float(m.group(1))
+    except ValueError:
+        return None
+    power = " KMGT".index(m.group(2).upper() or " ")
+    rate = int(value * (1024 ** power))
+    return rate if rate > 0 else None
+
+
 def human_duration(seconds: int) -> str:
     """Zwraca czas trwania w postaci H:MM:SS lub M:SS."""
     try:
@@ -41,3 +79,32 @@ def human_duration(seconds: int) -> str:
         return f"{m:d}:{sec:02d}"
     except Exception:
         return "N/D"
+
+
+def normalize_url(url: str) -> str:
+    """
+    Postać URL-a do porównań i kluczy pamięci podręcznej: https, host małymi
+    literami bez "www."/"m.", bez fragmentu, parametrów śledzących i czasu
+    startu, z posortowanymi parametrami; youtu.be/ID i /shorts/ID -> watch?v=ID.
+    """
+    url = (url or "").strip()
+    if "://" not in url:
+        url = "https://" + url
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    for prefix in ("www.", "m."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip("/") or "/"
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in _IGNORED_QUERY and not k.lower().startswith("utm_")
+    ]
+    if host == "youtu.be" and path != "/":
+        host, query = "youtube.com", query + [("v", path.strip("/"))]
+        path = "/watch"
+    elif host in ("youtube.com", "music.youtube.com") and path.startswith("/shorts/"):
+        query, path = query + [("v", path.split("/")[2])], "/watch"
+    return urlunsplit(("https", host, path, urlencode(sorted(query)), ""))
@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+"""
+Pula długo żyjących procesów yt-dlp (`ytdlp_worker`).
+
+Każdy proces importuje `yt_dlp` raz i wykonuje kolejne zadania (metadane,
+pobieranie) przesyłane jako JSON przez potok — znika koszt startu
+interpretera przy każdym wywołaniu, a awaria yt-dlp nie zabija GUI.
+
+  - procesy startują leniwie; naraz działa najwyżej `max_workers` (kolejne
+    zadania czekają na wolny proces), bezczynnych zostaje najwyżej `max_idle`
+  - proces jest wymieniany po `max_jobs` zadaniach, po awarii lub po
+    przerwaniu zadania, które nie zareagowało na anulowanie
+  - zadanie można anulować z dowolnego wątku (`PoolJob.cancel()`)
+"""
+
+import json
+import logging
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from .config import YTDLP_POOL_MAX_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# Ile sekund czekamy na reakcję procesu na anulowanie, zanim go zabijemy
+CANCEL_GRACE_S = 5.0
+
+_EXIT = {"event": "exit"}
+
+
+def worker_command() -> List[str]:
+    """Polecenie uruchamiające proces roboczy (również w wersji z PyInstallera)."""
+    if getattr(sys, "frozen", False):
+        return [sys.executable, "--ytdlp-worker"]
+    return [sys.executable, "-m", "app.ytdlp_worker"]
+
+
+def _creationflags() -> int:
+    return subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0
+
+
+class WorkerError(RuntimeError):
+    pass
+
+
+class _WorkerProcess:
+    def __init__(self):
+        self.jobs_done = 0
+        self._events: "queue.Queue[dict]" = queue.Queue()
+        self._write_lock = threading.Lock()
+        self.proc = subprocess.Popen(
+            worker_command(),
+            cwd=str(Path(__file__).resolve().parent.parent),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            encoding="utf-8",
+            errors="replace",
+            bufsize=1,
+            creationflags=_creationflags(),
+        )
+        threading.Thread(target=self._read, daemon=True).start()
+        logger.info(f"Uruchomiono proces roboczy yt-dlp (PID {self.proc.pid})")
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def send(self, msg: dict) -> bool:
+        try:
+            with self._write_lock:
+                self.proc.stdin.write(json.dumps(msg, ensure_ascii=False) + "\n")
+                self.proc.stdin.flush()
+            return True
+        except (OSError, ValueError):
+            return False
+
+    def next_event(self, timeout: Optional[float]) -> dict:
+        """Blokuje do następnego zdarzenia; queue.Empty po upływie `timeout`."""
+        return self._events.get(timeout=timeout)
+
+    def kill(self):
+        if self.alive():
+            try:
+                self.proc.kill()
+            except OSError:
+                pass
+
+    def shutdown(self):
+        if self.alive():
+            self.send({"op": "exit"})
+            try:
+                self.proc.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self.kill()
+
+    def _read(self):
+        for raw in self.proc.stdout:
+            try:
+                self._events.put(json.loads(raw))
+            except ValueError:
+                logger.debug(f"[worker] {raw.rstrip()}")
+        self._events.put(_EXIT)
+
+
+class PoolJob:
+    """Pojedyncze zadanie wysłane do procesu roboczego."""
+
+    _ids = 0
+    _ids_lock = threading.Lock()
+
+    def __init__(self, pool: "WorkerPool", op: str, args: List[str], url: Optional[str] = None,
+                 rate: Optional[int] = None):
+        with PoolJob._ids_lock:
+            PoolJob._ids += 1
+            self.id = PoolJob._ids
+        self._pool = pool
+        self._request = {"id": self.id, "op": op, "args": [str(a) for a in args]}
+        if url:
+            self._request["url"] = url
+        if rate:
+            self._request["rate"] = rate
+        self._worker: Optional[_WorkerProcess] = None
+        self._lock = threading.Lock()
+        self.cancelled = False
+        self._kill_timer: Optional[threading.Timer] = None
+
+    def run(self, on_event: Optional[Callable[[dict], None]] = None,
+            timeout: Optional[float] = None) -> dict:
+        """
+        Wykonuje zadanie i zwraca końcowe zdarzenie "done".
+        Zdarzenia pośrednie (log, progress) przekazuje do `on_event`.
+        """
+        worker = self._pool._acquire(self, timeout)
+        if worker is None:   # anulowane w oczekiwaniu na wolny proces
+            return {"event": "done", "ok": False, "cancelled": True, "error": "Przerwano."}
+        healthy = False
+        try:
+            with self._lock:
+                if self.cancelled:
+                    healthy = True
+                    return {"event": "done", "ok": False, "cancelled": True, "error": "Przerwano."}
+                self._worker = worker
+            if not worker.send(self._request):
+                raise WorkerError("Proces roboczy yt-dlp nie przyjął zadania.")
+            while True:
+                try:
+                    ev = worker.next_event(timeout)
+                except queue.Empty:
+                    raise TimeoutError("Przekroczono czas oczekiwania na proces roboczy yt-dlp.") from None
+                if ev is _EXIT:
+                    if self.cancelled:
+                        return {"event": "done", "ok": False, "cancelled": True, "error": "Przerwano."}
+                    raise WorkerError("Proces roboczy yt-dlp zakończył się nieoczekiwanie.")
+                if ev.get("id") != self.id:
+                    continue
+                if ev.get("event") == "done":
+                    healthy = True
+                    return ev
+                if on_event:
+                    on_event(ev)
+        finally:
+            with self._lock:
+                self._worker = None
+                if self._kill_timer:
+                    self._kill_timer.cancel()
+            self._pool._release(worker, healthy)
+
+    def cancel(self):
+        with self._lock:
+            if self.cancelled:
+                return
+            self.cancelled = True
+            worker = self._worker
+            if worker is None:
+                return
+            worker.send({"id": self.id, "op": "cancel"})
+            # yt-dlp sprawdza anulowanie tylko w hookach i logach — jeśli
+            # utknął np. na połączeniu, zabijamy proces po chwili.
+            self._kill_timer = threading.Timer(CANCEL_GRACE_S, worker.kill)
+            self._kill_timer.daemon = True
+            self._kill_timer.start()
+
+    def set_rate_limit(self, rate: Optional[int]):
+        with self._lock:
+            self._request["rate"] = rate
+            if self._worker is not None:
+                self._worker.send({"id": self.id, "op": "ratelimit", "rate": rate})
+
+
+class WorkerPool:
+    """Pula procesów roboczych; bezpieczna do użycia z wielu wątków."""
+
+    def __init__(self, max_idle: int = 2, max_jobs: int = 25, max_workers: int = 6):
+        self.max_idle = max_idle
+        self.max_jobs = max_jobs
+        self.max_workers = max(1, max_workers)
+        self._idle: List[_WorkerProcess] = []
+        self._busy = set()
+        self._spawning = 0                       # procesy uruchamiane poza blokadą
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._closed = False
+
+    def job(self, op: str, args: List[str], url: Optional[str] = None,
+            rate: Optional[int] = None) -> PoolJob:
+        return PoolJob(self, op, args, url, rate)
+
+    def extract_info(self, args: List[str], url: str, timeout: Optional[float] = None) -> dict:
+        """Odpowiednik `ytdlp_engine.extract_info` wykonywany w procesie roboczym."""
+        ev = self.job("extract", args, url).run(timeout=timeout)
+        if not ev.get("ok"):
+            raise RuntimeError(ev.get("error") or "Nie udało się pobrać metadanych")
+        return ev.get("info") or {}
+
+    def stats(self) -> tuple:
+        with self._lock:
+            return len(self._busy), len(self._idle)
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            workers, self._idle = self._idle + list(self._busy), []
+            self._busy.clear()
+            self._cond.notify_all()
+        for w in workers:
+            w.shutdown()
+
+    # ------------------------------------------------------------------
+
+    def _acquire(self, job: Optional[PoolJob] = None,
+                 timeout: Optional[float] = None) -> Optional[_WorkerProcess]:
+        """
+        Bezczynny albo nowy proces; przy `max_workers` zajętych czeka na zwolnienie.
+        Zwraca None, gdy `job` anulowano w trakcie oczekiwania.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise WorkerError("Pula procesów yt-dlp jest zamknięta.")
+                if job is not None and job.cancelled:
+                    return None
+                while self._idle:
+                    w = self._idle.pop()
+                    if w.alive():
+                        self._busy.add(w)
+                        return w
+                if len(self._busy) + self._spawning < self.max_workers:
+                    self._spawning += 1
+                    break
+                wait = 0.5   # krótko, żeby zauważyć anulowanie zadania
+                if deadline is not None:
+                    wait = min(wait, deadline - time.monotonic())
+                    if wait <= 0:
+                        raise TimeoutError("Przekroczono czas oczekiwania na wolny proces roboczy yt-dlp.")
+                self._cond.wait(wait)
+        try:
+            w = _WorkerProcess()
+        except BaseException:
+            with self._cond:
+                self._spawning -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._spawning -= 1
+            if not self._closed:
+                self._busy.add(w)
+                return w
+        # pulę zamknięto w trakcie uruchamiania procesu — nie zostawiamy sieroty
+        w.shutdown()
+        raise WorkerError("Pula procesów yt-dlp jest zamknięta.")
+
+    def _release(self, worker: _WorkerProcess, healthy: bool):
+        worker.jobs_done += 1
+        recycle = not healthy or not worker.alive() or worker.jobs_done >= self.max_jobs
+        with self._lock:
+            self._busy.discard(worker)
+            self._cond.notify()
+            if not recycle and not self._closed and len(self._idle) < self.max_idle:
+                self._idle.append(worker)
+                return
+        if healthy and worker.alive():
+            logger.info(f"Wymieniam proces roboczy yt-dlp (PID {worker.proc.pid}, zadań: {worker.jobs_done})")
+            worker.shutdown()
+        else:
+            worker.kill()
+
+
+_shared: Optional[WorkerPool] = None
+_shared_lock = threading.Lock()
+
+
+def shared_pool() -> WorkerPool:
+    """Wspólna pula aplikacji (procesy startują dopiero przy pierwszym zadaniu)."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = WorkerPool(max_workers=YTDLP_POOL_MAX_WORKERS)
+        return _shared
+
+
+def shutdown_shared_pool():
+    global _shared
+    with _shared_lock:
+        pool, _shared = _shared, None
+    if pool is not None:
+        pool.shutdown()
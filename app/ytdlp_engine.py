@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Wbudowany silnik yt-dlp — sterowanie `yt_dlp.YoutubeDL` bezpośrednio z wątków
+roboczych, bez uruchamiania zewnętrznego pliku wykonywalnego.
+
+Tryb ENGINE_POOL wykonuje te same operacje w procesach roboczych z puli
+(`worker_pool`), co izoluje awarie yt-dlp od GUI.
+
+Pakiet `yt_dlp` jest opcjonalny: gdy nie jest zainstalowany, aplikacja
+korzysta wyłącznie z zewnętrznego yt-dlp. Moduł importowany jest raz,
+przy pierwszym użyciu, i współdzielony przez wszystkie wątki.
+"""
+
+import logging
+import threading
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ENGINE_PROCESS = "process"
+ENGINE_INPROCESS = "inprocess"
+ENGINE_POOL = "pool"
+
+_yt_dlp = None
+_import_failed = False
+_import_lock = threading.Lock()
+
+
+def load_yt_dlp():
+    """Importuje `yt_dlp` (tylko raz) i zwraca moduł lub None, gdy jest niedostępny."""
+    global _yt_dlp, _import_failed
+    if _yt_dlp is not None or _import_failed:
+        return _yt_dlp
+    with _import_lock:
+        if _yt_dlp is None and not _import_failed:
+            try:
+                import yt_dlp
+                _yt_dlp = yt_dlp
+                logger.info(f"Załadowano moduł yt_dlp {yt_dlp.version.__version__}")
+            except Exception as e:
+                _import_failed = True
+                logger.info(f"Moduł yt_dlp niedostępny: {e}")
+    return _yt_dlp
+
+
+def is_available() -> bool:
+    return load_yt_dlp() is not None
+
+
+def version() -> str:
+    mod = load_yt_dlp()
+    return mod.version.__version__ if mod else "brak"
+
+
+def options_from_args(args: List[str]) -> Tuple[dict, List[str]]:
+    """
+    Zamienia argumenty wiersza poleceń yt-dlp (bez pliku wykonywalnego) na
+    (ydl_opts, urls) — tym samym parserem, którego używa yt-dlp CLI.
+    """
+    mod = load_yt_dlp()
+    if mod is None:
+        raise RuntimeError("Moduł yt_dlp nie jest zainstalowany.")
+    try:
+        parsed = mod.parse_options([str(a) for a in args])
+    except SystemExit as e:
+        raise RuntimeError(f"Niepoprawne argumenty yt-dlp (kod {e.code}).") from None
+    return dict(parsed.ydl_opts), list(parsed.urls)
+
+
+class CallbackLogger:
+    """Logger dla YoutubeDL przekazujący komunikaty do funkcji (np. emitującej sygnał Qt)."""
+
+    def __init__(self, emit: Callable[[str], None], check_cancel: Optional[Callable[[], None]] = None):
+        self._emit = emit
+        self._check_cancel = check_cancel
+
+    def debug(self, msg: str):
+        if self._check_cancel:
+            self._check_cancel()
+        if msg.startswith("[debug] "):
+            logger.debug(msg)
+        else:
+            self._emit(msg)
+
+    def info(self, msg: str):
+        self.debug(msg)
+
+    def warning(self, msg: str):
+        self._emit(msg if msg.startswith("WARNING") else f"WARNING: {msg}")
+
+    def error(self, msg: str):
+        self._emit(msg)
+
+
+def extract_info(args: List[str], url: str) -> dict:
+    """Pobiera metadane URL-a (odpowiednik `yt-dlp -s --dump-json`) i zwraca słownik JSON."""
+    mod = load_yt_dlp()
+    opts, _ = options_from_args(args)
+    opts.update(quiet=True, no_warnings=True, simulate=True, skip_download=True, noprogress=True)
+    with mod.YoutubeDL(opts) as ydl:
+        info = ydl.extract_info(url, download=False)
+        if info is None:
+            raise RuntimeError("Brak metadanych.")
+        return ydl.sanitize_info(info)
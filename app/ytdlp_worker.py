@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Proces roboczy puli yt-dlp (uruchamiany przez `worker_pool.WorkerPool`).
+
+Importuje `yt_dlp` raz i wykonuje kolejne zadania przesyłane przez stdin jako
+linie JSON. Odpowiedzi (logi, postęp, wynik) idą na stdout, również jako JSON.
+
+Żądania:
+    {"id": 1, "op": "extract",  "args": [...], "url": "..."}
+    {"id": 2, "op": "download", "args": [...]}          # URL-e są w args
+    {"id": 2, "op": "cancel"}
+    {"id": 2, "op": "ratelimit", "rate": 1048576}
+    {"op": "exit"}
+
+Odpowiedzi:
+    {"id": 1, "event": "log", "msg": "..."}
+    {"id": 2, "event": "progress", "data": {...}}
+    {"id": 2, "event": "postprocess", "data": {...}}
+    {"id": 1, "event": "done", "ok": true, "info": {...}}
+    {"id": 2, "event": "done", "ok": false, "error": "...", "cancelled": false}
+"""
+
+import json
+import os
+import queue
+import sys
+import threading
+
+from . import ytdlp_engine
+from .progress_protocol import ITEM_INFO_FIELDS
+
+_PROGRESS_KEYS = (
+    "status", "downloaded_bytes", "total_bytes", "total_bytes_estimate", "speed",
+    "eta", "elapsed", "fragment_index", "fragment_count", "filename", "tmpfilename",
+)
+
+
+class _Worker:
+    def __init__(self, out):
+        self._out = out
+        self._out_lock = threading.Lock()
+        self._jobs: "queue.Queue[dict]" = queue.Queue()
+        self._cancelled = set()
+        self._current_id = None
+        self._ydl = None
+
+    # ------------------------------------------------------------------
+
+    def send(self, **msg):
+        line = json.dumps(msg, ensure_ascii=False, default=str)
+        with self._out_lock:
+            self._out.write(line + "\n")
+            self._out.flush()
+
+    def read_stdin(self):
+        """Wątek czytający: polecenia sterujące obsługujemy od razu, zadania kolejkujemy."""
+        for raw in sys.stdin:
+            try:
+                msg = json.loads(raw)
+            except ValueError:
+                continue
+            op = msg.get("op")
+            if op == "cancel":
+                self._cancelled.add(msg.get("id"))
+            elif op == "ratelimit":
+                if self._ydl is not None and msg.get("id") == self._current_id:
+                    self._ydl.params["ratelimit"] = msg.get("rate") or None
+            else:
+                self._jobs.put(msg)
+        self._jobs.put({"op": "exit"})
+
+    def serve(self):
+        threading.Thread(target=self.read_stdin, daemon=True).start()
+        while True:
+            job = self._jobs.get()
+            if job.get("op") == "exit":
+                return
+            self._current_id = job.get("id")
+            try:
+                self._run(job)
+            finally:
+                self._cancelled.discard(self._current_id)
+                self._current_id = None
+                self._ydl = None
+
+    # ------------------------------------------------------------------
+
+    def _run(self, job: dict):
+        job_id = job.get("id")
+        yt_dlp = ytdlp_engine.load_yt_dlp()
+        if yt_dlp is None:
+            self.send(id=job_id, event="done", ok=False, error="Moduł yt_dlp nie jest zainstalowany.")
+            return
+
+        def check_cancel():
+            if job_id in self._cancelled:
+                raise yt_dlp.utils.DownloadCancelled("Zatrzymano przez użytkownika")
+
+        def log(msg: str):
+            self.send(id=job_id, event="log", msg=msg)
+
+        try:
+            if job.get("op") == "extract":
+                opts, _ = ytdlp_engine.options_from_args(job.get("args") or [])
+                opts.update(
+                    quiet=True, no_warnings=True, simulate=True, skip_download=True, noprogress=True,
+                    logger=ytdlp_engine.CallbackLogger(lambda _m: None, check_cancel),
+                )
+                with yt_dlp.YoutubeDL(opts) as ydl:
+                    self._ydl = ydl
+                    info = ydl.extract_info(job.get("url"), download=False)
+                    if info is None:
+                        raise RuntimeError("Brak metadanych.")
+                    self.send(id=job_id, event="done", ok=True, info=ydl.sanitize_info(info))
+            elif job.get("op") == "download":
+                opts, urls = ytdlp_engine.options_from_args(job.get("args") or [])
+
+                def progress_hook(d):
+                    check_cancel()
+                    info = d.get("info_dict") or {}
+                    data = {k: d.get(k) for k in _PROGRESS_KEYS}
+                    data["info"] = {k: info.get(k) for k in ITEM_INFO_FIELDS}
+                    self.send(id=job_id, event="progress", data=data)
+
+                def postprocessor_hook(d):
+                    check_cancel()
+                    if d.get("status") == "started":
+                        self.send(id=job_id, event="postprocess",
+                                  data={"status": d.get("status"), "postprocessor": d.get("postprocessor")})
+
+                opts.update(
+                    logger=ytdlp_engine.CallbackLogger(log, check_cancel),
+                    noprogress=True,
+                    progress_hooks=[progress_hook],
+                    postprocessor_hooks=[postprocessor_hook],
+                )
+                if job.get("rate"):
+                    opts["ratelimit"] = job["rate"]
+                with yt_dlp.YoutubeDL(opts) as ydl:
+                    self._ydl = ydl
+                    returncode = ydl.download(urls)
+                self.send(id=job_id, event="done", ok=returncode == 0)
+            else:
+                self.send(id=job_id, event="done", ok=False, error=f"Nieznana operacja: {job.get('op')}")
+        except yt_dlp.utils.DownloadCancelled:
+            self.send(id=job_id, event="done", ok=False, cancelled=True, error="Przerwano.")
+        except yt_dlp.utils.DownloadError as e:
+            self.send(id=job_id, event="done", ok=False, error=str(e))
+        except Exception as e:
+            self.send(id=job_id, event="done", ok=False, error=f"{type(e).__name__}: {e}")
+
+
+def main():
+    # Protokół idzie osobnym deskryptorem; wszystko, co biblioteki wypiszą na
+    # stdout, trafia na stderr i nie psuje strumienia JSON.
+    out = os.fdopen(os.dup(sys.stdout.fileno()), "w", encoding="utf-8", buffering=1)
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    sys.stdout = sys.stderr
+    if hasattr(sys.stdin, "reconfigure"):
+        sys.stdin.reconfigure(encoding="utf-8")
+    _Worker(out).serve()
+
+
+if __name__ == "__main__":
+    main()
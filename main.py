@@ -19,6 +19,12 @@ if sys.platform == "win32":
     ctypes.windll.kernel32.SetConsoleOutputCP(65001)
     os.environ.setdefault("PYTHONUTF8", "1")
 
+# Proces roboczy puli yt-dlp (wersja z PyInstallera uruchamia samą siebie)
+if "--ytdlp-worker" in sys.argv[1:]:
+    from app.ytdlp_worker import main as worker_main
+    worker_main()
+    sys.exit(0)
+
 from PyQt6.QtWidgets import QApplication
 from PyQt6.QtCore import QCoreApplication
 